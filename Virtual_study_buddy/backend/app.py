@@ -1,23 +1,68 @@
+import json
+import click
 from flask import Flask, Blueprint,  jsonify, request
-from flask_bcrypt import Bcrypt
 from flask_jwt_extended import JWTManager, create_access_token
-from models.user_model import User
+from controllers.study_plan_controller import study_plan_blueprint
 from sqlalchemy.exc import IntegrityError
+from utils.cache import load_user
+from utils.database import init_app
+from utils import metrics, profiler, query_stats
+from utils.hashing import HashingUnavailable, hasher
+from utils.serializers import JSONProvider
+from utils.bulk_import import IMPORT_TYPES, import_stream
+from utils.sync import SYNC_TOMBSTONE_DAYS, purge_tombstones
+from utils.tags import TAGGED, backfill
+from models import db, User
 import os
 
 app = Flask(__name__)
-bcrypt = Bcrypt(app)
+app.json = JSONProvider(app)
+init_app(app)
+query_stats.init_app(app)
+metrics.init_app(app)
+profiler.init_app(app)
 app.config['JWT_SECRET_KEY'] = os.getenv('JWT_SECRET_KEY')
 jwt = JWTManager(app)
 
 user_blueprint = Blueprint('user', __name__)
 resource_blueprint = Blueprint('resource', __name__)
-study_plan_blueprint = Blueprint('study_plan', __name__)
 
 app.register_blueprint(study_plan_blueprint, url_prefix='/study_plan')
 app.register_blueprint(resource_blueprint, url_prefix='/resources')
 app.register_blueprint(user_blueprint, url_prefix='/user')
 
+@app.errorhandler(HashingUnavailable)
+def hashing_unavailable(error):
+    response = jsonify({'message': 'Server is busy, please retry shortly.'})
+    response.headers['Retry-After'] = str(error.retry_after)
+    return response, 503
+
+@app.cli.command('backfill-tags')
+@click.option('--chunk-size', default=5000, show_default=True)
+@click.option('--type', 'item_types', multiple=True, type=click.Choice(sorted(TAGGED)))
+def backfill_tags(chunk_size, item_types):
+    """Parse existing tags strings into the normalised tag tables."""
+    backfill(db.engine, chunk_size, item_types or None, echo=click.echo)
+
+@app.cli.command('import-data')
+@click.argument('source', type=click.File('rb'))
+@click.option('--owner-id', type=int, required=True)
+@click.option('--type', 'default_type', type=click.Choice(sorted(IMPORT_TYPES)),
+              help='Type of records without a type field.')
+@click.option('--format', 'fmt', type=click.Choice(['csv', 'ndjson']),
+              help='Defaults to csv for .csv files, else ndjson.')
+def import_data(source, owner_id, default_type, fmt):
+    """Import plans, materials and sessions from a CSV or NDJSON file."""
+    fmt = fmt or ('csv' if source.name.endswith('.csv') else 'ndjson')
+    summary = import_stream(db.engine, owner_id, source, fmt, default_type)
+    click.echo(json.dumps(summary, indent=2))
+
+@app.cli.command('purge-tombstones')
+@click.option('--days', default=SYNC_TOMBSTONE_DAYS, show_default=True)
+def purge_deleted(days):
+    """Drop delta-sync tombstones older than DAYS."""
+    click.echo('{} tombstones purged'.format(purge_tombstones(db.engine, days)))
+
 @app.route('/register', methods=['POST'])
 def register():
     username = request.json.get('username', None)
@@ -26,15 +71,19 @@ def register():
     if not username or not email or not password:
         return jsonify({'message': 'Please provide all required fields.'}), 400
     try:
-        user = User.query.filter_by(email=email).first()
+        user = load_user(User, email=email)
         if user:
             return jsonify({'message': 'Email already in use.'}), 400
-        hashed_password = bcrypt.generate_password_hash(password).decode('utf-8')
-        user = User(username=username, email=email, password=hashed_password)
-        user.save()
+        hashed_password = hasher.hash(password)
+        user = User(username=username, email=email, password_hash=hashed_password)
+        db.session.add(user)
+        db.session.commit()
         access_token = create_access_token(identity=user.email)
         return jsonify({'message': 'User registered successfully.', 'access_token': access_token}), 201
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
     except IntegrityError:
+        db.session.rollback()
         return jsonify({'message': 'Username or email already exists.'}), 400
 
 @app.route('/login', methods=['POST'])
@@ -43,9 +92,15 @@ def login():
     password = request.json.get('password', None)
     if not email or not password:
         return jsonify({'message': 'Please provide all required fields.'}), 400
-    user = User.query.filter_by(email=email).first()
-    if not user or not bcrypt.check_password_hash(user.password, password):
+    user = load_user(User, email=email)
+    if not user:
+        return jsonify({'message': 'Invalid email or password.'}), 401
+    valid, upgraded_hash = hasher.check_and_upgrade(user._password, password)
+    if not valid:
         return jsonify({'message': 'Invalid email or password.'}), 401
+    if upgraded_hash:
+        user._password = upgraded_hash
+        db.session.commit()
     access_token = create_access_token(identity=user.email)
     return jsonify({'message': 'Authentication successful.', 'access_token': access_token}), 200
 
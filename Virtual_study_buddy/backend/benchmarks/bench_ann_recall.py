@@ -0,0 +1,65 @@
+"""
+Recall@k and latency of the approximate material index against exact TF-IDF search,
+with the index loaded memory-mapped from disk as the workers use it. The
+catalog is drawn from --topics clusters so that neighbours exist.
+
+    python benchmarks/bench_ann_recall.py --materials 1000000 --topics 20000 -k 10
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from bench_recommendation import percentile, synthetic_documents  # noqa: E402
+from utils.recommendation import ANNIndex, MaterialRecommender  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--materials', type=int, default=1000000)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--topics', type=int, default=20000)
+    parser.add_argument('--profile-size', type=int, default=1)
+    parser.add_argument('--terms-per-row', type=int, default=8)
+    parser.add_argument('--query-terms', type=int, default=32)
+    parser.add_argument('--budget', type=int, default=4096)
+    parser.add_argument('-k', type=int, default=10)
+    args = parser.parse_args()
+
+    recommender = MaterialRecommender.fit(synthetic_documents(args.materials, topics=args.topics))
+    began = time.perf_counter()
+    built = ANNIndex.build(recommender, args.terms_per_row, args.query_terms, args.budget)
+    print('built index over {} materials ({} postings) in {:.1f}s'.format(
+        len(built), len(built.postings), time.perf_counter() - began))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'index')
+        built.save(path)
+        index = ANNIndex.load(path)
+
+        rng = np.random.default_rng(1)
+        exact_latency, ann_latency, recalls, candidates = [], [], [], []
+        for _ in range(args.queries):
+            profile = rng.integers(1, args.materials + 1, size=args.profile_size).tolist()
+            began = time.perf_counter()
+            exact = recommender.recommend(profile, args.k)
+            exact_latency.append(time.perf_counter() - began)
+            began = time.perf_counter()
+            approximate = index.recommend(profile, args.k)
+            ann_latency.append(time.perf_counter() - began)
+            if exact:
+                recalls.append(len({i for i, _ in exact} & {i for i, _ in approximate}) / len(exact))
+            candidates.append(len(index.candidates(index.profile(profile))))
+
+        print('exact  p50 {:.2f} ms  p95 {:.2f} ms'.format(percentile(exact_latency, 50), percentile(exact_latency, 95)))
+        print('ann    p50 {:.2f} ms  p95 {:.2f} ms  ({:.0f} candidates re-ranked on average)'.format(
+            percentile(ann_latency, 50), percentile(ann_latency, 95), np.mean(candidates)))
+        print('recall@{}: {:.3f}'.format(args.k, np.mean(recalls)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+"""
+Batch endpoint throughput (operations/s): re-prioritising and creating
+plans through apply_batch, one transaction per batch, against the
+one-item-per-request path (load, mutate, commit) through the ORM.
+
+    python benchmarks/bench_batch.py --plans 5000 --batch 100
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from flask import Flask
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from models import db, StudyPlan  # noqa: E402
+from utils.batch import apply_batch  # noqa: E402
+from utils.database import init_app  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--plans', type=int, default=5000)
+    parser.add_argument('--batch', type=int, default=100)
+    parser.add_argument('--orm-ops', type=int, default=1000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = Flask(__name__)
+        app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + os.path.join(tmp, 'bench.db')
+        init_app(app)
+        with app.app_context():
+            db.create_all()
+
+            began = time.perf_counter()
+            ids = []
+            for offset in range(0, args.plans, args.batch):
+                operations = [{'op': 'create', 'data': {'title': 'Plan %d' % i, 'description': 'Chapter review',
+                                                        'tags': 'week %d, exam' % (i % 12)}}
+                              for i in range(offset, min(offset + args.batch, args.plans))]
+                ids += [result['id'] for result in apply_batch(db.session, 'plans', 1, operations)]
+                db.session.commit()
+            elapsed = time.perf_counter() - began
+            print('batch create  {} ops in batches of {}: {:.0f} ops/s'.format(args.plans, args.batch,
+                                                                              args.plans / elapsed))
+
+            began = time.perf_counter()
+            for offset in range(0, len(ids), args.batch):
+                operations = [{'op': 'update', 'id': item_id, 'data': {'priority': (item_id * 7) % 5}}
+                              for item_id in ids[offset:offset + args.batch]]
+                apply_batch(db.session, 'plans', 1, operations)
+                db.session.commit()
+            elapsed = time.perf_counter() - began
+            print('batch update  {} ops in batches of {}: {:.0f} ops/s'.format(len(ids), args.batch,
+                                                                              len(ids) / elapsed))
+
+            began = time.perf_counter()
+            for item_id in ids[:args.orm_ops]:
+                plan = StudyPlan.query.filter_by(id=item_id, owner_id=1).first()
+                plan.priority = (item_id * 3) % 5
+                db.session.commit()
+            elapsed = time.perf_counter() - began
+            print('orm update    {} ops, one commit each: {:.0f} ops/s'.format(args.orm_ops, args.orm_ops / elapsed))
+
+            began = time.perf_counter()
+            for offset in range(0, len(ids), args.batch):
+                apply_batch(db.session, 'plans', 1, [{'op': 'delete', 'id': item_id}
+                                                     for item_id in ids[offset:offset + args.batch]])
+                db.session.commit()
+            elapsed = time.perf_counter() - began
+            print('batch delete  {} ops in batches of {}: {:.0f} ops/s'.format(len(ids), args.batch,
+                                                                              len(ids) / elapsed))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+"""
+Bulk import throughput (rows/s) from NDJSON and CSV, against the old
+one-POST-one-commit path through the ORM.
+
+    python benchmarks/bench_bulk_import.py --rows 200000
+"""
+import argparse
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+from flask import Flask
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from models import db, StudyPlan  # noqa: E402
+from utils.database import init_app  # noqa: E402
+from utils.bulk_import import import_stream  # noqa: E402
+
+
+def records(count):
+    for i in range(count):
+        kind = ('plans', 'materials', 'sessions')[i % 3]
+        record = {'type': kind, 'title': 'Item %d' % i, 'description': 'Chapter %d review and exercises' % i,
+                  'tags': 'week %d, exam' % (i % 12), 'priority': i % 5, 'due_date': '2024-03-01T09:00:00'}
+        if kind == 'plans':
+            record['ref'] = 'p%d' % i
+        elif kind == 'materials':
+            record['link'] = 'https://example.com/%d' % i
+        else:
+            record['plan_ref'] = 'p%d' % (i - 2)
+        yield record
+
+
+def as_ndjson(count):
+    return '\n'.join(json.dumps(record) for record in records(count)).encode('utf-8')
+
+
+def as_csv(count):
+    # CSV has no nested types; one model per file, as a teacher's sheet would be.
+    lines = ['title,description,tags,priority,due_date']
+    lines += ['"Item {}","Chapter {} review","week {}, exam",{},2024-03-01T09:00:00'.format(i, i, i % 12, i % 5)
+              for i in range(count)]
+    return '\n'.join(lines).encode('utf-8')
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=200000)
+    parser.add_argument('--orm-rows', type=int, default=2000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = Flask(__name__)
+        app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + os.path.join(tmp, 'bench.db')
+        init_app(app)
+        with app.app_context():
+            db.create_all()
+            for label, payload, fmt, default_type in (('ndjson', as_ndjson(args.rows), 'ndjson', None),
+                                                       ('csv', as_csv(args.rows), 'csv', 'plans')):
+                began = time.perf_counter()
+                summary = import_stream(db.engine, 1, io.BytesIO(payload), fmt, default_type)
+                elapsed = time.perf_counter() - began
+                print('{:7} {} rows in {:.2f}s: {:.0f} rows/s, {} errors'.format(
+                    label, sum(summary['inserted'].values()), elapsed, args.rows / elapsed, summary['error_count']))
+
+            began = time.perf_counter()
+            for i in range(args.orm_rows):
+                db.session.add(StudyPlan(title='Item %d' % i, description='Chapter review', tags='week 1, exam',
+                                         owner_id=1))
+                db.session.commit()
+            elapsed = time.perf_counter() - began
+            print('orm     {} rows, one commit each: {:.0f} rows/s'.format(args.orm_rows, args.orm_rows / elapsed))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+"""
+Queries and latency of loading a user's dashboard: the lazy relationships
+(one SELECT per relationship, every row, sorted in Python) against the
+capped upcoming_* relationships loaded with selectinload.
+
+    python benchmarks/bench_dashboard.py --rows 5000 --users 20 --repeat 50
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from flask import Flask
+from sqlalchemy import event
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from models import db, User, StudyPlan, StudyMaterial, StudySession, Reminder  # noqa: E402
+from utils.dashboard import DASHBOARD_ITEMS, UPCOMING, dashboard_options  # noqa: E402
+from utils.database import init_app  # noqa: E402
+
+RELATIONSHIPS = (('plans', 'study_plans', 'due_date'), ('materials', 'study_materials', 'due_date'),
+                 ('sessions', 'study_sessions', 'due_date'), ('reminders', 'reminders', 'reminder_time'))
+
+
+def lazy(user_id):
+    user = db.session.get(User, user_id)
+    now = datetime.utcnow()
+    dashboard = {}
+    for kind, name, column in RELATIONSHIPS:
+        due = [item for item in getattr(user, name) if getattr(item, column) and getattr(item, column) >= now]
+        dashboard[kind] = sorted(due, key=lambda item: (getattr(item, column), item.id))[:DASHBOARD_ITEMS]
+    return dashboard
+
+
+def eager(user_id):
+    user = db.session.query(User).options(*dashboard_options()).filter(User.id == user_id).first()
+    return {kind: list(getattr(user, attribute.key)) for kind, attribute in UPCOMING.items()}
+
+
+def seed(rows, users):
+    now = datetime.utcnow()
+    db.session.execute(User.__table__.insert(), [
+        {'username': 'user%d' % u, 'email': 'user%d@example.org' % u, '_password': 'x'} for u in range(users)
+    ])
+    plans = [{'title': 'Plan', 'description': 'Review', 'owner_id': 1 + i % users,
+              'due_date': now + timedelta(hours=i - rows // 2)} for i in range(rows)]
+    db.session.execute(StudyPlan.__table__.insert(), plans)
+    db.session.execute(StudyMaterial.__table__.insert(), [dict(plan, link='https://example.org') for plan in plans])
+    db.session.execute(StudySession.__table__.insert(), [dict(plan, study_plan_id=1 + i % users)
+                                                         for i, plan in enumerate(plans)])
+    db.session.execute(Reminder.__table__.insert(), [
+        {'title': 'Due', 'description': 'Soon', 'owner_id': plan['owner_id'], 'reminder_time': plan['due_date']}
+        for plan in plans
+    ])
+    db.session.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=5000, help='rows per type, over all users')
+    parser.add_argument('--users', type=int, default=20)
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = Flask(__name__)
+        app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + os.path.join(tmp, 'bench.db')
+        init_app(app)
+        with app.app_context():
+            db.create_all()
+            seed(args.rows * args.users, args.users)
+            statements = []
+            event.listen(db.engine, 'before_cursor_execute', lambda *a: statements.append(a[2]))
+            results = {}
+            for label, load in (('lazy relationships', lazy), ('dashboard', eager)):
+                del statements[:]
+                began = time.perf_counter()
+                for _ in range(args.repeat):
+                    results[label] = {kind: [item.id for item in items] for kind, items in load(1).items()}
+                    db.session.rollback()
+                elapsed = (time.perf_counter() - began) / args.repeat
+                queries = sum(1 for statement in statements if statement.startswith('SELECT')) / args.repeat
+                print('{:20} {:8.2f} ms  {:4.0f} queries'.format(label, elapsed * 1000, queries))
+            print('same items:', results['lazy relationships'] == results['dashboard'])
+
+
+if __name__ == '__main__':
+    main()
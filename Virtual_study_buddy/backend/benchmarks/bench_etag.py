@@ -0,0 +1,60 @@
+"""
+Latency of re-fetching an unchanged /study_plans page: a full 200 against
+a conditional GET answered 304 from the collection version alone.
+
+    python benchmarks/bench_etag.py --rows 5000 --requests 500
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from flask import Flask
+from flask_jwt_extended import JWTManager, create_access_token
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from controllers.study_plan_controller import study_plan_blueprint  # noqa: E402
+from models import db, StudyPlan, User  # noqa: E402
+from utils.database import init_app  # noqa: E402
+from utils.serializers import JSONProvider  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=5000)
+    parser.add_argument('--requests', type=int, default=500)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = Flask(__name__)
+        app.json = JSONProvider(app)
+        app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + os.path.join(tmp, 'bench.db')
+        app.config['JWT_SECRET_KEY'] = 'bench-secret-key-of-sufficient-length'
+        JWTManager(app)
+        init_app(app)
+        app.register_blueprint(study_plan_blueprint)
+        with app.app_context():
+            db.create_all()
+            db.session.execute(User.__table__.insert(), [{'username': 'bench', 'email': 'bench@example.com', '_password': 'x'}])
+            db.session.execute(StudyPlan.__table__.insert(), [
+                {'title': 'Plan %d' % i, 'description': 'Chapter %d review' % i, 'tags': 'week %d, exam' % (i % 12),
+                 'owner_id': 1} for i in range(args.rows)
+            ])
+            db.session.commit()
+            headers = {'Authorization': 'Bearer ' + create_access_token(identity='bench@example.com')}
+
+        client = app.test_client()
+        url = '/study_plans?limit=200&tags=exam'
+        etag = client.get(url, headers=headers).headers['ETag']
+        for label, request_headers, expected in (('200 full page', headers, 200),
+                                                 ('304 If-None-Match', dict(headers, **{'If-None-Match': etag}), 304)):
+            began = time.perf_counter()
+            for _ in range(args.requests):
+                assert client.get(url, headers=request_headers).status_code == expected
+            elapsed = (time.perf_counter() - began) / args.requests
+            print('{:20} {:.3f} ms/request'.format(label, elapsed * 1000))
+
+
+if __name__ == '__main__':
+    main()
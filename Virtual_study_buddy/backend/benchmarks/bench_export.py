@@ -0,0 +1,102 @@
+"""
+Account export throughput, archive size, peak Python memory and the
+longest time any pool connection is checked out while exporting.
+
+    python benchmarks/bench_export.py --rows 100000 1000000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from flask import Flask
+from sqlalchemy import event, insert
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from models import db, StudyPlan, StudyMaterial, StudySession, Reminder  # noqa: E402
+from utils.database import init_app  # noqa: E402
+from utils.export import ARCHIVE_SUFFIXES, ExportWorker, compressions  # noqa: E402
+
+
+def seed(count, owner_id=1):
+    text = 'Chapter review and exercises ' * 4
+    shares = ((StudyPlan, 0.2), (StudyMaterial, 0.5), (StudySession, 0.2), (Reminder, 0.1))
+    for model, share in shares:
+        rows = int(count * share)
+        for offset in range(0, rows, 50000):
+            values = []
+            for i in range(offset, min(offset + 50000, rows)):
+                row = {'title': 'Item %d' % i, 'description': text, 'tags': 'exam, review', 'priority': 1,
+                       'progress': 0, 'due_date': datetime(2024, 1, 1), 'owner_id': owner_id}
+                if model is StudyMaterial:
+                    row['link'] = 'https://example.com/%d' % i
+                if model is StudySession:
+                    row['study_plan_id'] = 1
+                if model is Reminder:
+                    row['reminder_time'] = datetime(2024, 1, 1)
+                values.append(row)
+            db.session.execute(insert(model.__table__), values)
+    db.session.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, nargs='+', default=[100000, 1000000])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = Flask(__name__)
+        app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + os.path.join(tmp, 'bench.db')
+        init_app(app)
+        with app.app_context():
+            db.create_all()
+            engine = db.engine
+            checked_out = {}
+            holds = []
+
+            @event.listens_for(engine, 'checkout')
+            def checkout(dbapi_connection, record, proxy):
+                checked_out[id(record)] = time.perf_counter()
+
+            @event.listens_for(engine, 'checkin')
+            def checkin(dbapi_connection, record):
+                began = checked_out.pop(id(record), None)
+                if began is not None:
+                    holds.append(time.perf_counter() - began)
+
+            worker = ExportWorker(engine, directory=os.path.join(tmp, 'exports'))
+            for owner_id, count in enumerate(sorted(args.rows), start=1):
+                seed(count, owner_id)
+                for compression in compressions():
+                    # Timed and memory-traced separately: tracemalloc slows
+                    # the encoder several times over.
+                    for traced in (False, True):
+                        job_id = '{}{}{}'.format(compression, owner_id, int(traced))
+                        now = datetime.utcnow()
+                        db.session.execute(insert(db.metadata.tables['export_job']).values(
+                            id=job_id, owner_id=owner_id, status='queued', compression=compression, rows_done=0,
+                            created_at=now, updated_at=now))
+                        db.session.commit()
+                        job = worker.claim()
+                        del holds[:]
+                        if traced:
+                            tracemalloc.start()
+                        began = time.perf_counter()
+                        worker.export(job)
+                        elapsed = time.perf_counter() - began
+                        if traced:
+                            peak = tracemalloc.get_traced_memory()[1]
+                            tracemalloc.stop()
+                        else:
+                            seconds, longest = elapsed, max(holds)
+                    archive = os.path.join(worker.directory, job_id + ARCHIVE_SUFFIXES[compression])
+                    print('{:>8} rows {:5}: {:5.1f}s ({:7.0f} rows/s), archive {:6.1f} MB, peak {:5.1f} MB, '
+                          'longest connection hold {:5.1f} ms'.format(
+                              count, compression, seconds, count / seconds, os.path.getsize(archive) / 2 ** 20,
+                              peak / 2 ** 20, longest * 1000))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+"""
+Incremental maintenance of the recommendation index: per-commit overhead of
+the StudyMaterial change hooks, and freshness lag from commit until the new
+material is returned by the process-wide recommender.
+
+    python benchmarks/bench_incremental_index.py --materials 200000 --writes 500
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from sqlalchemy import event, insert  # noqa: E402
+from sqlalchemy.orm import Session  # noqa: E402
+from bench_recommendation import percentile, synthetic_documents  # noqa: E402
+from models import db, StudyMaterial, User  # noqa: E402
+from utils import index_updates  # noqa: E402
+from utils import recommendation  # noqa: E402
+from utils.database import make_engine  # noqa: E402
+
+HOOKS = (
+    ('after_insert', index_updates._record_insert),
+    ('after_update', index_updates._record_update),
+    ('after_delete', index_updates._record_delete),
+)
+
+
+def timed_inserts(engine, documents):
+    latencies = []
+    ids = []
+    with Session(engine) as session:
+        for _, title, description, tags in documents:
+            material = StudyMaterial(title=title[:60], description=description, link='https://example.com',
+                                     tags=tags[:100], owner_id=1)
+            began = time.perf_counter()
+            session.add(material)
+            session.commit()
+            latencies.append(time.perf_counter() - began)
+            ids.append(material.id)
+    return latencies, ids
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--materials', type=int, default=200000)
+    parser.add_argument('--writes', type=int, default=500)
+    parser.add_argument('--probes', type=int, default=20)
+    parser.add_argument('--interval', type=float, default=0.05)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = make_engine('sqlite:///' + os.path.join(tmp, 'bench.db'))
+        db.metadata.create_all(engine)
+        with engine.begin() as conn:
+            conn.execute(insert(User.__table__), [{'username': 'u', 'email': 'u@example.com', '_password': 'x'}])
+            batch = []
+            for _, title, description, tags in synthetic_documents(args.materials, topics=args.materials // 50):
+                batch.append({'title': title[:60], 'description': description, 'link': 'https://example.com',
+                              'tags': tags[:100], 'owner_id': 1})
+                if len(batch) == 50000:
+                    conn.execute(insert(StudyMaterial.__table__), batch)
+                    batch = []
+            if batch:
+                conn.execute(insert(StudyMaterial.__table__), batch)
+
+        began = time.perf_counter()
+        recommendation.get_recommender(engine)
+        print('initial fit over {} materials: {:.1f}s'.format(args.materials, time.perf_counter() - began))
+        recommendation._updater.interval = args.interval
+
+        topics = args.materials // 50
+        new_documents = list(synthetic_documents(2 * args.writes + args.probes, topics=topics, seed=7))
+        with_hooks, ids = timed_inserts(engine, new_documents[:args.writes])
+        while ids[-1] not in recommendation.get_recommender(engine).row_of:
+            time.sleep(0.001)
+        stats = recommendation._updater.stats()
+
+        # End-to-end freshness of isolated writes: commit, then poll until
+        # the new id is searchable.
+        visible = []
+        for document in new_documents[2 * args.writes:]:
+            _, (material_id,) = timed_inserts(engine, [document])
+            began = time.perf_counter()
+            while material_id not in recommendation.get_recommender(engine).row_of:
+                time.sleep(0.0005)
+            visible.append(time.perf_counter() - began)
+
+        for name, handler in HOOKS:
+            event.remove(StudyMaterial, name, handler)
+        without_hooks, _ = timed_inserts(engine, new_documents[args.writes:2 * args.writes])
+
+        print('commit p50 {:.3f} ms with hooks, {:.3f} ms without ({:+.3f} ms per write)'.format(
+            percentile(with_hooks, 50), percentile(without_hooks, 50),
+            percentile(with_hooks, 50) - percentile(without_hooks, 50)))
+        print('burst of {received} writes folded in {batches} batches: queue lag mean {mean:.1f} ms, max {max:.1f} ms'.format(
+            mean=stats['mean_lag'] * 1000, max=stats['max_lag'] * 1000, **stats))
+        print('isolated writes searchable after p50 {:.1f} ms, p95 {:.1f} ms'.format(
+            percentile(visible, 50), percentile(visible, 95)))
+
+
+if __name__ == '__main__':
+    main()
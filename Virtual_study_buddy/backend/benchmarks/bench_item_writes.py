@@ -0,0 +1,66 @@
+"""
+Single-item write throughput (writes/s): the old handler path (load the
+item by id and owner, mutate it, commit) against update_item/delete_item,
+one owner-scoped UPDATE ... RETURNING or DELETE per write.
+
+    python benchmarks/bench_item_writes.py --writes 3000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from flask import Flask
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from models import db, StudyMaterial  # noqa: E402
+from utils.database import init_app  # noqa: E402
+from utils.writes import delete_item, update_item  # noqa: E402
+
+
+def timed(label, count, write):
+    began = time.perf_counter()
+    for i in range(count):
+        write(i)
+        db.session.commit()
+    elapsed = time.perf_counter() - began
+    print('{:14} {} writes: {:.0f} writes/s'.format(label, count, count / elapsed))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--writes', type=int, default=3000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = Flask(__name__)
+        app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + os.path.join(tmp, 'bench.db')
+        init_app(app)
+        with app.app_context():
+            db.create_all()
+            db.session.add_all(StudyMaterial(title='Material %d' % i, description='Chapter %d notes' % i,
+                                             link='https://example.com/%d' % i, tags='week %d, exam' % (i % 12),
+                                             owner_id=1)
+                               for i in range(args.writes * 2))
+            db.session.commit()
+            ids = [row.id for row in db.session.query(StudyMaterial.id).order_by(StudyMaterial.id)]
+            orm_ids, fast_ids = ids[:args.writes], ids[args.writes:]
+
+            def orm_update(i):
+                material = StudyMaterial.query.filter_by(id=orm_ids[i], owner_id=1).first()
+                material.priority = i % 5
+                material.progress = i % 100
+
+            def orm_delete(i):
+                db.session.delete(StudyMaterial.query.filter_by(id=orm_ids[i], owner_id=1).first())
+
+            timed('orm update', args.writes, orm_update)
+            timed('fast update', args.writes,
+                  lambda i: update_item(db.session, 'materials', 1, fast_ids[i], {'priority': i % 5, 'progress': i % 100}))
+            timed('orm delete', args.writes, orm_delete)
+            timed('fast delete', args.writes, lambda i: delete_item(db.session, 'materials', 1, fast_ids[i]))
+
+
+if __name__ == '__main__':
+    main()
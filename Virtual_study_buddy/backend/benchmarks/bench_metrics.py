@@ -0,0 +1,45 @@
+"""
+Per-request cost of the /metrics hooks: the before/after_request pair
+metrics.init_app installs, timed inside a request context so the rest of
+Flask's request handling does not drown it out.
+
+    python benchmarks/bench_metrics.py --requests 200000
+"""
+import argparse
+import os
+import sys
+import time
+from flask import Flask, Response
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from utils import metrics  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--requests', type=int, default=200000)
+    args = parser.parse_args()
+
+    app = Flask(__name__)
+
+    @app.route('/study_plans/<int:study_plan_id>')
+    def get_plan(study_plan_id):
+        return {'id': study_plan_id}
+
+    response = Response('{"id":1}', mimetype='application/json')
+    with app.test_request_context('/study_plans/1'):
+        best = None
+        for _ in range(3):
+            began = time.perf_counter()
+            for _ in range(args.requests):
+                metrics._start()
+                metrics._finish(response)
+            elapsed = (time.perf_counter() - began) / args.requests
+            best = elapsed if best is None else min(best, elapsed)
+    print('hooks            {:8.2f} us/request'.format(best * 1e6))
+    print(metrics.render(*metrics.metrics.collect()).splitlines()[-1])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+"""
+Peak Python memory of GET /study_plan/study_plans with
+`Accept: application/x-ndjson` versus building the whole list and JSON
+string in memory, for growing collection sizes.
+
+    python benchmarks/bench_ndjson_stream.py --rows 10000 100000 1000000
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+os.environ.setdefault('JWT_SECRET_KEY', 'benchmark-secret-key-of-sufficient-length')
+
+from flask_jwt_extended import create_access_token  # noqa: E402
+from sqlalchemy import insert  # noqa: E402
+from models import db, StudyPlan, User  # noqa: E402
+
+
+def measure(consume):
+    tracemalloc.start()
+    began = time.perf_counter()
+    size = consume()
+    elapsed = time.perf_counter() - began
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return size, elapsed, peak / 2 ** 20
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, nargs='+', default=[10000, 100000, 1000000])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tmp, 'bench.db')
+        from app import app
+
+        with app.app_context():
+            db.create_all()
+            db.session.execute(User.__table__.insert(), [{'username': 'bench', 'email': 'bench@example.com', '_password': 'x'}])
+            db.session.commit()
+            token = create_access_token(identity='bench@example.com')
+        client = app.test_client()
+        headers = {'Authorization': 'Bearer ' + token, 'Accept': 'application/x-ndjson'}
+
+        seeded = 0
+        for count in sorted(args.rows):
+            with app.app_context():
+                for offset in range(seeded, count, 50000):
+                    db.session.execute(insert(StudyPlan.__table__), [
+                        {'title': 'Plan %d' % i, 'description': 'Chapter review and exercises ' * 4,
+                         'tags': 'exam, review', 'priority': 1, 'progress': 0,
+                         'due_date': datetime(2024, 1, 1), 'owner_id': 1}
+                        for i in range(offset, min(offset + 50000, count))
+                    ])
+                db.session.commit()
+            seeded = count
+
+            def streamed():
+                response = client.get('/study_plan/study_plans', headers=headers, buffered=False)
+                size = sum(len(chunk) for chunk in response.response)
+                response.close()
+                return size
+
+            def buffered():
+                with app.app_context():
+                    rows = db.session.execute(db.select(*StudyPlan.__table__.c)).all()
+                    body = json.dumps({'study_plans': [dict(row._mapping) for row in rows]}, default=str)
+                    return len(body)
+
+            size, elapsed, peak = measure(streamed)
+            print('{:>8} rows  ndjson: {:6.1f} MB in {:5.2f}s, peak {:7.1f} MB'.format(count, size / 2 ** 20, elapsed, peak))
+            size, elapsed, peak = measure(buffered)
+            print('{:>8} rows  list:   {:6.1f} MB in {:5.2f}s, peak {:7.1f} MB'.format(count, size / 2 ** 20, elapsed, peak))
+
+
+if __name__ == '__main__':
+    main()
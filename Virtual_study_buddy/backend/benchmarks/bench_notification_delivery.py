@@ -0,0 +1,89 @@
+"""
+End-to-end reminder delivery against a local aiosmtpd server: due reminders
+are grouped into per-user digests and sent through the SMTP connection pool.
+Reports messages/sec.
+
+    pip install aiosmtpd
+    python benchmarks/bench_notification_delivery.py --users 2000 --reminders 10000 --concurrency 8
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from aiosmtpd.controller import Controller  # noqa: E402
+from sqlalchemy import insert  # noqa: E402
+from models import db, Reminder, User  # noqa: E402
+from utils.database import make_engine  # noqa: E402
+from utils.notification import DeliveryPipeline, ReminderNotifier, SMTPConnectionPool  # noqa: E402
+
+
+class CountingHandler:
+    def __init__(self, fail_every=0):
+        self.received = 0
+        self.fail_every = fail_every
+        self.calls = 0
+
+    async def handle_DATA(self, server, session, envelope):
+        self.calls += 1
+        if self.fail_every and self.calls % self.fail_every == 0:
+            return '451 Try again later'
+        self.received += 1
+        return '250 OK'
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--users', type=int, default=2000)
+    parser.add_argument('--reminders', type=int, default=10000)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--fail-every', type=int, default=50, help='answer every Nth DATA with a 451')
+    parser.add_argument('--port', type=int, default=8025)
+    args = parser.parse_args()
+
+    handler = CountingHandler(args.fail_every)
+    controller = Controller(handler, hostname='127.0.0.1', port=args.port)
+    controller.start()
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            engine = make_engine('sqlite:///' + os.path.join(tmp, 'bench.db'))
+            db.metadata.create_all(engine)
+            now = datetime(2024, 1, 1)
+            rng = random.Random(3)
+            with engine.begin() as conn:
+                conn.execute(insert(User.__table__), [
+                    {'username': 'user%d' % i, 'email': 'user%d@example.com' % i, '_password': 'x'}
+                    for i in range(1, args.users + 1)
+                ])
+                conn.execute(insert(Reminder.__table__), [
+                    {'title': 'Revise chapter %d' % i, 'description': 'Flashcards', 'owner_id': rng.randrange(1, args.users + 1),
+                     'reminder_time': now + timedelta(seconds=rng.randrange(60))}
+                    for i in range(args.reminders)
+                ])
+
+            pool = SMTPConnectionPool(host='127.0.0.1', port=args.port, size=args.concurrency)
+            pipeline = DeliveryPipeline(pool, concurrency=args.concurrency, backoff=0.01)
+            notifier = ReminderNotifier(engine, pipeline)
+
+            began = time.perf_counter()
+            futures = notifier(list(range(1, args.reminders + 1)))
+            results = [future.result() for future in futures]
+            elapsed = time.perf_counter() - began
+
+            stats = pipeline.stats()
+            print('{} reminders -> {} digests in {:.2f}s: {:.0f} messages/s'.format(
+                args.reminders, len(results), elapsed, stats['sent'] / elapsed))
+            print('sent {sent}, failed {failed}, retried {retried}; server accepted {received}'.format(
+                received=handler.received, **stats))
+            pipeline.shutdown()
+    finally:
+        controller.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+"""
+Query-plan and latency comparison for owner-scoped lookups before and after
+migration 004_create_study_indexes.sql.
+
+    python benchmarks/bench_owner_indexes.py --rows 1000000 --users 10000
+"""
+import argparse
+import os
+import random
+import sqlite3
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+MIGRATIONS = os.path.join(os.path.dirname(__file__), '..', '..', 'frontend', 'database', 'migrations')
+
+QUERIES = [
+    ('list study_plan', 'SELECT * FROM study_plan WHERE owner_id = ? ORDER BY id LIMIT 50', lambda u, i: (u,)),
+    ('get study_plan', 'SELECT * FROM study_plan WHERE id = ? AND owner_id = ?', lambda u, i: (i, u)),
+    ('list study_material', 'SELECT * FROM study_material WHERE owner_id = ? ORDER BY id LIMIT 50', lambda u, i: (u,)),
+    ('sessions of plan', 'SELECT * FROM study_session WHERE study_plan_id = ?', lambda u, i: (i,)),
+    ('upcoming plans', 'SELECT * FROM study_plan WHERE owner_id = ? AND due_date >= ? ORDER BY due_date LIMIT 10',
+     lambda u, i: (u, '2024-06-01 00:00:00')),
+    ('list reminder', 'SELECT * FROM reminder WHERE owner_id = ? ORDER BY reminder_time, id LIMIT 50', lambda u, i: (u,)),
+    ('due reminders', 'SELECT id FROM reminder WHERE reminder_time >= ? AND reminder_time < ? ORDER BY reminder_time',
+     lambda u, i: ('2024-06-01 00:00:00', '2024-06-01 00:05:00')),
+]
+
+
+def read_migration(name):
+    with open(os.path.join(MIGRATIONS, name)) as f:
+        return f.read()
+
+
+def seed(conn, rows, users):
+    conn.executescript(read_migration('002_create_study_plans_table.sql'))
+    start = datetime(2024, 1, 1)
+    rng = random.Random(42)
+    per_table = rows // 4
+
+    def timestamp():
+        return (start + timedelta(minutes=rng.randrange(525600))).strftime('%Y-%m-%d %H:%M:%S')
+
+    conn.executemany(
+        'INSERT INTO study_plan (title, description, due_date, owner_id) VALUES (?, ?, ?, ?)',
+        (('t%d' % i, 'd', timestamp(), rng.randrange(users)) for i in range(per_table))
+    )
+    conn.executemany(
+        'INSERT INTO study_material (title, description, link, due_date, owner_id) VALUES (?, ?, ?, ?, ?)',
+        (('t%d' % i, 'd', 'http://x', timestamp(), rng.randrange(users)) for i in range(per_table))
+    )
+    conn.executemany(
+        'INSERT INTO study_session (title, description, due_date, owner_id, study_plan_id) VALUES (?, ?, ?, ?, ?)',
+        (('t%d' % i, 'd', timestamp(), rng.randrange(users), rng.randrange(1, per_table + 1))
+         for i in range(per_table))
+    )
+    conn.executemany(
+        'INSERT INTO reminder (title, description, reminder_time, owner_id) VALUES (?, ?, ?, ?)',
+        (('t%d' % i, 'd', timestamp(), rng.randrange(users)) for i in range(per_table))
+    )
+    conn.commit()
+
+
+def measure(conn, users, rows, iterations):
+    rng = random.Random(7)
+    results = {}
+    for label, sql, params in QUERIES:
+        plan = ' | '.join(row[3] for row in conn.execute('EXPLAIN QUERY PLAN ' + sql, params(1, 1)))
+        began = time.perf_counter()
+        for _ in range(iterations):
+            conn.execute(sql, params(rng.randrange(users), rng.randrange(1, rows // 4))).fetchall()
+        results[label] = (plan, (time.perf_counter() - began) / iterations * 1000)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--users', type=int, default=10000)
+    parser.add_argument('--iterations', type=int, default=200)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = sqlite3.connect(os.path.join(tmp, 'bench.db'))
+        began = time.perf_counter()
+        seed(conn, args.rows, args.users)
+        print('seeded {} rows in {:.1f}s'.format(args.rows, time.perf_counter() - began))
+
+        before = measure(conn, args.users, args.rows, args.iterations)
+        conn.executescript(read_migration('004_create_study_indexes.sql'))
+        after = measure(conn, args.users, args.rows, args.iterations)
+
+        for label, _, _ in QUERIES:
+            print('\n' + label)
+            print('  before {:9.3f} ms  {}'.format(before[label][1], before[label][0]))
+            print('  after  {:9.3f} ms  {}'.format(after[label][1], after[label][0]))
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
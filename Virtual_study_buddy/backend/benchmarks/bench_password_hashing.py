@@ -0,0 +1,55 @@
+"""
+Logins/sec for bcrypt verification inline versus through the hashing pool.
+
+    python benchmarks/bench_password_hashing.py --rounds 12 --logins 200
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from utils.hashing import HashingQueueFull, PasswordHasher, _check_password, _hash_password  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rounds', type=int, default=12)
+    parser.add_argument('--logins', type=int, default=200)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--threads', type=int, default=32, help='concurrent request threads')
+    args = parser.parse_args()
+
+    password = 'Correct-Horse-9'
+    hashed = _hash_password(password, args.rounds)
+
+    began = time.perf_counter()
+    for _ in range(args.logins):
+        _check_password(hashed, password)
+    inline = args.logins / (time.perf_counter() - began)
+    print('inline:  {:8.1f} logins/s (1 core)'.format(inline))
+
+    hasher = PasswordHasher(workers=args.workers, max_pending=args.workers * 4, rounds=args.rounds)
+    hasher.check(hashed, password)
+
+    def login(_):
+        try:
+            return hasher.check(hashed, password)
+        except HashingQueueFull:
+            return None
+
+    began = time.perf_counter()
+    with ThreadPoolExecutor(args.threads) as threads:
+        results = list(threads.map(login, range(args.logins)))
+    elapsed = time.perf_counter() - began
+    rejected = results.count(None)
+    accepted = args.logins - rejected
+    print('pooled:  {:8.1f} logins/s ({} workers, {:.1f}/s per core), {} rejected with 503'.format(
+        accepted / elapsed, args.workers, accepted / elapsed / args.workers, rejected))
+    hasher.shutdown()
+
+
+if __name__ == '__main__':
+    main()
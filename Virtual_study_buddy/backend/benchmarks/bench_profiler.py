@@ -0,0 +1,54 @@
+"""
+Cost of the sampling profiler: a CPU-bound route requested through the
+test client with the profiler off, then while a profile samples every
+request, and the size of what it wrote.
+
+    python benchmarks/bench_profiler.py --requests 300 --interval-ms 5
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from flask import Flask
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from utils.profiler import Profile  # noqa: E402
+
+
+def timed(client, requests):
+    began = time.perf_counter()
+    for number in range(requests):
+        client.get('/study_plans/%d' % number)
+    return (time.perf_counter() - began) / requests
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--requests', type=int, default=300)
+    parser.add_argument('--interval-ms', type=float, default=5)
+    args = parser.parse_args()
+
+    app = Flask(__name__)
+
+    @app.route('/study_plans/<int:study_plan_id>')
+    def get_plan(study_plan_id):
+        return {'id': study_plan_id, 'score': sum(i * i for i in range(20000))}
+
+    client = app.test_client()
+    timed(client, 50)
+    off = min(timed(client, args.requests) for _ in range(3))
+    with tempfile.TemporaryDirectory() as tmp:
+        profile = Profile(app, 600, args.interval_ms / 1000, directory=tmp).start()
+        on = min(timed(client, args.requests) for _ in range(3))
+        profile.stop()
+        size = sum(os.path.getsize(path) for path in profile.files)
+    print('profiler off     {:8.3f} ms/request'.format(off * 1000))
+    print('profiler on      {:8.3f} ms/request  (+{:.1f}%)'.format(on * 1000, (on / off - 1) * 100))
+    print('samples          {:8d}  in {} file(s), {} bytes'.format(sum(profile.samples.values()),
+                                                                  len(profile.files), size))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+"""
+Fit time and query latency of the TF-IDF material recommender on a synthetic
+catalog with a Zipf-distributed vocabulary.
+
+    python benchmarks/bench_recommendation.py --materials 100000 1000000
+"""
+import argparse
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from utils.recommendation import MaterialRecommender  # noqa: E402
+
+
+def synthetic_documents(count, vocabulary_size=50000, topics=0, topic_words=40, seed=0):
+    """
+    Documents of Zipf-distributed terms. With `topics`, 60% of each
+    document's terms are drawn from the word list of one random topic
+    instead, so materials have real neighbours.
+    """
+    rng = np.random.default_rng(seed)
+    words = np.array(['w%d' % i for i in range(vocabulary_size)])
+    lengths = rng.integers(5, 40, size=count)
+    terms = np.minimum(rng.zipf(1.3, size=int(lengths.sum())), vocabulary_size) - 1
+    if topics:
+        topic_terms = rng.integers(0, vocabulary_size, size=(topics, topic_words))
+        document_topics = np.repeat(rng.integers(0, topics, size=count), lengths)
+        on_topic = rng.random(len(terms)) < 0.6
+        terms[on_topic] = topic_terms[document_topics[on_topic], rng.integers(0, topic_words, size=int(on_topic.sum()))]
+    offset = 0
+    for material_id, length in enumerate(lengths, start=1):
+        chunk = words[terms[offset:offset + length]]
+        offset += length
+        yield material_id, ' '.join(chunk[:4]), ' '.join(chunk[4:]), ','.join(chunk[:2])
+
+
+def percentile(values, q):
+    return float(np.percentile(values, q)) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--materials', type=int, nargs='+', default=[100000, 1000000])
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--profile-size', type=int, default=20)
+    parser.add_argument('-k', type=int, default=10)
+    args = parser.parse_args()
+
+    for count in args.materials:
+        began = time.perf_counter()
+        recommender = MaterialRecommender.fit(synthetic_documents(count))
+        fit = time.perf_counter() - began
+
+        rng = np.random.default_rng(1)
+        latencies = []
+        for _ in range(args.queries):
+            profile = rng.integers(1, count + 1, size=args.profile_size).tolist()
+            began = time.perf_counter()
+            recommender.recommend(profile, args.k)
+            latencies.append(time.perf_counter() - began)
+
+        print('{:>9} materials, {} terms, nnz {}: fit {:.1f}s, query p50 {:.2f} ms, p95 {:.2f} ms'.format(
+            count, len(recommender.vocabulary), recommender.tf.nnz, fit,
+            percentile(latencies, 50), percentile(latencies, 95)))
+
+
+if __name__ == '__main__':
+    main()
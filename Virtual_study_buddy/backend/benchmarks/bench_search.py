@@ -0,0 +1,97 @@
+"""
+Latency of owner-scoped FTS5 search (/search) on a large synthetic catalog.
+Rows are inserted through the base tables, so the sync triggers build the
+index, and the insert rate with triggers is reported too.
+
+    python benchmarks/bench_search.py --rows 1000000 --owners 10000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import numpy as np
+from flask import Flask
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from sqlalchemy import insert  # noqa: E402
+from bench_recommendation import percentile, synthetic_documents  # noqa: E402
+from models import db, StudyMaterial, StudyPlan  # noqa: E402
+from utils.database import init_app  # noqa: E402
+from utils.search import search  # noqa: E402
+
+
+def seed(model, count, owners, seed_value, chunk=50000):
+    rng = np.random.default_rng(seed_value)
+    batch = []
+    for _, title, description, tags in synthetic_documents(count, topics=max(count // 50, 1), seed=seed_value):
+        row = {'title': title[:60], 'description': description, 'tags': tags[:100],
+               'owner_id': int(rng.integers(1, owners + 1))}
+        if model is StudyMaterial:
+            row['link'] = 'https://example.com'
+        batch.append(row)
+        if len(batch) == chunk:
+            db.session.execute(insert(model.__table__), batch)
+            batch = []
+    if batch:
+        db.session.execute(insert(model.__table__), batch)
+    db.session.commit()
+
+
+def run_queries(owners, queries, rng):
+    latencies = []
+    hits = []
+    for terms in queries:
+        owner = int(rng.integers(1, owners + 1))
+        began = time.perf_counter()
+        rows, _ = search(owner, ' '.join(terms), limit=20)
+        latencies.append(time.perf_counter() - began)
+        hits.append(len(rows))
+    return latencies, hits
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=1000000, help='materials; plans are a tenth of this')
+    parser.add_argument('--owners', type=int, default=10000)
+    parser.add_argument('--queries', type=int, default=500)
+    parser.add_argument('--database', help='reuse a database seeded by an earlier run')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = Flask(__name__)
+        app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + (args.database or os.path.join(tmp, 'bench.db'))
+        init_app(app)
+        with app.app_context():
+            if not args.database or not os.path.exists(args.database):
+                db.create_all()
+                began = time.perf_counter()
+                seed(StudyMaterial, args.rows, args.owners, 1)
+                seed(StudyPlan, args.rows // 10, args.owners, 2)
+                elapsed = time.perf_counter() - began
+                total = args.rows + args.rows // 10
+                print('inserted {} rows through the FTS triggers in {:.1f}s ({:.0f} rows/s)'.format(
+                    total, elapsed, total / elapsed))
+
+            # One- and two-word queries from real titles (search() matches the
+            # last word as a prefix). The synthetic Zipf head (w0-w99) occurs
+            # in most rows, like stop words in real text, and is reported
+            # apart: bm25() walks the whole doclist of every query term.
+            rng = np.random.default_rng(3)
+            words = [word for _, title, _, _ in synthetic_documents(2000, topics=max(args.rows // 50, 1), seed=1)
+                     for word in title.split()]
+            topical = [word for word in words if int(word[1:]) >= 100]
+            head = [word for word in words if int(word[1:]) < 100]
+            for label, pool in (('topical', topical), ('head-term', head)):
+                queries = []
+                for _ in range(args.queries):
+                    queries.append(list(rng.choice(pool, size=int(rng.integers(1, 3)))))
+                latencies, hits = run_queries(args.owners, queries, rng)
+                print('{} {} queries: p50 {:.2f} ms, p95 {:.2f} ms, p99 {:.2f} ms, {:.1f} results per page'.format(
+                    args.queries, label, percentile(latencies, 50), percentile(latencies, 95),
+                    percentile(latencies, 99), np.mean(hits)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+"""
+List serialization throughput (rows/s): ORM objects turned into dicts
+column by column and encoded with the standard json module, against Core
+rows mapped by the precompiled serializer and encoded by JSONProvider
+(orjson when installed).
+
+    python benchmarks/bench_serializers.py --rows 50000
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+from flask import Flask
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from models import db, StudyPlan  # noqa: E402
+from utils.database import init_app  # noqa: E402
+from utils.serializers import JSONProvider, orjson, serialize_rows  # noqa: E402
+from utils.streaming import _default  # noqa: E402
+
+
+def to_dict(obj):
+    return {column.key: getattr(obj, column.key) for column in obj.__table__.columns}
+
+
+def timed(label, rows, run, repeat=3):
+    best = min(_once(run) for _ in range(repeat))
+    print('{:28} {:.0f} rows/s'.format(label, rows / best))
+
+
+def _once(run):
+    began = time.perf_counter()
+    run()
+    return time.perf_counter() - began
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=50000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = Flask(__name__)
+        app.json = JSONProvider(app)
+        app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + os.path.join(tmp, 'bench.db')
+        init_app(app)
+        with app.app_context():
+            db.create_all()
+            db.session.execute(StudyPlan.__table__.insert(), [
+                {'title': 'Plan %d' % i, 'description': 'Chapter %d review and exercises' % i,
+                 'tags': 'week %d, exam' % (i % 12), 'priority': i % 5, 'progress': i % 100,
+                 'due_date': datetime(2024, 3, 1, 9, i % 60), 'owner_id': 1}
+                for i in range(args.rows)
+            ])
+            db.session.commit()
+            print('encoder: {}'.format('orjson' if orjson is not None else 'json'))
+
+            def orm():
+                db.session.expunge_all()
+                plans = StudyPlan.query.filter_by(owner_id=1).all()
+                json.dumps({'study_plans': [to_dict(plan) for plan in plans]}, default=_default)
+
+            def core():
+                rows = db.session.query(*StudyPlan.__table__.c).filter(StudyPlan.owner_id == 1).all()
+                app.json.dumps({'study_plans': serialize_rows(rows)})
+
+            timed('orm + to_dict + json', args.rows, orm)
+            timed('core + serializer + provider', args.rows, core)
+
+            rows = db.session.query(*StudyPlan.__table__.c).filter(StudyPlan.owner_id == 1).all()
+            timed('serialize + encode only', args.rows, lambda: app.json.dumps(serialize_rows(rows)))
+            timed('dict(row._mapping) + json', args.rows,
+                  lambda: json.dumps([dict(row._mapping) for row in rows], default=_default))
+
+
+if __name__ == '__main__':
+    main()
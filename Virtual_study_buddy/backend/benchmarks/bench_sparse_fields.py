@@ -0,0 +1,70 @@
+"""
+Payload size and latency of a /study_plans page with every column against
+a dashboard projection (?fields=title,priority,progress,due_date), for
+plans with long descriptions and comments.
+
+    python benchmarks/bench_sparse_fields.py --rows 20000 --text 2000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from flask import Flask
+from flask_jwt_extended import JWTManager, create_access_token
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from controllers.study_plan_controller import study_plan_blueprint  # noqa: E402
+from models import db, StudyPlan, User  # noqa: E402
+from utils.database import init_app  # noqa: E402
+from utils.serializers import JSONProvider  # noqa: E402
+
+PROJECTION = 'title,priority,progress,due_date'
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=20000)
+    parser.add_argument('--text', type=int, default=2000, help='characters of description and of comments')
+    parser.add_argument('--requests', type=int, default=200)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = Flask(__name__)
+        app.json = JSONProvider(app)
+        app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + os.path.join(tmp, 'bench.db')
+        app.config['JWT_SECRET_KEY'] = 'bench-secret-key-of-sufficient-length'
+        JWTManager(app)
+        init_app(app)
+        app.register_blueprint(study_plan_blueprint)
+        with app.app_context():
+            db.create_all()
+            db.session.execute(User.__table__.insert(), [{'username': 'bench', 'email': 'bench@example.com', '_password': 'x'}])
+            text = ('lorem ipsum dolor sit amet ' * (args.text // 27 + 1))[:args.text]
+            db.session.execute(StudyPlan.__table__.insert(), [
+                {'title': 'Plan %d' % i, 'description': text, 'comments': text, 'priority': i % 5, 'owner_id': 1}
+                for i in range(args.rows)
+            ])
+            db.session.commit()
+            headers = {'Authorization': 'Bearer ' + create_access_token(identity='bench@example.com')}
+
+        client = app.test_client()
+        for label, query in (('all columns', ''), ('fields=' + PROJECTION, '&fields=' + PROJECTION)):
+            url = '/study_plans?limit=200' + query
+            size = len(client.get(url, headers=headers).data)
+            began = time.perf_counter()
+            for _ in range(args.requests):
+                client.get(url, headers=headers)
+            elapsed = (time.perf_counter() - began) / args.requests
+            print('{:48} {:8} bytes/page  {:.2f} ms/page'.format(label, size, elapsed * 1000))
+
+            url = '/study_plans?' + query.lstrip('&')
+            began = time.perf_counter()
+            size = len(client.get(url, headers=dict(headers, Accept='application/x-ndjson')).data)
+            elapsed = time.perf_counter() - began
+            print('{:48} {:8} bytes     {:.2f} ms'.format('  ndjson, all {} rows'.format(args.rows), size, elapsed * 1000))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+"""
+Delta sync against re-downloading everything: rows, bytes and time for a
+client that syncs after a handful of edits to a large account.
+
+    python benchmarks/bench_sync.py --rows 20000 --edits 20
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from flask import Flask
+from flask_jwt_extended import JWTManager, create_access_token
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from controllers.study_plan_controller import study_plan_blueprint  # noqa: E402
+from models import db, User  # noqa: E402
+from utils import sync  # noqa: E402
+from utils.batch import apply_batch  # noqa: E402
+from utils.database import init_app  # noqa: E402
+from utils.serializers import JSONProvider  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=20000, help='per item type')
+    parser.add_argument('--edits', type=int, default=20)
+    args = parser.parse_args()
+    sync.SYNC_SETTLE_SECONDS = 0
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = Flask(__name__)
+        app.json = JSONProvider(app)
+        app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + os.path.join(tmp, 'bench.db')
+        app.config['JWT_SECRET_KEY'] = 'bench-secret-key-of-sufficient-length'
+        JWTManager(app)
+        init_app(app)
+        app.register_blueprint(study_plan_blueprint)
+        with app.app_context():
+            db.create_all()
+            db.session.execute(User.__table__.insert(), [{'username': 'bench', 'email': 'bench@example.com', '_password': 'x'}])
+            data = {'plans': {}, 'materials': {'link': 'https://example.com'}, 'reminders': {'reminder_time': '2030-01-01T09:00:00'}}
+            ids = {}
+            for kind, extra in data.items():
+                for offset in range(0, args.rows, 500):
+                    operations = [{'op': 'create', 'data': dict(extra, title='Item %d' % i, description='Notes %d' % i)}
+                                  for i in range(offset, min(offset + 500, args.rows))]
+                    ids.setdefault(kind, []).extend(result['id'] for result in apply_batch(db.session, kind, 1, operations))
+                    db.session.commit()
+            headers = {'Authorization': 'Bearer ' + create_access_token(identity='bench@example.com')}
+
+        client = app.test_client()
+        cursor = None
+        began = time.perf_counter()
+        rows = size = 0
+        while True:
+            response = client.get('/sync?limit=5000' + ('&since=' + cursor if cursor else ''), headers=headers)
+            body = response.get_json()
+            rows += len(body['changes'])
+            size += len(response.data)
+            cursor = body['next_cursor']
+            if not body['has_more']:
+                break
+        elapsed = time.perf_counter() - began
+        print('full sync   {:7} changes {:10} bytes  {:8.1f} ms'.format(rows, size, elapsed * 1000))
+
+        with app.app_context():
+            for kind in data:
+                apply_batch(db.session, kind, 1, [{'op': 'update', 'id': item_id, 'data': {'priority': 4}}
+                                                  for item_id in ids[kind][:args.edits // 2]] +
+                            [{'op': 'delete', 'id': item_id} for item_id in ids[kind][-(args.edits // 2):]])
+                db.session.commit()
+        began = time.perf_counter()
+        response = client.get('/sync?since=' + cursor, headers=headers)
+        elapsed = time.perf_counter() - began
+        print('delta sync  {:7} changes {:10} bytes  {:8.1f} ms'.format(len(response.get_json()['changes']),
+                                                                         len(response.data), elapsed * 1000))
+
+
+if __name__ == '__main__':
+    main()
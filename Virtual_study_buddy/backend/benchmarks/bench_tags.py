@@ -0,0 +1,94 @@
+"""
+Tag filtering from the normalised tag index versus LIKE scans over the tags
+strings, plus backfill throughput and per-user tag counts.
+
+    python benchmarks/bench_tags.py --materials 1000000 --owners 10000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import numpy as np
+from flask import Flask
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from sqlalchemy import and_, insert, or_  # noqa: E402
+from bench_recommendation import percentile  # noqa: E402
+from models import db, StudyMaterial  # noqa: E402
+from utils.database import init_app  # noqa: E402
+from utils.tags import backfill, tag_counts, tag_filter  # noqa: E402
+
+
+def timed(queries):
+    latencies = []
+    for query in queries:
+        began = time.perf_counter()
+        query()
+        latencies.append(time.perf_counter() - began)
+    return percentile(latencies, 50), percentile(latencies, 95)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--materials', type=int, default=1000000)
+    parser.add_argument('--owners', type=int, default=10000)
+    parser.add_argument('--vocabulary', type=int, default=2000)
+    parser.add_argument('--queries', type=int, default=300)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    names = ['topic{}'.format(i) for i in range(args.vocabulary)]
+    with tempfile.TemporaryDirectory() as tmp:
+        app = Flask(__name__)
+        app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + os.path.join(tmp, 'bench.db')
+        init_app(app)
+        with app.app_context():
+            db.create_all()
+            tag_draws = np.minimum(rng.zipf(1.5, size=(args.materials, 3)), args.vocabulary) - 1
+            owners = rng.integers(1, args.owners + 1, size=args.materials)
+            for offset in range(0, args.materials, 50000):
+                db.session.execute(insert(StudyMaterial.__table__), [
+                    {'title': 'm', 'description': 'd', 'link': 'l', 'owner_id': int(owners[i]),
+                     'tags': ', '.join(names[j] for j in tag_draws[i])}
+                    for i in range(offset, min(offset + 50000, args.materials))
+                ])
+            db.session.commit()
+
+            began = time.perf_counter()
+            backfill(db.engine, item_types=['materials'])
+            elapsed = time.perf_counter() - began
+            print('backfill: {:.1f}s ({:.0f} rows/s)'.format(elapsed, args.materials / elapsed))
+
+            cases = []
+            for _ in range(args.queries):
+                owner = int(rng.integers(1, args.owners + 1))
+                wanted = [names[j] for j in np.minimum(rng.zipf(1.5, size=2), args.vocabulary) - 1]
+                cases.append((owner, wanted))
+
+            def like(owner, wanted, combine):
+                return lambda: StudyMaterial.query.filter_by(owner_id=owner).filter(
+                    combine(*[StudyMaterial.tags.like('%{}%'.format(name)) for name in wanted])).limit(50).all()
+
+            def indexed(owner, wanted, mode):
+                return lambda: StudyMaterial.query.filter_by(owner_id=owner).filter(
+                    tag_filter('materials', owner, wanted, mode)).limit(50).all()
+
+            for label, mode, combine in (('AND', 'all', and_), ('OR', 'any', or_)):
+                print('{}: LIKE p50 {:.2f} ms p95 {:.2f} ms | tag index p50 {:.2f} ms p95 {:.2f} ms'.format(
+                    label, *timed(like(owner, wanted, combine) for owner, wanted in cases),
+                    *timed(indexed(owner, wanted, mode) for owner, wanted in cases)))
+
+            # Substring matching also returns wrong rows: 'topic1' matches
+            # 'topic12', 'topic100', ...
+            owner, wanted = cases[0][0], ['topic1']
+            print('false positives of LIKE for {}: {}'.format(wanted[0], len(like(owner, wanted, and_)())
+                                                              - len(indexed(owner, wanted, 'all')())))
+
+            p50, p95 = timed(lambda owner=owner: tag_counts(owner) for owner, _ in cases)
+            print('per-user tag counts: p50 {:.2f} ms p95 {:.2f} ms'.format(p50, p95))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,342 +1,594 @@
-from flask import Blueprint, jsonify, request
-from flask_jwt_extended import jwt_required, get_jwt_identity
-from models import db, StudyPlan, StudyMaterial, StudySession, Reminder
+from flask import Blueprint, jsonify, request, send_file, url_for
+from flask_jwt_extended import jwt_required
+from models import db, User, StudyPlan, StudyMaterial, StudySession, Reminder
 from sqlalchemy.exc import SQLAlchemyError
+from utils.batch import InvalidBatchRequest, apply_batch, parse_batch
+from utils.bulk_import import IMPORT_FORMATS, InvalidImportRequest, import_stream
+from utils.dashboard import UPCOMING, dashboard_options
+from utils.export import (ARCHIVE_MIMETYPES, ARCHIVE_SUFFIXES, InvalidExportRequest, export_status,
+                          get_export, get_export_worker, request_export)
+from utils.identity import UnknownUser, current_user_id
+from utils.pagination import InvalidCursor, parse_page_args, paginate
+from utils.recommendation import get_ann_index, get_recommender
+from utils.search import SEARCH_TABLES, highlight, search
+from utils.streaming import stream_ndjson, wants_ndjson
+from utils.sync import CursorExpired, changes_since, parse_sync_args
+from utils.tags import TAGGED, InvalidTagFilter, parse_tag_args, tag_counts, tag_filter
+from utils.versions import etagged
+from utils.serializers import InvalidFields, parse_fields, serialize, serialize_objects, serialize_rows
+from utils.writes import create_item, delete_item, update_item
+
+PROFILE_SIZE = 200
+# The index holds every material; ranked candidates are fetched this many
+# times over so that enough remain once non-public ones are dropped.
+CANDIDATE_FACTOR = 4
 
 study_plan_blueprint = Blueprint('study_plan', __name__)
 
 
+@study_plan_blueprint.errorhandler(UnknownUser)
+def unknown_user(error):
+    return jsonify({'message': str(error)}), 401
+
+
 @study_plan_blueprint.route('/study_plans', methods=['GET'])
 @jwt_required()
+@etagged('plans')
 def get_study_plans():
-    user_id = get_jwt_identity()
-    study_plans = StudyPlan.query.filter_by(owner_id=user_id).all()
+    user_id = current_user_id()
+    try:
+        limit, after = parse_page_args(request.args)
+        tag_names, tag_mode = parse_tag_args(request.args)
+        columns = parse_fields(request.args, StudyPlan)
+        query = db.session.query(*columns).filter(StudyPlan.owner_id == user_id)
+        if tag_names:
+            query = query.filter(tag_filter('plans', user_id, tag_names, tag_mode))
+        if wants_ndjson(request):
+            return stream_ndjson(query.order_by(StudyPlan.id))
+        study_plans, next_cursor = paginate(query, [StudyPlan.id], limit, after)
+    except (InvalidCursor, InvalidTagFilter, InvalidFields) as e:
+        return jsonify({'message': str(e)}), 400
     if study_plans:
-        study_plan_dicts = [study_plan.to_dict() for study_plan in study_plans]
-        return jsonify({'study_plans': study_plan_dicts}), 200
+        study_plan_dicts = serialize_rows(study_plans)
+        return jsonify({'study_plans': study_plan_dicts, 'next_cursor': next_cursor}), 200
     else:
         return jsonify({'message': 'No study plans found'}), 200
 
 @study_plan_blueprint.route('/study_plans', methods=['POST'])
 @jwt_required()
 def create_study_plan():
-    user_id = get_jwt_identity()
+    user_id = current_user_id()
     data = request.get_json()
-    if data and 'title' in data and 'description' in data:
-        try:
-            new_study_plan = StudyPlan(
-                title=data['title'],
-                description=data['description'],
-                tags=data.get('tags'),
-                attachments=data.get('attachments'),
-                comments=data.get('comments'),
-                priority=data.get('priority', 1),
-                progress=data.get('progress', 0),
-                due_date=data.get('due_date'),
-                owner_id=user_id
-            )
-            db.session.add(new_study_plan)
-            db.session.commit()
-            return jsonify({'message': 'StudyPlan created successfully', 'study_plan': new_study_plan.to_dict()}), 201
-        except SQLAlchemyError as e:
-            db.session.rollback()
-            return jsonify({'error': str(e)}), 500
-    else:
-        return jsonify({'message': 'Title and description are required'}), 400
+    if not data:
+        return jsonify({'message': 'Invalid request'}), 400
+    try:
+        new_study_plan = create_item(db.session, 'plans', user_id, data)
+        db.session.commit()
+    except ValueError as e:
+        db.session.rollback()
+        return jsonify({'message': str(e)}), 400
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+    return jsonify({'message': 'StudyPlan created successfully', 'study_plan': serialize(new_study_plan)}), 201
 
 @study_plan_blueprint.route('/study_plans/<int:study_plan_id>', methods=['GET'])
 @jwt_required()
+@etagged('plans')
 def get_study_plan_by_id(study_plan_id):
-    user_id = get_jwt_identity()
-    study_plan = StudyPlan.query.filter_by(id=study_plan_id, owner_id=user_id).first()
+    user_id = current_user_id()
+    try:
+        columns = parse_fields(request.args, StudyPlan)
+    except InvalidFields as e:
+        return jsonify({'message': str(e)}), 400
+    study_plan = db.session.query(*columns).filter(StudyPlan.id == study_plan_id, StudyPlan.owner_id == user_id).first()
     if study_plan:
-        return jsonify({'study_plan': study_plan.to_dict()}), 200
+        return jsonify({'study_plan': serialize(study_plan)}), 200
     else:
         return jsonify({'message': 'StudyPlan not found'}), 404
 
 @study_plan_blueprint.route('/study_plans/<int:study_plan_id>', methods=['PUT'])
 @jwt_required()
 def update_study_plan(study_plan_id):
-    user_id = get_jwt_identity()
-    study_plan = StudyPlan.query.filter_by(id=study_plan_id, owner_id=user_id).first()
+    user_id = current_user_id()
+    data = request.get_json()
+    if not data:
+        return jsonify({'message': 'Invalid request'}), 400
+    try:
+        study_plan = update_item(db.session, 'plans', user_id, study_plan_id, data)
+        db.session.commit()
+    except ValueError as e:
+        db.session.rollback()
+        return jsonify({'message': str(e)}), 400
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
     if study_plan:
-        data = request.get_json()
-        if data:
-            try:
-                for key, value in data.items():
-                    setattr(study_plan, key, value)
-                db.session.commit()
-                return jsonify({'message': 'StudyPlan updated successfully', 'study_plan': study_plan.to_dict()}), 200
-            except SQLAlchemyError as e:
-                db.session.rollback()
-                return jsonify({'error': str(e)}), 500
-        else:
-            return jsonify({'message': 'Invalid request'}), 400
+        return jsonify({'message': 'StudyPlan updated successfully', 'study_plan': serialize(study_plan)}), 200
     else:
         return jsonify({'message': 'StudyPlan not found'}), 404
 
 @study_plan_blueprint.route('/study_plans/<int:study_plan_id>', methods=['DELETE'])
 @jwt_required()
 def delete_study_plan(study_plan_id):
-    user_id = get_jwt_identity()
-    study_plan = StudyPlan.query.filter_by(id=study_plan_id, owner_id=user_id).first()
-    if study_plan:
-        try:
-            db.session.delete(study_plan)
-            db.session.commit()
-            return jsonify({'message': 'StudyPlan deleted successfully'}), 200
-        except SQLAlchemyError as e:
-            db.session.rollback()
-            return jsonify({'error': str(e)}), 500
+    user_id = current_user_id()
+    try:
+        deleted = delete_item(db.session, 'plans', user_id, study_plan_id)
+        db.session.commit()
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+    if deleted:
+        return jsonify({'message': 'StudyPlan deleted successfully'}), 200
     else:
         return jsonify({'message': 'StudyPlan not found'}), 404
 
 @study_plan_blueprint.route('/study_materials', methods=['GET'])
 @jwt_required()
+@etagged('materials')
 def get_study_materials():
-    user_id = get_jwt_identity()
-    study_materials = StudyMaterial.query.filter_by(owner_id=user_id).all()
+    user_id = current_user_id()
+    try:
+        limit, after = parse_page_args(request.args)
+        tag_names, tag_mode = parse_tag_args(request.args)
+        columns = parse_fields(request.args, StudyMaterial)
+        query = db.session.query(*columns).filter(StudyMaterial.owner_id == user_id)
+        if tag_names:
+            query = query.filter(tag_filter('materials', user_id, tag_names, tag_mode))
+        if wants_ndjson(request):
+            return stream_ndjson(query.order_by(StudyMaterial.id))
+        study_materials, next_cursor = paginate(query, [StudyMaterial.id], limit, after)
+    except (InvalidCursor, InvalidTagFilter, InvalidFields) as e:
+        return jsonify({'message': str(e)}), 400
     if study_materials:
-        study_material_dicts = [study_material.to_dict() for study_material in study_materials]
-        return jsonify({'study_materials': study_material_dicts}), 200
+        study_material_dicts = serialize_rows(study_materials)
+        return jsonify({'study_materials': study_material_dicts, 'next_cursor': next_cursor}), 200
     else:
         return jsonify({'message': 'No study materials found'}), 200
 
 @study_plan_blueprint.route('/study_materials', methods=['POST'])
 @jwt_required()
 def create_study_material():
-    user_id = get_jwt_identity()
+    user_id = current_user_id()
     data = request.get_json()
-    if data and 'title' in data and 'description' in data:
-        try:
-            new_study_material = StudyMaterial(
-                title=data['title'],
-                description=data['description'],
-                tags=data.get('tags'),
-                attachments=data.get('attachments'),
-                comments=data.get('comments'),
-                priority=data.get('priority', 1),
-                progress=data.get('progress', 0),
-                due_date=data.get('due_date'),
-                owner_id=user_id
-            )
-            db.session.add(new_study_material)
-            db.session.commit()
-            return jsonify({'message': 'StudyMaterial created successfully', 'study_material': new_study_material.to_dict()}), 201
-        except SQLAlchemyError as e:
-            db.session.rollback()
-            return jsonify({'error': str(e)}), 500
+    if not data:
+        return jsonify({'message': 'Invalid request'}), 400
+    try:
+        new_study_material = create_item(db.session, 'materials', user_id, data)
+        db.session.commit()
+    except ValueError as e:
+        db.session.rollback()
+        return jsonify({'message': str(e)}), 400
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+    return jsonify({'message': 'StudyMaterial created successfully', 'study_material': serialize(new_study_material)}), 201
+
+@study_plan_blueprint.route('/study_materials/recommendations', methods=['GET'])
+@jwt_required()
+def get_study_material_recommendations():
+    user_id = current_user_id()
+    try:
+        k = max(1, min(int(request.args.get('k', 10)), 100))
+    except ValueError:
+        return jsonify({'message': 'k must be an integer'}), 400
+    # Prefer the shared on-disk ANN index; fall back to exact search.
+    recommender = get_ann_index(db.engine) or get_recommender(db.engine)
+    own_ids = [
+        row.id for row in db.session.query(StudyMaterial.id)
+        .filter_by(owner_id=user_id).order_by(StudyMaterial.id.desc()).limit(PROFILE_SIZE)
+    ]
+    query = request.args.get('q')
+    candidates = k * CANDIDATE_FACTOR
+    if query:
+        vector = recommender.text_profile(query)
+        ranked = recommender.search(vector, candidates, exclude=own_ids) if vector is not None else []
     else:
-        return jsonify({'message': 'Title and description are required'}), 400
+        ranked = recommender.recommend(own_ids, candidates)
+    materials = StudyMaterial.query.filter(
+        StudyMaterial.id.in_([material_id for material_id, _ in ranked]),
+        StudyMaterial.is_public.is_(True),
+        StudyMaterial.owner_id != user_id,
+    ).all() if ranked else []
+    by_id = {material.id: material for material in materials}
+    recommendations = [
+        {'id': material_id, 'title': by_id[material_id].title, 'link': by_id[material_id].link, 'score': score}
+        for material_id, score in ranked if material_id in by_id
+    ][:k]
+    if not recommendations:
+        return jsonify({'message': 'No recommendations found'}), 200
+    return jsonify({'recommendations': recommendations}), 200
 
 @study_plan_blueprint.route('/study_materials/<int:study_material_id>', methods=['GET'])
 @jwt_required()
+@etagged('materials')
 def get_study_material_by_id(study_material_id):
-    user_id = get_jwt_identity()
-    study_material = StudyMaterial.query.filter_by(id=study_material_id, owner_id=user_id).first()
+    user_id = current_user_id()
+    try:
+        columns = parse_fields(request.args, StudyMaterial)
+    except InvalidFields as e:
+        return jsonify({'message': str(e)}), 400
+    study_material = db.session.query(*columns).filter(StudyMaterial.id == study_material_id, StudyMaterial.owner_id == user_id).first()
     if study_material:
-        return jsonify({'study_material': study_material.to_dict()}), 200
+        return jsonify({'study_material': serialize(study_material)}), 200
     else:
         return jsonify({'message': 'StudyMaterial not found'}), 404
 
 @study_plan_blueprint.route('/study_materials/<int:study_material_id>', methods=['PUT'])
 @jwt_required()
 def update_study_material(study_material_id):
-    user_id = get_jwt_identity()
-    study_material = StudyMaterial.query.filter_by(id=study_material_id, owner_id=user_id).first()
+    user_id = current_user_id()
+    data = request.get_json()
+    if not data:
+        return jsonify({'message': 'Invalid request'}), 400
+    try:
+        study_material = update_item(db.session, 'materials', user_id, study_material_id, data)
+        db.session.commit()
+    except ValueError as e:
+        db.session.rollback()
+        return jsonify({'message': str(e)}), 400
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
     if study_material:
-        data = request.get_json()
-        if data:
-            try:
-                for key, value in data.items():
-                    setattr(study_material, key, value)
-                db.session.commit()
-                return jsonify({'message': 'StudyMaterial updated successfully', 'study_material': study_material.to_dict()}), 200
-            except SQLAlchemyError as e:
-                db.session.rollback()
-                return jsonify({'error': str(e)}), 500
-        else:
-            return jsonify({'message': 'Invalid request'}), 400
+        return jsonify({'message': 'StudyMaterial updated successfully', 'study_material': serialize(study_material)}), 200
     else:
         return jsonify({'message': 'StudyMaterial not found'}), 404
 
 @study_plan_blueprint.route('/study_materials/<int:study_material_id>', methods=['DELETE'])
 @jwt_required()
 def delete_study_material(study_material_id):
-    user_id = get_jwt_identity()
-    study_material = StudyMaterial.query.filter_by(id=study_material_id, owner_id=user_id).first()
-    if study_material:
-        try:
-            db.session.delete(study_material)
-            db.session.commit()
-            return jsonify({'message': 'StudyMaterial deleted successfully'}), 200
-        except SQLAlchemyError as e:
-            db.session.rollback()
-            return jsonify({'error': str(e)}), 500
+    user_id = current_user_id()
+    try:
+        deleted = delete_item(db.session, 'materials', user_id, study_material_id)
+        db.session.commit()
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+    if deleted:
+        return jsonify({'message': 'StudyMaterial deleted successfully'}), 200
     else:
         return jsonify({'message': 'StudyMaterial not found'}), 404
 
 @study_plan_blueprint.route('/study_sessions', methods=['GET'])
 @jwt_required()
+@etagged('sessions')
 def get_study_sessions():
-    user_id = get_jwt_identity()
-    study_sessions = StudySession.query.filter_by(owner_id=user_id).all()
+    user_id = current_user_id()
+    try:
+        limit, after = parse_page_args(request.args)
+        tag_names, tag_mode = parse_tag_args(request.args)
+        columns = parse_fields(request.args, StudySession)
+        query = db.session.query(*columns).filter(StudySession.owner_id == user_id)
+        if tag_names:
+            query = query.filter(tag_filter('sessions', user_id, tag_names, tag_mode))
+        if wants_ndjson(request):
+            return stream_ndjson(query.order_by(StudySession.id))
+        study_sessions, next_cursor = paginate(query, [StudySession.id], limit, after)
+    except (InvalidCursor, InvalidTagFilter, InvalidFields) as e:
+        return jsonify({'message': str(e)}), 400
     if study_sessions:
-        study_session_dicts = [study_session.to_dict() for study_session in study_sessions]
-        return jsonify({'study_sessions': study_session_dicts}), 200
+        study_session_dicts = serialize_rows(study_sessions)
+        return jsonify({'study_sessions': study_session_dicts, 'next_cursor': next_cursor}), 200
     else:
         return jsonify({'message': 'No study sessions found'}), 200
 
 @study_plan_blueprint.route('/study_sessions', methods=['POST'])
 @jwt_required()
 def create_study_session():
-    user_id = get_jwt_identity()
+    user_id = current_user_id()
     data = request.get_json()
-    if data and 'title' in data and 'date' in data:
-        try:
-            new_study_session = StudySession(
-                title=data['title'],
-                date=data['date'],
-                duration=data.get('duration'),
-                description=data.get('description'),
-                attachments=data.get('attachments'),
-                comments=data.get('comments'),
-                owner_id=user_id
-            )
-            db.session.add(new_study_session)
-            db.session.commit()
-            return jsonify({'message': 'StudySession created successfully', 'study_session': new_study_session.to_dict()}), 201
-        except SQLAlchemyError as e:
-            db.session.rollback()
-            return jsonify({'error': str(e)}), 500
-    else:
-        return jsonify({'message': 'Title and date are required'}), 400
+    if not data:
+        return jsonify({'message': 'Invalid request'}), 400
+    try:
+        new_study_session = create_item(db.session, 'sessions', user_id, data)
+        db.session.commit()
+    except ValueError as e:
+        db.session.rollback()
+        return jsonify({'message': str(e)}), 400
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+    return jsonify({'message': 'StudySession created successfully', 'study_session': serialize(new_study_session)}), 201
 
 @study_plan_blueprint.route('/study_sessions/<int:study_session_id>', methods=['GET'])
 @jwt_required()
+@etagged('sessions')
 def get_study_session_by_id(study_session_id):
-    user_id = get_jwt_identity()
-    study_session = StudySession.query.filter_by(id=study_session_id, owner_id=user_id).first()
+    user_id = current_user_id()
+    try:
+        columns = parse_fields(request.args, StudySession)
+    except InvalidFields as e:
+        return jsonify({'message': str(e)}), 400
+    study_session = db.session.query(*columns).filter(StudySession.id == study_session_id, StudySession.owner_id == user_id).first()
     if study_session:
-        return jsonify({'study_session': study_session.to_dict()}), 200
+        return jsonify({'study_session': serialize(study_session)}), 200
     else:
         return jsonify({'message': 'StudySession not found'}), 404
 
 @study_plan_blueprint.route('/study_sessions/<int:study_session_id>', methods=['PUT'])
 @jwt_required()
 def update_study_session(study_session_id):
-    user_id = get_jwt_identity()
-    study_session = StudySession.query.filter_by(id=study_session_id, owner_id=user_id).first()
+    user_id = current_user_id()
+    data = request.get_json()
+    if not data:
+        return jsonify({'message': 'Invalid request'}), 400
+    try:
+        study_session = update_item(db.session, 'sessions', user_id, study_session_id, data)
+        db.session.commit()
+    except ValueError as e:
+        db.session.rollback()
+        return jsonify({'message': str(e)}), 400
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
     if study_session:
-        data = request.get_json()
-        if data:
-            try:
-                for key, value in data.items():
-                    setattr(study_session, key, value)
-                db.session.commit()
-                return jsonify({'message': 'StudySession updated successfully', 'study_session': study_session.to_dict()}), 200
-            except SQLAlchemyError as e:
-                db.session.rollback()
-                return jsonify({'error': str(e)}), 500
-        else:
-            return jsonify({'message': 'Invalid request'}), 400
+        return jsonify({'message': 'StudySession updated successfully', 'study_session': serialize(study_session)}), 200
     else:
         return jsonify({'message': 'StudySession not found'}), 404
 
 @study_plan_blueprint.route('/study_sessions/<int:study_session_id>', methods=['DELETE'])
 @jwt_required()
 def delete_study_session(study_session_id):
-    user_id = get_jwt_identity()
-    study_session = StudySession.query.filter_by(id=study_session_id, owner_id=user_id).first()
-    if study_session:
-        try:
-            db.session.delete(study_session)
-            db.session.commit()
-            return jsonify({'message': 'StudySession deleted successfully'}), 200
-        except SQLAlchemyError as e:
-            db.session.rollback()
-            return jsonify({'error': str(e)}), 500
+    user_id = current_user_id()
+    try:
+        deleted = delete_item(db.session, 'sessions', user_id, study_session_id)
+        db.session.commit()
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+    if deleted:
+        return jsonify({'message': 'StudySession deleted successfully'}), 200
     else:
         return jsonify({'message': 'StudySession not found'}), 404
 
 @study_plan_blueprint.route('/reminders', methods=['GET'])
 @jwt_required()
+@etagged('reminders')
 def get_reminders():
-    user_id = get_jwt_identity()
-    reminders = Reminder.query.filter_by(owner_id=user_id).all()
+    user_id = current_user_id()
+    try:
+        limit, after = parse_page_args(request.args)
+        tag_names, tag_mode = parse_tag_args(request.args)
+        columns = parse_fields(request.args, Reminder, ('reminder_time', 'id'))
+        query = db.session.query(*columns).filter(Reminder.owner_id == user_id)
+        if tag_names:
+            query = query.filter(tag_filter('reminders', user_id, tag_names, tag_mode))
+        if wants_ndjson(request):
+            return stream_ndjson(query.order_by(Reminder.reminder_time, Reminder.id))
+        reminders, next_cursor = paginate(query, [Reminder.reminder_time, Reminder.id], limit, after)
+    except (InvalidCursor, InvalidTagFilter, InvalidFields) as e:
+        return jsonify({'message': str(e)}), 400
     if reminders:
-        reminder_dicts = [reminder.to_dict() for reminder in reminders]
-        return jsonify({'reminders': reminder_dicts}), 200
+        reminder_dicts = serialize_rows(reminders)
+        return jsonify({'reminders': reminder_dicts, 'next_cursor': next_cursor}), 200
     else:
         return jsonify({'message': 'No reminders found'}), 200
 
 @study_plan_blueprint.route('/reminders', methods=['POST'])
 @jwt_required()
 def create_reminder():
-    user_id = get_jwt_identity()
+    user_id = current_user_id()
     data = request.get_json()
-    if data and 'title' in data and 'date' in data:
-        try:
-            new_reminder = Reminder(
-                title=data['title'],
-                date=data['date'],
-                description=data.get('description'),
-                owner_id=user_id
-            )
-            db.session.add(new_reminder)
-            db.session.commit()
-            return jsonify({'message': 'Reminder created successfully', 'reminder': new_reminder.to_dict()}), 201
-        except SQLAlchemyError as e:
-            db.session.rollback()
-            return jsonify({'error': str(e)}), 500
-    else:
-        return jsonify({'message': 'Title and date are required'}), 400
+    if not data:
+        return jsonify({'message': 'Invalid request'}), 400
+    try:
+        new_reminder = create_item(db.session, 'reminders', user_id, data)
+        db.session.commit()
+    except ValueError as e:
+        db.session.rollback()
+        return jsonify({'message': str(e)}), 400
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+    return jsonify({'message': 'Reminder created successfully', 'reminder': serialize(new_reminder)}), 201
 
 @study_plan_blueprint.route('/reminders/<int:reminder_id>', methods=['GET'])
 @jwt_required()
+@etagged('reminders')
 def get_reminder_by_id(reminder_id):
-    user_id = get_jwt_identity()
-    reminder = Reminder.query.filter_by(id=reminder_id, owner_id=user_id).first()
+    user_id = current_user_id()
+    try:
+        columns = parse_fields(request.args, Reminder)
+    except InvalidFields as e:
+        return jsonify({'message': str(e)}), 400
+    reminder = db.session.query(*columns).filter(Reminder.id == reminder_id, Reminder.owner_id == user_id).first()
     if reminder:
-        return jsonify({'reminder': reminder.to_dict()}), 200
+        return jsonify({'reminder': serialize(reminder)}), 200
     else:
         return jsonify({'message': 'Reminder not found'}), 404
 
 @study_plan_blueprint.route('/reminders/<int:reminder_id>', methods=['PUT'])
 @jwt_required()
 def update_reminder(reminder_id):
-    user_id = get_jwt_identity()
-    reminder = Reminder.query.filter_by(id=reminder_id, owner_id=user_id).first()
+    user_id = current_user_id()
+    data = request.get_json()
+    if not data:
+        return jsonify({'message': 'Invalid request'}), 400
+    try:
+        reminder = update_item(db.session, 'reminders', user_id, reminder_id, data)
+        db.session.commit()
+    except ValueError as e:
+        db.session.rollback()
+        return jsonify({'message': str(e)}), 400
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
     if reminder:
-        data = request.get_json()
-        if data:
-            try:
-                for key, value in data.items():
-                    setattr(reminder, key, value)
-                db.session.commit()
-                return jsonify({'message': 'Reminder updated successfully', 'reminder': reminder.to_dict()}), 200
-            except SQLAlchemyError as e:
-                db.session.rollback()
-                return jsonify({'error': str(e)}), 500
-        else:
-            return jsonify({'message': 'Invalid request'}), 400
+        return jsonify({'message': 'Reminder updated successfully', 'reminder': serialize(reminder)}), 200
     else:
         return jsonify({'message': 'Reminder not found'}), 404
 
 @study_plan_blueprint.route('/reminders/<int:reminder_id>', methods=['DELETE'])
 @jwt_required()
 def delete_reminder(reminder_id):
-    user_id = get_jwt_identity()
-    reminder = Reminder.query.filter_by(id=reminder_id, owner_id=user_id).first()
-    if reminder:
-        try:
-            db.session.delete(reminder)
-            db.session.commit()
-            return jsonify({'message': 'Reminder deleted successfully'}), 200
-        except SQLAlchemyError as e:
-            db.session.rollback()
-            return jsonify({'error': str(e)}), 500
+    user_id = current_user_id()
+    try:
+        deleted = delete_item(db.session, 'reminders', user_id, reminder_id)
+        db.session.commit()
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+    if deleted:
+        return jsonify({'message': 'Reminder deleted successfully'}), 200
     else:
         return jsonify({'message': 'Reminder not found'}), 404
 
-        
+def _apply_batch(kind):
+    user_id = current_user_id()
+    try:
+        operations, atomic = parse_batch(request.get_json(silent=True))
+        results = apply_batch(db.session, kind, user_id, operations, atomic)
+        if atomic and any(result['status'] >= 400 for result in results):
+            db.session.rollback()
+            return jsonify({'message': 'Batch not applied: an operation failed', 'results': results}), 409
+        db.session.commit()
+    except InvalidBatchRequest as e:
+        return jsonify({'message': str(e)}), 400
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+    return jsonify({'results': results}), 200
+
+@study_plan_blueprint.route('/study_plans:batch', methods=['POST'])
+@jwt_required()
+def batch_study_plans():
+    return _apply_batch('plans')
+
+@study_plan_blueprint.route('/study_materials:batch', methods=['POST'])
+@jwt_required()
+def batch_study_materials():
+    return _apply_batch('materials')
+
+@study_plan_blueprint.route('/study_sessions:batch', methods=['POST'])
+@jwt_required()
+def batch_study_sessions():
+    return _apply_batch('sessions')
+
+@study_plan_blueprint.route('/reminders:batch', methods=['POST'])
+@jwt_required()
+def batch_reminders():
+    return _apply_batch('reminders')
+
+@study_plan_blueprint.route('/sync', methods=['GET'])
+@jwt_required()
+def sync_study_items():
+    user_id = current_user_id()
+    try:
+        limit, position = parse_sync_args(request.args)
+        found, next_cursor, has_more = changes_since(db.session, user_id, position, limit)
+    except CursorExpired as e:
+        return jsonify({'message': str(e)}), 410
+    except InvalidCursor as e:
+        return jsonify({'message': str(e)}), 400
+    changes = [
+        {'type': item_type, 'id': item_id, 'deleted': True} if row is None
+        else {'type': item_type, 'id': item_id, 'item': serialize(row)}
+        for item_type, item_id, row in found
+    ]
+    return jsonify({'changes': changes, 'next_cursor': next_cursor, 'has_more': has_more}), 200
+
+@study_plan_blueprint.route('/dashboard', methods=['GET'])
+@jwt_required()
+def get_dashboard():
+    user_id = current_user_id()
+    user = db.session.query(User).options(*dashboard_options()).filter(User.id == user_id).first()
+    if not user:
+        return jsonify({'message': 'User not found'}), 404
+    dashboard = {'user': {'id': user.id, 'username': user.username, 'email': user.email}}
+    for kind, attribute in UPCOMING.items():
+        dashboard[kind] = serialize_objects(kind, getattr(user, attribute.key))
+    return jsonify(dashboard), 200
+
+@study_plan_blueprint.route('/search', methods=['GET'])
+@jwt_required()
+def search_study_items():
+    user_id = current_user_id()
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify({'message': 'q is required'}), 400
+    kind = request.args.get('type')
+    if kind and kind not in SEARCH_TABLES:
+        return jsonify({'message': 'type must be one of: {}'.format(', '.join(SEARCH_TABLES))}), 400
+    try:
+        limit, after = parse_page_args(request.args)
+        rows, next_cursor = search(user_id, query, (kind,) if kind else tuple(SEARCH_TABLES), limit, after)
+    except InvalidCursor as e:
+        return jsonify({'message': str(e)}), 400
+    results = [
+        {'type': row.kind, 'id': row.id, 'title': row.title, 'snippet': highlight(row.snippet), 'score': -row.rank}
+        for row in rows
+    ]
+    return jsonify({'results': results, 'next_cursor': next_cursor}), 200
+
+@study_plan_blueprint.route('/tags', methods=['GET'])
+@jwt_required()
+def get_tags():
+    user_id = current_user_id()
+    item_type = request.args.get('type')
+    if item_type and item_type not in TAGGED:
+        return jsonify({'message': 'type must be one of: {}'.format(', '.join(TAGGED))}), 400
+    tags = [{'name': name, 'count': count} for name, count in tag_counts(user_id, item_type)]
+    return jsonify({'tags': tags}), 200
+
+def _export_response(job):
+    body = export_status(job)
+    if job.status == 'done':
+        body['download_url'] = url_for('study_plan.download_export', job_id=job.id)
+    return body
+
+@study_plan_blueprint.route('/exports', methods=['POST'])
+@jwt_required()
+def create_export():
+    user_id = current_user_id()
+    data = request.get_json(silent=True) or {}
+    try:
+        job = request_export(user_id, data.get('compression'))
+        db.session.commit()
+    except InvalidExportRequest as e:
+        return jsonify({'message': str(e)}), 400
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+    worker = get_export_worker(db.engine)
+    if worker is not None:
+        worker.notify()
+    response = jsonify({'export': _export_response(job)})
+    response.headers['Location'] = url_for('study_plan.get_export_status', job_id=job.id)
+    return response, 202
+
+@study_plan_blueprint.route('/exports/<job_id>', methods=['GET'])
+@jwt_required()
+def get_export_status(job_id):
+    user_id = current_user_id()
+    job = get_export(user_id, job_id)
+    if job:
+        return jsonify({'export': _export_response(job)}), 200
+    else:
+        return jsonify({'message': 'Export not found'}), 404
+
+@study_plan_blueprint.route('/exports/<job_id>/download', methods=['GET'])
+@jwt_required()
+def download_export(job_id):
+    user_id = current_user_id()
+    job = get_export(user_id, job_id)
+    if not job:
+        return jsonify({'message': 'Export not found'}), 404
+    if job.status != 'done':
+        return jsonify({'message': 'Export is not ready', 'export': _export_response(job)}), 409
+    return send_file(job.path, mimetype=ARCHIVE_MIMETYPES[job.compression], as_attachment=True,
+                     download_name='study-buddy-export-{:%Y%m%d}{}'.format(job.finished_at,
+                                                                         ARCHIVE_SUFFIXES[job.compression]))
+
+@study_plan_blueprint.route('/import', methods=['POST'])
+@jwt_required()
+def import_study_items():
+    user_id = current_user_id()
+    fmt = IMPORT_FORMATS.get(request.mimetype)
+    if fmt is None:
+        return jsonify({'message': 'Content-Type must be one of: {}'.format(', '.join(IMPORT_FORMATS))}), 415
+    try:
+        summary = import_stream(db.engine, user_id, request.stream, fmt, request.args.get('type'))
+    except InvalidImportRequest as e:
+        return jsonify({'message': str(e)}), 400
+    return jsonify(summary), 200
@@ -6,9 +6,12 @@ from flask_marshmallow import Marshmallow
 from models import db, User, StudyPlan, StudyMaterial, StudySession, Reminder
 from backend.schemas.user_schema import UserSchema
 import werkzeug.security
+from utils.cache import load_user
+from utils.database import init_app
 from services.user_service import UserService, AuthenticationError, VerificationError, DatabaseError
 
 app = Flask(__name__)
+init_app(app)
 jwt = JWTManager(app)
 ma = Marshmallow(app)
 
@@ -19,7 +22,7 @@ jwt.jwt_required_callback = jwt_required
 @jwt.user_loader_callback_loader
 def user_loader_callback(jwt_header, jwt_payload):
     username = jwt_payload['username']
-    return User.query.filter_by(username=username).first()
+    return load_user(User, username=username)
 
 @app.before_first_request
 def create_tables():
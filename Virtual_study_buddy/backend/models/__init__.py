@@ -0,0 +1,2 @@
+from utils.database import db
+from models.study_plan_model import User, StudyPlan, StudyMaterial, StudySession, Reminder, reminder_schedule_log, export_job
@@ -1,12 +1,14 @@
 import re
-from flask import Flask
-from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime
-import bcrypt
-
-app = Flask(__name__)
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///study_buddy.db'
-db = SQLAlchemy(app)
+from sqlalchemy import DDL, event
+from utils.database import db
+from utils.cache import track_identity_model
+from utils.dashboard import upcoming
+from utils.index_updates import track_material_model
+from utils.tags import tag_association
+from utils.sync import track_tombstones
+from utils.versions import track_versions
+from utils.hashing import hasher
 
 class User(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -21,13 +23,16 @@ class User(db.Model):
     study_sessions = db.relationship('StudySession', backref='user', lazy=True)
     reminders = db.relationship('Reminder', backref='user', lazy=True)
 
-    def __init__(self, username, email, password):
+    def __init__(self, username, email, password=None, password_hash=None):
         self.username = username
         if self.validate_email(email):
             self.email = email
         else:
             raise ValueError("Invalid email format")
-        self.set_password(password)
+        if password_hash is not None:
+            self._password = password_hash
+        else:
+            self.set_password(password)
 
     def __repr__(self):
         return '<User {}>'.format(self.id)
@@ -41,12 +46,14 @@ class User(db.Model):
         self.set_password(password)
 
     def set_password(self, password):
-        self._password = bcrypt.generate_password_hash(password).decode('utf-8')
+        self._password = hasher.hash(password)
 
     def validate_email(self, email):
         email_regex = r'^[\w\.-]+@[\w\.-]+\.\w+$'
         return re.match(email_regex, email) is not None
 
+track_identity_model(User)
+
 class StudyPlan(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(60), nullable=False)
@@ -58,6 +65,14 @@ class StudyPlan(db.Model):
     progress = db.Column(db.Integer, nullable=False, default=0)
     due_date = db.Column(db.DateTime(), nullable=True)
     owner_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    created_at = db.Column(db.DateTime(), nullable=False, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime(), nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('ix_study_plan_owner_id', 'owner_id'),
+        db.Index('ix_study_plan_owner_id_due_date', 'owner_id', 'due_date'),
+        db.Index('ix_study_plan_owner_id_updated_at', 'owner_id', 'updated_at'),
+    )
   
     def __repr__(self):
         return '<StudyPlan {}>'.format(self.title)
@@ -73,11 +88,23 @@ class StudyMaterial(db.Model):
     priority = db.Column(db.Integer, nullable=False, default=1)
     progress = db.Column(db.Integer, nullable=False, default=0)
     due_date = db.Column(db.DateTime(), nullable=True)
+    # Only public materials are recommended to other users.
+    is_public = db.Column(db.Boolean(), nullable=False, default=False)
     owner_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    created_at = db.Column(db.DateTime(), nullable=False, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime(), nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('ix_study_material_owner_id', 'owner_id'),
+        db.Index('ix_study_material_owner_id_due_date', 'owner_id', 'due_date'),
+        db.Index('ix_study_material_owner_id_updated_at', 'owner_id', 'updated_at'),
+    )
  
     def __repr__(self):
         return '<StudyMaterial {}>'.format(self.title)
-    
+
+track_material_model(StudyMaterial)
+
 class StudySession(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(60), nullable=False)
@@ -90,6 +117,15 @@ class StudySession(db.Model):
     due_date = db.Column(db.DateTime(), nullable=True)
     owner_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     study_plan_id = db.Column(db.Integer, db.ForeignKey('study_plan.id'), nullable=False)
+    created_at = db.Column(db.DateTime(), nullable=False, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime(), nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('ix_study_session_owner_id', 'owner_id'),
+        db.Index('ix_study_session_owner_id_due_date', 'owner_id', 'due_date'),
+        db.Index('ix_study_session_study_plan_id', 'study_plan_id'),
+        db.Index('ix_study_session_owner_id_updated_at', 'owner_id', 'updated_at'),
+    )
 
     def __repr__(self):
         return '<StudySession {}>'.format(self.title)
@@ -106,6 +142,121 @@ class Reminder(db.Model):
     progress = db.Column(db.Integer, nullable=False, default=0)
     due_date = db.Column(db.DateTime(), nullable=True)
     owner_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    created_at = db.Column(db.DateTime(), nullable=False, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime(), nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('ix_reminder_owner_id_reminder_time', 'owner_id', 'reminder_time'),
+        db.Index('ix_reminder_reminder_time', 'reminder_time'),
+        db.Index('ix_reminder_owner_id_updated_at', 'owner_id', 'updated_at'),
+    )
     
     def __repr__(self):
-        return '<Reminder {}>'.format(self.title)
\ No newline at end of file
+        return '<Reminder {}>'.format(self.title)
+
+# Append-only log of reminder schedule changes, written by triggers so the
+# reminder dispatcher (utils/notification.py) can follow inserts, edits and
+# deletes made by any process without rescanning the reminder table.
+reminder_schedule_log = db.Table(
+    'reminder_schedule_log',
+    db.Column('seq', db.Integer, primary_key=True),
+    db.Column('reminder_id', db.Integer, nullable=False),
+    db.Column('reminder_time', db.DateTime(), nullable=True),
+    sqlite_autoincrement=True,
+)
+
+REMINDER_SCHEDULE_TRIGGERS = [
+    '''CREATE TRIGGER IF NOT EXISTS reminder_schedule_ai AFTER INSERT ON reminder BEGIN
+        INSERT INTO reminder_schedule_log (reminder_id, reminder_time) VALUES (NEW.id, NEW.reminder_time);
+    END''',
+    '''CREATE TRIGGER IF NOT EXISTS reminder_schedule_au AFTER UPDATE OF reminder_time ON reminder BEGIN
+        INSERT INTO reminder_schedule_log (reminder_id, reminder_time) VALUES (NEW.id, NEW.reminder_time);
+    END''',
+    '''CREATE TRIGGER IF NOT EXISTS reminder_schedule_ad AFTER DELETE ON reminder BEGIN
+        INSERT INTO reminder_schedule_log (reminder_id, reminder_time) VALUES (OLD.id, NULL);
+    END''',
+]
+
+for trigger in REMINDER_SCHEDULE_TRIGGERS:
+    event.listen(Reminder.__table__, 'after_create', DDL(trigger).execute_if(dialect='sqlite'))
+
+
+# FTS5 indexes over plan and material text, kept in sync by triggers. They
+# are external-content tables, so the text is stored once, in the base
+# table. owner_id is indexed as a token so searches can be owner-scoped
+# inside the full-text match (utils/search.py).
+SEARCH_COLUMNS = ('title', 'description', 'tags', 'comments', 'owner_id')
+
+
+def search_index_ddl(table):
+    columns = ', '.join(SEARCH_COLUMNS)
+    new_values = ', '.join('NEW.' + column for column in SEARCH_COLUMNS)
+    old_values = ', '.join('OLD.' + column for column in SEARCH_COLUMNS)
+    return [
+        '''CREATE VIRTUAL TABLE IF NOT EXISTS {table}_fts USING fts5(
+            {columns}, content='{table}', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+        )'''.format(table=table, columns=columns),
+        '''CREATE TRIGGER IF NOT EXISTS {table}_fts_ai AFTER INSERT ON {table} BEGIN
+            INSERT INTO {table}_fts (rowid, {columns}) VALUES (NEW.id, {new});
+        END'''.format(table=table, columns=columns, new=new_values),
+        '''CREATE TRIGGER IF NOT EXISTS {table}_fts_ad AFTER DELETE ON {table} BEGIN
+            INSERT INTO {table}_fts ({table}_fts, rowid, {columns}) VALUES ('delete', OLD.id, {old});
+        END'''.format(table=table, columns=columns, old=old_values),
+        '''CREATE TRIGGER IF NOT EXISTS {table}_fts_au AFTER UPDATE OF {columns} ON {table} BEGIN
+            INSERT INTO {table}_fts ({table}_fts, rowid, {columns}) VALUES ('delete', OLD.id, {old});
+            INSERT INTO {table}_fts (rowid, {columns}) VALUES (NEW.id, {new});
+        END'''.format(table=table, columns=columns, old=old_values, new=new_values),
+    ]
+
+
+for model in (StudyPlan, StudyMaterial):
+    for statement in search_index_ddl(model.__tablename__):
+        event.listen(model.__table__, 'after_create', DDL(statement).execute_if(dialect='sqlite'))
+    event.listen(model.__table__, 'before_drop',
+                 DDL('DROP TABLE IF EXISTS {}_fts'.format(model.__tablename__)).execute_if(dialect='sqlite'))
+
+
+# Normalised tags: the `tags` strings stay the source of truth, and these
+# association tables are kept in step with them (utils/tags.py).
+study_plan_tag = tag_association(StudyPlan, 'plans')
+study_material_tag = tag_association(StudyMaterial, 'materials')
+study_session_tag = tag_association(StudySession, 'sessions')
+reminder_tag = tag_association(Reminder, 'reminders')
+
+for model, item_type in ((StudyPlan, 'plans'), (StudyMaterial, 'materials'), (StudySession, 'sessions'),
+                         (Reminder, 'reminders')):
+    track_versions(model, item_type)
+    track_tombstones(model, item_type)
+
+# Capped, eagerly loadable views of what is due next, for the dashboard
+# (utils/dashboard.py).
+upcoming(User, StudyPlan, 'plans', StudyPlan.due_date)
+upcoming(User, StudyMaterial, 'materials', StudyMaterial.due_date)
+upcoming(User, StudySession, 'sessions', StudySession.due_date)
+upcoming(User, Reminder, 'reminders', Reminder.reminder_time)
+
+
+# Queue and progress of account exports, shared by every process so any
+# web worker can answer status polls for jobs run elsewhere (utils/export.py).
+export_job = db.Table(
+    'export_job',
+    db.Column('id', db.String(32), primary_key=True),
+    db.Column('owner_id', db.Integer, db.ForeignKey('user.id'), nullable=False),
+    db.Column('status', db.String(10), nullable=False),
+    db.Column('compression', db.String(10), nullable=False),
+    db.Column('rows_done', db.Integer, nullable=False, default=0),
+    db.Column('rows_total', db.Integer, nullable=True),
+    db.Column('path', db.String(255), nullable=True),
+    db.Column('size', db.Integer, nullable=True),
+    db.Column('error', db.Text(), nullable=True),
+    db.Column('created_at', db.DateTime(), nullable=False),
+    db.Column('updated_at', db.DateTime(), nullable=False),
+    db.Column('finished_at', db.DateTime(), nullable=True),
+    db.Index('ix_export_job_owner_id', 'owner_id'),
+    db.Index('ix_export_job_status_created_at', 'status', 'created_at'),
+    # At most one queued or running export per owner.
+    db.Index('ix_export_job_owner_id_active', 'owner_id', unique=True,
+             sqlite_where=db.text("status IN ('queued', 'running')"),
+             postgresql_where=db.text("status IN ('queued', 'running')")),
+)
@@ -1,10 +1,11 @@
-import bcrypt
 from sqlalchemy import Column, Integer, String, DateTime, Boolean
 from sqlalchemy.ext.declarative import declarative_base
 from datetime import datetime
 import random
 import string
 import pyotp
+from utils.cache import track_identity_model
+from utils.hashing import hasher
 
 Base = declarative_base()
 
@@ -30,10 +31,10 @@ class User(Base):
     otp_secret = Column(String(16))
     otp_enabled = Column(Boolean, default=False)
 
-    def __init__(self, username, email, password):
+    def __init__(self, username, email, password=None, password_hash=None):
         self.first_name, self.middle_name, self.last_name = self.parse_username(username)
         self.email = email
-        self.password = self.hash_password(password)
+        self.password = password_hash if password_hash is not None else self.hash_password(password)
 
     def parse_username(self, username):
         parts = username.split()
@@ -72,10 +73,9 @@ class User(Base):
         return totp.verify(otp)
 
     def hash_password(self, password):
-        salt = bcrypt.gensalt()
-        hashed_password = bcrypt.hashpw(password.encode('utf-8'), salt)
-        return hashed_password
+        return hasher.hash(password)
 
     def verify_password(self, password):
-        return bcrypt.checkpw(password.encode('utf-8'), self.password.encode('utf-8'))
+        return hasher.check(self.password, password)
 
+track_identity_model(User)
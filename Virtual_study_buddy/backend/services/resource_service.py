@@ -3,8 +3,10 @@ from flask_restful import Api, Resource, reqparse
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from models import db, User, StudyPlan, StudyMaterial, StudySession, Reminder
 from sqlalchemy.exc import SQLAlchemyError
+from utils.database import init_app
 
 app = Flask(__name__)
+init_app(app)
 api = Api(app)
 
 class UserService(Resource):
@@ -12,6 +12,7 @@ import random
 import string
 import pyotp
 from itsdangerous import URLSafeTimedSerializer
+from utils.cache import load_user
 
 app = Flask(__name__)
 bcrypt = Bcrypt(app)
@@ -87,7 +88,7 @@ def reset_password():
 @jwt_required
 def verify_email():
     user_email = get_jwt_identity()
-    user = User.query.filter_by(email=user_email).first()
+    user = load_user(User, email=user_email)
     if not user:
         return jsonify({'message': 'User not found.'}), 404
     user.email_verified = True
@@ -102,7 +103,7 @@ def update_password():
     if not current_password or not new_password:
         return jsonify({'message': 'Please provide all required fields.'}), 400
     user_email = get_jwt_identity()
-    user = User.query.filter_by(email=user_email).first()
+    user = load_user(User, email=user_email)
     if not user or not bcrypt.check_password_hash(user.password, current_password):
         return jsonify({'message': 'Invalid current password.'}), 401
     user.password = bcrypt.generate_password_hash(new_password)
@@ -113,7 +114,7 @@ def update_password():
 @jwt_required
 def get_users():
     user_email = get_jwt_identity()
-    user = User.query.filter_by(email=user_email).first()
+    user = load_user(User, email=user_email)
     if not user:
         return jsonify({'message': 'User not found.'}), 404
     users = User.query.all()
@@ -123,7 +124,7 @@ def get_users():
 @jwt_required
 def get_user(user_id):
     user_email = get_jwt_identity()
-    user = User.query.filter_by(email=user_email).first()
+    user = load_user(User, email=user_email)
     if not user:
         return jsonify({'message': 'User not found.'}), 404
     user = User.query.get_or_404(user_id)
@@ -133,7 +134,7 @@ def get_user(user_id):
 @jwt_required
 def update_user(user_id):
     user_email = get_jwt_identity()
-    user = User.query.filter_by(email=user_email).first()
+    user = load_user(User, email=user_email)
     if not user:
         return jsonify({'message': 'User not found.'}), 404
     user_to_update = User.query.get_or_404(user_id)
@@ -149,7 +150,7 @@ def update_user(user_id):
 @jwt_required
 def delete_user(user_id):
     user_email = get_jwt_identity()
-    user = User.query.filter_by(email=user_email).first()
+    user = load_user(User, email=user_email)
     if not user:
         return jsonify({'message': 'User not found.'}), 404
     user_to_delete = User.query.get_or_404(user_id)
@@ -210,7 +211,7 @@ def confirm_token():
 @jwt_required
 def generate_otp():
     user_email = get_jwt_identity()
-    user = User.query.filter_by(email=user_email).first()
+    user = load_user(User, email=user_email)
     if not user:
         return jsonify({'message': 'User not found.'}), 404
     user.enable_otp()
@@ -220,7 +221,7 @@ def generate_otp():
 @jwt_required
 def verify_otp():
     user_email = get_jwt_identity()
-    user = User.query.filter_by(email=user_email).first()
+    user = load_user(User, email=user_email)
     if not user:
         return jsonify({'message': 'User not found.'}), 404
     otp = request.json.get('otp', None)
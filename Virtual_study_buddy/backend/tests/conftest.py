@@ -0,0 +1,87 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+# Settings are read when the modules are imported, so they are fixed here,
+# before the app is. Every path points into a throwaway directory.
+TMP = tempfile.mkdtemp(prefix='study-buddy-tests-')
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(TMP, 'test.db')
+os.environ['EXPORT_DIR'] = os.path.join(TMP, 'exports')
+os.environ['EXPORT_IN_PROCESS'] = '0'
+os.environ['PROFILE_DIR'] = os.path.join(TMP, 'profiles')
+os.environ['PROFILE_ADMINS'] = 'admin@example.com'
+os.environ['RECOMMENDER_INDEX_PATH'] = os.path.join(TMP, 'recommendation_index')
+os.environ['JWT_SECRET_KEY'] = 'test-secret-key-of-sufficient-length'
+os.environ['BCRYPT_LOG_ROUNDS'] = '4'
+os.environ['HASHING_WORKERS'] = '1'
+os.environ.pop('METRICS_DIR', None)
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app import app as flask_app  # noqa: E402
+from models import db  # noqa: E402
+from utils.cache import identity_cache  # noqa: E402
+
+PASSWORD = 'Correct-Horse-9'
+
+
+@pytest.fixture
+def app():
+    with flask_app.app_context():
+        db.drop_all()
+        db.create_all()
+    identity_cache.clear()
+    yield flask_app
+    with flask_app.app_context():
+        db.session.remove()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+def register(client, email, password=PASSWORD):
+    return client.post('/register', json={'username': email.split('@')[0], 'email': email, 'password': password})
+
+
+def login(client, email, password=PASSWORD):
+    return client.post('/login', json={'email': email, 'password': password})
+
+
+@pytest.fixture
+def auth(client):
+    """
+    Register and log in a user through the real endpoints and return
+    Authorization headers for the token /login issued.
+    """
+    def make(email='ada@example.com'):
+        register(client, email)
+        response = login(client, email)
+        assert response.status_code == 200, response.get_json()
+        return {'Authorization': 'Bearer ' + response.get_json()['access_token']}
+    return make
+
+
+@pytest.fixture
+def recommendation_state():
+    """
+    Drop the process-wide recommender, ANN index and index updater before
+    and after the test, so each one fits from its own database.
+    """
+    from utils import index_updates, recommendation
+
+    def reset():
+        if recommendation._updater is not None:
+            recommendation._updater.stop(timeout=5)
+        recommendation._recommender = recommendation._refit_changes = None
+        recommendation._index = recommendation._index_mtime = None
+        recommendation._built_at = recommendation._index_checked = 0.0
+        while not index_updates.material_changes.empty():
+            index_updates.material_changes.get_nowait()
+
+    reset()
+    yield recommendation
+    reset()
@@ -0,0 +1,74 @@
+import shutil
+import numpy as np
+import pytest
+from models import db
+from utils.recommendation import RECOMMENDER_INDEX_PATH, ANNIndex, ANNOverlay, MaterialRecommender, load_documents
+
+API = '/study_plan'
+
+
+def synthetic_documents(count, topics=50, seed=0):
+    rng = np.random.default_rng(seed)
+    for material_id in range(1, count + 1):
+        topic = rng.integers(topics)
+        words = ['topic{}word{}'.format(topic, word) for word in rng.integers(20, size=6)]
+        words += ['common{}'.format(word) for word in rng.integers(200, size=3)]
+        yield material_id, ' '.join(words[:3]), ' '.join(words[3:]), None
+
+
+@pytest.fixture
+def index_path():
+    shutil.rmtree(RECOMMENDER_INDEX_PATH, ignore_errors=True)
+    yield RECOMMENDER_INDEX_PATH
+    shutil.rmtree(RECOMMENDER_INDEX_PATH, ignore_errors=True)
+
+
+def test_saved_index_is_memory_mapped_and_recalls_exact_search(tmp_path):
+    recommender = MaterialRecommender.fit(synthetic_documents(3000))
+    path = str(tmp_path / 'index')
+    ANNIndex.build(recommender, budget=512).save(path)
+    index = ANNIndex.load(path)
+    assert all(isinstance(getattr(index, name), np.memmap) for name in ANNIndex.FILES)
+    assert len(index) == 3000
+
+    recalls = []
+    for material_id in range(1, 3000, 60):
+        exact = recommender.recommend([material_id], 10)
+        approximate = index.recommend([material_id], 10)
+        assert material_id not in {i for i, _ in approximate}
+        assert approximate[0][1] == pytest.approx(exact[0][1], rel=1e-3)
+        recalls.append(len({i for i, _ in exact} & {i for i, _ in approximate}) / len(exact))
+    assert np.mean(recalls) >= 0.9
+
+
+def test_overlay_hides_edited_and_deleted_materials():
+    recommender = MaterialRecommender.fit([
+        (1, 'Python generators', 'yield', None),
+        (2, 'Python decorators', 'wrappers', None),
+        (3, 'Organic chemistry', 'alkenes', None),
+    ])
+    overlay = ANNOverlay(ANNIndex.build(recommender))
+    assert [i for i, _ in overlay.search(overlay.text_profile('python'), 5)] in ([1, 2], [2, 1])
+
+    overlay = overlay.apply({2: ('Cell biology', 'mitochondria', None), 3: None, 4: ('Python asyncio', None, None)})
+    assert sorted(i for i, _ in overlay.search(overlay.text_profile('python'), 5)) == [1, 4]
+    assert overlay.search(overlay.text_profile('alkenes'), 5) == []
+    assert [i for i, _ in overlay.search(overlay.text_profile('mitochondria'), 5)] == [2]
+    assert len(overlay) == 3 and overlay.max_id == 4
+
+
+def test_endpoint_serves_from_the_built_index(app, client, auth, recommendation_state, index_path):
+    ada = auth()
+    bob = auth('bob@example.com')
+    for title, headers in (('Python generators', ada), ('Python asyncio', bob), ('Organic chemistry', bob)):
+        assert client.post(API + '/study_materials', json={
+            'title': title, 'description': title, 'link': 'https://example.com', 'is_public': True},
+            headers=headers).status_code == 201
+
+    with app.app_context(), db.engine.connect() as conn:
+        ANNIndex.build(MaterialRecommender.fit(load_documents(conn))).save(index_path)
+
+    response = client.get(API + '/study_materials/recommendations', headers=ada)
+    assert [item['title'] for item in response.get_json()['recommendations']] == ['Python asyncio']
+    assert isinstance(recommendation_state._index, ANNOverlay)
+    assert recommendation_state._recommender is None
@@ -0,0 +1,110 @@
+from sqlalchemy import event
+from models import db
+
+API = '/study_plan'
+
+
+def create_plans(client, headers, *titles):
+    return [client.post(API + '/study_plans', json={'title': title, 'description': 'x'},
+                        headers=headers).get_json()['study_plan']['id'] for title in titles]
+
+
+def plans(client, headers):
+    return {plan['id']: plan for plan in client.get(API + '/study_plans', headers=headers).get_json().get(
+        'study_plans', [])}
+
+
+def test_mixed_batch_applies_valid_operations(client, auth):
+    headers = auth()
+    first, second, third = create_plans(client, headers, 'One', 'Two', 'Three')
+    other = create_plans(client, auth('bob@example.com'), 'Bob')[0]
+    response = client.post(API + '/study_plans:batch', json={'operations': [
+        {'op': 'create', 'data': {'title': 'Four', 'description': 'x', 'tags': 'exam'}},
+        {'op': 'update', 'id': first, 'data': {'title': 'One again'}},
+        {'op': 'update', 'id': second, 'data': {'description': 'moved'}},
+        {'op': 'delete', 'id': third},
+        {'op': 'delete', 'id': other},
+        {'op': 'update', 'id': first, 'data': {'title': 'Twice'}},
+        {'op': 'create', 'data': {'description': 'no title'}},
+        {'op': 'rename', 'id': first},
+    ]}, headers=headers)
+    assert response.status_code == 200
+    results = response.get_json()['results']
+    assert [result['status'] for result in results] == [201, 200, 200, 200, 404, 400, 400, 400]
+    assert [result['index'] for result in results] == list(range(8))
+
+    current = plans(client, headers)
+    assert sorted(current) == sorted([first, second, results[0]['id']])
+    assert current[first]['title'] == 'One again'
+    assert current[second]['title'] == 'Two' and current[second]['description'] == 'moved'
+    assert client.get(API + '/study_plans?tags=exam', headers=headers).get_json()['study_plans'][0]['title'] == 'Four'
+    assert len(plans(client, auth('bob@example.com'))) == 1
+
+
+def test_atomic_batch_with_a_failure_changes_nothing(client, auth):
+    headers = auth()
+    first, = create_plans(client, headers, 'One')
+    response = client.post(API + '/study_plans:batch', json={'atomic': True, 'operations': [
+        {'op': 'update', 'id': first, 'data': {'title': 'Changed'}},
+        {'op': 'delete', 'id': 999},
+    ]}, headers=headers)
+    assert response.status_code == 409
+    assert [result['status'] for result in response.get_json()['results']] == [424, 404]
+    assert plans(client, headers)[first]['title'] == 'One'
+
+
+def test_statement_count_does_not_grow_with_the_batch(app, client, auth):
+    headers = auth()
+    ids = create_plans(client, headers, *('Plan %d' % i for i in range(40)))
+
+    def count_statements(operations):
+        statements = []
+        with app.app_context():
+            engine = db.engine
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(engine, 'before_cursor_execute', record)
+        try:
+            assert client.post(API + '/study_plans:batch', json={'operations': operations},
+                               headers=headers).status_code == 200
+        finally:
+            event.remove(engine, 'before_cursor_execute', record)
+        return len(statements)
+
+    small = count_statements([{'op': 'update', 'id': ids[0], 'data': {'title': 'x'}}, {'op': 'delete', 'id': ids[1]}])
+    large = count_statements([{'op': 'update', 'id': item_id, 'data': {'title': 'y'}} for item_id in ids[2:20]] +
+                             [{'op': 'delete', 'id': item_id} for item_id in ids[20:]])
+    assert large == small
+
+
+def test_session_batches_check_plan_ownership(client, auth):
+    bob_plan, = create_plans(client, auth('bob@example.com'), 'Bob')
+    headers = auth()
+    own_plan, = create_plans(client, headers, 'Ada')
+    results = client.post(API + '/study_sessions:batch', json={'operations': [
+        {'op': 'create', 'data': {'title': 'S', 'description': 'x', 'study_plan_id': own_plan}},
+        {'op': 'create', 'data': {'title': 'S', 'description': 'x', 'study_plan_id': bob_plan}},
+    ]}, headers=headers).get_json()['results']
+    assert [result['status'] for result in results] == [201, 400]
+
+
+def test_malformed_batches_are_rejected(client, auth):
+    headers = auth()
+    for body in ({}, {'operations': []}, {'operations': [{'op': 'create'}], 'atomic': 'yes'}, [1]):
+        assert client.post(API + '/study_plans:batch', json=body, headers=headers).status_code == 400
+
+
+def test_reminder_times_with_offsets_are_stored_in_utc(client, auth):
+    headers = auth()
+    results = client.post(API + '/reminders:batch', json={'operations': [
+        {'op': 'create', 'data': {'title': 'R', 'description': 'x', 'reminder_time': '2026-01-01T09:00:00+02:00'}},
+    ]}, headers=headers).get_json()['results']
+    reminder_id = results[0]['id']
+    url = '{}/reminders/{}'.format(API, reminder_id)
+    assert client.get(url, headers=headers).get_json()['reminder']['reminder_time'] == '2026-01-01T07:00:00'
+    client.post(API + '/reminders:batch', json={'operations': [
+        {'op': 'update', 'id': reminder_id, 'data': {'reminder_time': '2026-01-01T09:00:00-05:00'}},
+    ]}, headers=headers)
+    assert client.get(url, headers=headers).get_json()['reminder']['reminder_time'] == '2026-01-01T14:00:00'
@@ -0,0 +1,104 @@
+import json
+from models import db
+from utils.bulk_import import BulkImport, read_ndjson
+
+API = '/study_plan'
+
+
+def post_import(client, headers, body, content_type, **params):
+    return client.post(API + '/import', data=body, content_type=content_type, query_string=params, headers=headers)
+
+
+def ndjson(*records):
+    return ''.join((record if isinstance(record, str) else json.dumps(record)) + '\n' for record in records)
+
+
+def test_ndjson_rows_are_imported_with_per_line_errors(client, auth):
+    headers = auth()
+    body = ndjson(
+        {'type': 'plans', 'ref': 'p1', 'title': 'Calculus', 'description': 'Term 1', 'tags': 'maths, exam'},
+        {'type': 'sessions', 'plan_ref': 'p1', 'title': 'Week 1', 'description': 'Limits'},
+        {'type': 'materials', 'title': 'Notes', 'description': 'x', 'link': 'https://example.com'},
+        '{not json',
+        {'type': 'users', 'title': 'x'},
+        {'type': 'plans', 'description': 'no title'},
+        {'type': 'sessions', 'plan_ref': 'missing', 'title': 'Orphan', 'description': 'x'},
+        [1, 2],
+    )
+    response = post_import(client, headers, body, 'application/x-ndjson')
+    assert response.status_code == 200
+    summary = response.get_json()
+    assert summary['inserted'] == {'plans': 1, 'materials': 1, 'sessions': 1}
+    assert summary['error_count'] == 5
+    assert [error['line'] for error in summary['errors']] == [4, 5, 6, 7, 8]
+    assert 'does not name an imported plan' in summary['errors'][3]['message']
+
+    plan = client.get(API + '/study_plans?tags=exam', headers=headers).get_json()['study_plans'][0]
+    assert plan['title'] == 'Calculus'
+    session = client.get(API + '/study_sessions', headers=headers).get_json()['study_sessions'][0]
+    assert session['study_plan_id'] == plan['id']
+
+
+def test_csv_rows_take_their_type_from_the_query_string(client, auth):
+    headers = auth()
+    body = 'title,description,link\r\nNotes,Chapter 1,https://a\r\nSlides,,https://b\r\nExtra,x,y,z\r\n'
+    summary = post_import(client, headers, body, 'text/csv', type='materials').get_json()
+    assert summary['inserted']['materials'] == 1
+    assert [error['line'] for error in summary['errors']] == [3, 4]
+    titles = [item['title'] for item in client.get(API + '/study_materials', headers=headers).get_json()['study_materials']]
+    assert titles == ['Notes']
+
+
+def test_sessions_cannot_join_other_users_plans(client, auth):
+    bob = auth('bob@example.com')
+    plan_id = client.post(API + '/study_plans', json={'title': 'Bob', 'description': 'x'},
+                          headers=bob).get_json()['study_plan']['id']
+    body = ndjson({'type': 'sessions', 'study_plan_id': plan_id, 'title': 'Sneaky', 'description': 'x'})
+    summary = post_import(client, auth(), body, 'application/x-ndjson').get_json()
+    assert summary['inserted']['sessions'] == 0
+    assert summary['errors'] == [{'line': 1, 'message': 'study plan {} not found'.format(plan_id)}]
+
+
+def test_bad_requests(client, auth):
+    headers = auth()
+    assert post_import(client, headers, '{}', 'application/json').status_code == 415
+    assert post_import(client, headers, '', 'text/csv', type='users').status_code == 400
+    assert client.post(API + '/import', data='', content_type='text/csv').status_code == 401
+
+
+def test_plan_refs_resolve_across_chunks(app, auth):
+    auth()
+    lines = ndjson(*([{'type': 'plans', 'ref': 'p', 'title': 'Plan', 'description': 'x'}] +
+                     [{'type': 'sessions', 'plan_ref': 'p', 'title': 'S%d' % i, 'description': 'x'}
+                      for i in range(5)])).splitlines()
+    with app.app_context():
+        summary = BulkImport(db.engine, 1, chunk_rows=2).run(read_ndjson(lines))
+    assert summary['inserted'] == {'plans': 1, 'materials': 0, 'sessions': 5}
+    assert summary['error_count'] == 0
+
+
+def test_offsets_are_converted_to_utc(client, auth):
+    headers = auth()
+    plan_id = client.post(API + '/study_plans', json={'title': 'Plan', 'description': 'x'},
+                          headers=headers).get_json()['study_plan']['id']
+    body = ndjson({'type': 'sessions', 'study_plan_id': plan_id, 'title': 'Morning', 'description': 'x',
+                   'due_date': '2026-01-01T09:00:00+02:00'},
+                  {'type': 'sessions', 'study_plan_id': plan_id, 'title': 'Zulu', 'description': 'x',
+                   'due_date': '2026-01-01T09:00:00Z'})
+    assert post_import(client, headers, body, 'application/x-ndjson').get_json()['error_count'] == 0
+    sessions = client.get(API + '/study_sessions', headers=headers).get_json()['study_sessions']
+    assert [session['due_date'] for session in sessions] == ['2026-01-01T07:00:00', '2026-01-01T09:00:00']
+
+
+def test_text_columns_reject_lists_objects_and_booleans(client, auth):
+    headers = auth()
+    body = ndjson({'type': 'plans', 'title': 'Plan', 'description': 'x', 'tags': ['a', 'b']},
+                  {'type': 'plans', 'title': {'en': 'Plan'}, 'description': 'x'},
+                  {'type': 'plans', 'title': True, 'description': 'x'},
+                  {'type': 'plans', 'title': 101, 'description': 'x'})
+    summary = post_import(client, headers, body, 'application/x-ndjson').get_json()
+    assert summary['inserted']['plans'] == 1
+    assert [error['line'] for error in summary['errors']] == [1, 2, 3]
+    assert all('not a string' in error['message'] for error in summary['errors'])
+    plans = client.get(API + '/study_plans', headers=headers).get_json()['study_plans']
+    assert [plan['title'] for plan in plans] == ['101']
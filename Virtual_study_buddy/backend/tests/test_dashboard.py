@@ -0,0 +1,64 @@
+from datetime import datetime, timedelta
+from sqlalchemy import event
+from models import db
+
+API = '/study_plan'
+SOON = datetime.utcnow() + timedelta(days=1)
+
+
+def add_reminders(client, headers, offsets):
+    for offset in offsets:
+        response = client.post(API + '/reminders', json={
+            'title': 'Due in %dh' % offset, 'description': 'x',
+            'reminder_time': (SOON + timedelta(hours=offset)).isoformat()}, headers=headers)
+        assert response.status_code == 201
+
+
+def dashboard_statements(app, client, headers):
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().startswith('SELECT'):
+            statements.append(statement)
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', record)
+    try:
+        response = client.get(API + '/dashboard', headers=headers)
+    finally:
+        event.remove(engine, 'before_cursor_execute', record)
+    assert response.status_code == 200
+    return response.get_json(), len(statements)
+
+
+def test_dashboard_lists_the_next_items_soonest_first(client, auth):
+    headers = auth()
+    add_reminders(client, headers, [11, 3, 9, 0, 6, 1, 5, 7, 2, 10, 4, 8])
+    add_reminders(client, headers, [-48])
+    client.post(API + '/study_plans', json={'title': 'Thesis', 'description': 'x',
+                                            'due_date': (SOON + timedelta(days=3)).isoformat()}, headers=headers)
+    client.post(API + '/study_plans', json={'title': 'Undated', 'description': 'x'}, headers=headers)
+    add_reminders(client, auth('bob@example.com'), [0])
+
+    body = client.get(API + '/dashboard', headers=headers).get_json()
+    assert body['user'] == {'id': 1, 'username': 'ada', 'email': 'ada@example.com'}
+    assert [reminder['title'] for reminder in body['reminders']] == ['Due in %dh' % offset for offset in range(10)]
+    assert [plan['title'] for plan in body['plans']] == ['Thesis']
+    assert body['materials'] == [] and body['sessions'] == []
+    assert set(body['reminders'][0]) >= {'id', 'description', 'reminder_time', 'created_at'}
+
+
+def test_query_count_does_not_depend_on_the_amount_of_data(app, client, auth):
+    light = auth('light@example.com')
+    heavy = auth('heavy@example.com')
+    add_reminders(client, light, [1])
+    add_reminders(client, heavy, range(30))
+    light_body, light_count = dashboard_statements(app, client, light)
+    heavy_body, heavy_count = dashboard_statements(app, client, heavy)
+    assert len(light_body['reminders']) == 1 and len(heavy_body['reminders']) == 10
+    assert light_count == heavy_count
+
+
+def test_dashboard_requires_a_token(client):
+    assert client.get(API + '/dashboard').status_code == 401
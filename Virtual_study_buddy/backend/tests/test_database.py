@@ -0,0 +1,31 @@
+from sqlalchemy import select
+from sqlalchemy.pool import QueuePool, StaticPool
+from models import db, StudyPlan
+from utils.database import busy_timeout_ms, engine_options, insert_rows, make_engine
+
+
+def test_app_connections_are_tuned(app):
+    with app.app_context(), db.engine.connect() as conn:
+        assert conn.exec_driver_sql('PRAGMA journal_mode').scalar() == 'wal'
+        assert conn.exec_driver_sql('PRAGMA synchronous').scalar() == 1
+        assert conn.exec_driver_sql('PRAGMA busy_timeout').scalar() == busy_timeout_ms()
+        assert isinstance(db.engine.pool, QueuePool)
+
+
+def test_memory_databases_share_one_connection():
+    assert engine_options('sqlite://')['poolclass'] is StaticPool
+    engine = make_engine('sqlite://')
+    with engine.begin() as conn:
+        conn.exec_driver_sql('CREATE TABLE t (x INTEGER)')
+    with engine.connect() as conn:
+        assert conn.exec_driver_sql('SELECT count(*) FROM t').scalar() == 0
+
+
+def test_insert_rows_returns_the_new_ids_in_order(app, client, auth):
+    auth()
+    rows = [{'title': 'Plan %d' % i, 'description': 'x', 'owner_id': 1} for i in range(1200)]
+    with app.app_context():
+        with db.engine.begin() as conn:
+            ids = insert_rows(conn, StudyPlan.__table__, rows)
+        titles = dict(db.session.execute(select(StudyPlan.id, StudyPlan.title)).all())
+    assert [titles[item_id] for item_id in ids] == [row['title'] for row in rows]
@@ -0,0 +1,60 @@
+API = '/study_plan'
+
+
+def get(client, url, headers, etag=None):
+    if etag:
+        headers = dict(headers, **{'If-None-Match': etag})
+    return client.get(url, headers=headers)
+
+
+def test_unchanged_collections_answer_304_until_written(client, auth):
+    headers = auth()
+    client.post(API + '/study_plans', json={'title': 'One', 'description': 'x'}, headers=headers)
+    first = get(client, API + '/study_plans', headers)
+    etag = first.headers['ETag']
+    assert first.status_code == 200 and first.headers['Cache-Control'] == 'private, no-cache'
+
+    cached = get(client, API + '/study_plans', headers, etag)
+    assert cached.status_code == 304 and cached.get_data() == b'' and cached.headers['ETag'] == etag
+
+    plan_id = client.post(API + '/study_plans', json={'title': 'Two', 'description': 'x'},
+                          headers=headers).get_json()['study_plan']['id']
+    changed = get(client, API + '/study_plans', headers, etag)
+    assert changed.status_code == 200 and len(changed.get_json()['study_plans']) == 2
+    etag = changed.headers['ETag']
+
+    item = get(client, '{}/study_plans/{}'.format(API, plan_id), headers)
+    assert item.headers['ETag'] != etag
+    assert get(client, '{}/study_plans/{}'.format(API, plan_id), headers, item.headers['ETag']).status_code == 304
+
+    for write in (lambda: client.put('{}/study_plans/{}'.format(API, plan_id), json={'title': 'Renamed'},
+                                     headers=headers),
+                  lambda: client.post(API + '/study_plans:batch', json={'operations': [
+                      {'op': 'update', 'id': plan_id, 'data': {'title': 'Batch'}}]}, headers=headers),
+                  lambda: client.delete('{}/study_plans/{}'.format(API, plan_id), headers=headers)):
+        assert write().status_code == 200
+        response = get(client, API + '/study_plans', headers, etag)
+        assert response.status_code == 200
+        etag = response.headers['ETag']
+
+
+def test_tags_are_per_user_collection_and_representation(client, auth):
+    ada = auth()
+    bob = auth('bob@example.com')
+    client.post(API + '/reminders', json={'title': 'R', 'description': 'x', 'reminder_time': '2030-01-01T09:00:00'},
+                headers=ada)
+    etag = get(client, API + '/reminders', ada).headers['ETag']
+    assert get(client, API + '/reminders?fields=title', ada).headers['ETag'] != etag
+    assert get(client, API + '/reminders', bob, etag).status_code == 200
+
+    client.post(API + '/study_plans', json={'title': 'P', 'description': 'x'}, headers=ada)
+    assert get(client, API + '/reminders', ada, etag).status_code == 304
+    client.post(API + '/reminders', json={'title': 'R', 'description': 'x', 'reminder_time': '2030-01-01T09:00:00'},
+                headers=bob)
+    assert get(client, API + '/reminders', ada, etag).status_code == 304
+
+
+def test_errors_are_not_tagged(client, auth):
+    headers = auth()
+    response = get(client, API + '/study_plans/999', headers)
+    assert response.status_code == 404 and 'ETag' not in response.headers
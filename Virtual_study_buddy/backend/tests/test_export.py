@@ -0,0 +1,99 @@
+import gzip
+import json
+import os
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
+from models import db, export_job
+from utils.export import ExportWorker
+
+API = '/study_plan'
+
+
+def seed(client, headers):
+    plan = client.post(API + '/study_plans', json={'title': 'Plan', 'description': 'x'}, headers=headers)
+    plan_id = plan.get_json()['study_plan']['id']
+    client.post(API + '/study_materials', json={'title': 'Notes', 'description': 'x', 'link': 'x'}, headers=headers)
+    client.post(API + '/study_sessions', json={'title': 'Session', 'description': 'x', 'study_plan_id': plan_id},
+                headers=headers)
+    for i in range(3):
+        client.post(API + '/reminders', json={'title': 'R%d' % i, 'description': 'x',
+                                              'reminder_time': '2030-01-01T09:00:00'}, headers=headers)
+
+
+def run_queued(app, **options):
+    with app.app_context():
+        worker = ExportWorker(db.engine, **options)
+        job = worker.claim()
+        assert job is not None
+        worker.export(job)
+    return worker
+
+
+def test_export_is_queued_once_run_by_a_worker_and_downloaded(app, client, auth):
+    headers = auth()
+    seed(client, headers)
+    response = client.post(API + '/exports', json={}, headers=headers)
+    assert response.status_code == 202
+    job = response.get_json()['export']
+    assert job['status'] == 'queued' and response.headers['Location'].endswith('/exports/' + job['id'])
+    assert client.post(API + '/exports', headers=headers).get_json()['export']['id'] == job['id']
+    assert client.get('{}/exports/{}/download'.format(API, job['id']), headers=headers).status_code == 409
+
+    run_queued(app, chunk_rows=2)
+
+    status = client.get('{}/exports/{}'.format(API, job['id']), headers=headers).get_json()['export']
+    assert status['status'] == 'done' and status['rows_done'] == status['rows_total'] == 6
+    assert status['progress'] == 1.0 and status['download_url'].endswith('/download')
+
+    download = client.get(status['download_url'], headers=headers)
+    assert download.status_code == 200 and download.mimetype == 'application/gzip'
+    lines = [json.loads(line) for line in gzip.decompress(download.get_data()).splitlines()]
+    assert lines[0]['type'] == 'export'
+    assert lines[0]['counts'] == {'plans': 1, 'materials': 1, 'sessions': 1, 'reminders': 3}
+    assert [line['type'] for line in lines[1:]] == ['plans', 'materials', 'sessions'] + ['reminders'] * 3
+    assert [line['title'] for line in lines[-3:]] == ['R0', 'R1', 'R2']
+
+    second = client.post(API + '/exports', headers=headers).get_json()['export']
+    assert second['id'] != job['id']
+
+
+def test_exports_are_private_and_validated(client, auth):
+    ada = auth()
+    job = client.post(API + '/exports', headers=ada).get_json()['export']
+    bob = auth('bob@example.com')
+    assert client.get('{}/exports/{}'.format(API, job['id']), headers=bob).status_code == 404
+    assert client.get('{}/exports/{}/download'.format(API, job['id']), headers=bob).status_code == 404
+    assert client.post(API + '/exports', json={'compression': 'rar'}, headers=bob).status_code == 400
+
+
+def test_only_one_active_job_per_owner_can_exist(app, client, auth):
+    client.post(API + '/exports', headers=auth())
+    now = datetime.utcnow()
+    with app.app_context():
+        with pytest.raises(IntegrityError):
+            db.session.execute(insert(export_job).values(
+                id='duplicate', owner_id=1, status='running', compression='gzip', rows_done=0,
+                created_at=now, updated_at=now))
+        db.session.rollback()
+
+
+def test_stale_jobs_are_requeued_and_old_archives_purged(app, client, auth):
+    client.post(API + '/exports', headers=auth())
+    now = [datetime.utcnow()]
+    with app.app_context():
+        worker = ExportWorker(db.engine, stale_after=timedelta(minutes=10), ttl=timedelta(hours=1),
+                              clock=lambda: now[0])
+        job = worker.claim()
+        assert worker.claim() is None
+        now[0] += timedelta(minutes=11)
+        assert worker.claim().id == job.id
+        worker.export(job)
+        path = db.session.execute(db.select(export_job.c.path)).scalar()
+        assert os.path.exists(path)
+        now[0] += timedelta(hours=2)
+        worker.purge()
+        db.session.rollback()
+        assert not os.path.exists(path)
+        assert db.session.execute(db.select(export_job.c.id)).first() is None
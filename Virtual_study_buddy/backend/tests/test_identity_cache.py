@@ -0,0 +1,64 @@
+from sqlalchemy import event
+from models import db, User
+from utils.cache import TTLCache, identity_cache
+
+API = '/study_plan'
+
+
+def user_selects(app, client, url, headers):
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith('SELECT') and 'FROM user' in statement:
+            statements.append(statement)
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', record)
+    try:
+        assert client.get(url, headers=headers).status_code == 200
+    finally:
+        event.remove(engine, 'before_cursor_execute', record)
+    return len(statements)
+
+
+def test_repeat_requests_resolve_the_user_from_the_cache(app, client, auth):
+    headers = auth()
+    identity_cache.clear()
+    assert user_selects(app, client, API + '/study_plans', headers) == 1
+    hits = identity_cache.stats()['hits']
+    assert user_selects(app, client, API + '/study_plans', headers) == 0
+    assert identity_cache.stats()['hits'] == hits + 1
+
+
+def test_cache_counters_are_served_on_metrics(client, auth):
+    client.get(API + '/study_plans', headers=auth())
+    body = client.get('/metrics').get_data(as_text=True)
+    for name in ('identity_cache_hits_total', 'identity_cache_misses_total',
+                 'identity_cache_evictions_total', 'identity_cache_entries'):
+        assert '\n{} '.format(name) in body
+    assert '# TYPE identity_cache_hits_total counter' in body
+
+
+def test_deleted_users_tokens_are_refused(app, client, auth):
+    headers = auth()
+    assert client.get(API + '/study_plans', headers=headers).status_code == 200
+    with app.app_context():
+        db.session.delete(db.session.query(User).filter_by(email='ada@example.com').one())
+        db.session.commit()
+    response = client.get(API + '/study_plans', headers=headers)
+    assert response.status_code == 401
+    assert response.get_json() == {'message': 'User not found'}
+
+
+def test_entries_expire_and_least_recently_used_are_evicted():
+    now = [0.0]
+    cache = TTLCache(maxsize=2, ttl=10, timer=lambda: now[0])
+    cache.set('a', 1)
+    cache.set('b', 2)
+    assert cache.get('a') == 1
+    cache.set('c', 3)
+    assert cache.get('b') is None and cache.get('a') == 1
+    now[0] = 11
+    assert cache.get('a') is None
+    assert cache.stats()['evictions'] == 1
@@ -0,0 +1,121 @@
+import time
+from models import db, StudyMaterial
+from utils import index_updates
+from utils.recommendation import IndexUpdater, _refit
+
+API = '/study_plan'
+
+
+def create_material(client, headers, title):
+    response = client.post(API + '/study_materials', json={
+        'title': title, 'description': title, 'link': 'https://example.com', 'is_public': True}, headers=headers)
+    assert response.status_code == 201
+    return response.get_json()['study_material']['id']
+
+
+def recommended(client, headers):
+    response = client.get(API + '/study_materials/recommendations', headers=headers)
+    return [item['id'] for item in response.get_json().get('recommendations', [])]
+
+
+def eventually(check, timeout=10):
+    deadline = time.monotonic() + timeout
+    while not check():
+        assert time.monotonic() < deadline, 'index was not updated within {}s'.format(timeout)
+        time.sleep(0.05)
+
+
+def test_writes_through_the_api_reach_recommendations(client, auth, recommendation_state):
+    ada = auth()
+    bob = auth('bob@example.com')
+    create_material(client, ada, 'Python generators')
+    assert recommended(client, ada) == []
+    assert recommendation_state._updater is not None
+
+    added = create_material(client, bob, 'Python asyncio')
+    eventually(lambda: recommended(client, ada) == [added])
+
+    assert client.put('{}/study_materials/{}'.format(API, added), json={'title': 'Organic chemistry',
+                                                                     'description': 'alkenes'},
+                      headers=bob).status_code == 200
+    eventually(lambda: recommended(client, ada) == [])
+
+    assert client.put('{}/study_materials/{}'.format(API, added), json={'title': 'Python again'},
+                      headers=bob).status_code == 200
+    eventually(lambda: recommended(client, ada) == [added])
+    assert client.delete('{}/study_materials/{}'.format(API, added), headers=bob).status_code == 200
+    # The endpoint already skips rows gone from the database, so wait on the index itself.
+    eventually(lambda: added not in recommendation_state._recommender.row_of)
+    stats = recommendation_state._updater.stats()
+    assert stats['applied'] == 4 and stats['max_lag'] >= stats['last_lag'] > 0
+
+
+def test_rolled_back_writes_are_not_queued(app, auth, recommendation_state):
+    auth()
+    index_updates.consuming.set()
+    try:
+        with app.app_context():
+            db.session.add(StudyMaterial(title='Draft', description='x', link='x', owner_id=1))
+            db.session.flush()
+            db.session.rollback()
+            assert index_updates.material_changes.empty()
+            db.session.add(StudyMaterial(title='Kept', description='x', link='x', owner_id=1))
+            db.session.commit()
+        _, material_id, document = index_updates.material_changes.get_nowait()
+        assert document[0] == 'Kept'
+    finally:
+        index_updates.consuming.clear()
+
+
+def test_savepoints_only_drop_their_own_changes(app, auth, recommendation_state):
+    auth()
+    index_updates.consuming.set()
+    try:
+        with app.app_context():
+            db.session.add(StudyMaterial(title='Outer', description='x', link='x', owner_id=1))
+            db.session.flush()
+            savepoint = db.session.begin_nested()
+            db.session.add(StudyMaterial(title='Undone', description='x', link='x', owner_id=1))
+            db.session.flush()
+            savepoint.rollback()
+            with db.session.begin_nested():
+                db.session.add(StudyMaterial(title='Released', description='x', link='x', owner_id=1))
+            assert index_updates.material_changes.empty()
+            db.session.commit()
+        titles = set()
+        while not index_updates.material_changes.empty():
+            titles.add(index_updates.material_changes.get_nowait()[2][0])
+        assert titles == {'Outer', 'Released'}
+    finally:
+        index_updates.consuming.clear()
+
+
+def test_polling_picks_up_other_workers_inserts(app, client, auth, recommendation_state):
+    headers = auth()
+    create_material(client, headers, 'Python generators')
+    with app.app_context():
+        recommendation_state.get_recommender(db.engine)
+        recommendation_state._updater.stop(timeout=5)
+        # Written by "another process": no ORM events fire here.
+        with db.engine.begin() as conn:
+            conn.execute(StudyMaterial.__table__.insert(), {'title': 'Python asyncio', 'description': 'x',
+                                                           'link': 'x', 'owner_id': 2})
+        updater = IndexUpdater(db.engine)
+        updater.poll()
+    assert updater.stats()['polled'] == 1
+    assert len(recommendation_state._recommender) == 2
+
+
+def test_background_refit_keeps_changes_folded_while_it_ran(app, client, auth, recommendation_state):
+    headers = auth()
+    kept = create_material(client, headers, 'Python generators')
+    dropped = create_material(client, headers, 'Python asyncio')
+    with app.app_context():
+        recommendation_state.get_recommender(db.engine)
+        recommendation_state._updater.stop(timeout=5)
+        recommendation_state._refit_changes = {}
+        IndexUpdater().fold({dropped: None})
+        _refit(db.engine)
+    recommender = recommendation_state._recommender
+    assert recommendation_state._refit_changes is None
+    assert kept in recommender.row_of and dropped not in recommender.row_of
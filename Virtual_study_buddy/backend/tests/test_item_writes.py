@@ -0,0 +1,75 @@
+import pytest
+from sqlalchemy import event
+from models import db
+
+API = '/study_plan'
+
+# collection -> (response key, body for a new item)
+COLLECTIONS = {
+    'study_plans': ('study_plan', {'title': 'Plan', 'description': 'x'}),
+    'study_materials': ('study_material', {'title': 'Notes', 'description': 'x', 'link': 'https://example.com'}),
+    'study_sessions': ('study_session', {'title': 'Session', 'description': 'x'}),
+    'reminders': ('reminder', {'title': 'Reminder', 'description': 'x', 'reminder_time': '2030-01-01T09:00:00'}),
+}
+
+
+def create(client, headers, collection):
+    key, body = COLLECTIONS[collection]
+    if collection == 'study_sessions':
+        body = dict(body, study_plan_id=create(client, headers, 'study_plans'))
+    response = client.post('{}/{}'.format(API, collection), json=body, headers=headers)
+    assert response.status_code == 201
+    return response.get_json()[key]['id']
+
+
+@pytest.mark.parametrize('collection', sorted(COLLECTIONS))
+def test_updates_and_deletes_are_owner_scoped(client, auth, collection):
+    key = COLLECTIONS[collection][0]
+    ada = auth()
+    bob = auth('bob@example.com')
+    item_id = create(client, ada, collection)
+    url = '{}/{}/{}'.format(API, collection, item_id)
+
+    assert client.put(url, json={'title': 'Hijacked'}, headers=bob).status_code == 404
+    assert client.delete(url, headers=bob).status_code == 404
+
+    response = client.put(url, json={'title': 'Renamed'}, headers=ada)
+    assert response.status_code == 200
+    assert response.get_json()[key]['title'] == 'Renamed'
+    assert response.get_json()[key]['description'] == 'x'
+    assert client.get(url, headers=ada).get_json()[key]['title'] == 'Renamed'
+
+    assert client.put(url, json={'owner_id': 2}, headers=ada).status_code == 400
+    assert client.delete(url, headers=ada).status_code == 200
+    assert client.delete(url, headers=ada).status_code == 404
+    assert client.put(url, json={'title': 'Gone'}, headers=ada).status_code == 404
+
+
+def test_update_is_one_statement_on_the_item_table(app, client, auth):
+    headers = auth()
+    item_id = create(client, headers, 'study_materials')
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if 'study_material' in statement.split('WHERE')[0] and 'study_material_tag' not in statement:
+            statements.append(' '.join(statement.split()[:3]))
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', record)
+    try:
+        response = client.put('{}/study_materials/{}'.format(API, item_id), json={'description': 'y'}, headers=headers)
+    finally:
+        event.remove(engine, 'before_cursor_execute', record)
+    assert response.status_code == 200
+    assert statements == ['UPDATE study_material SET']
+
+
+def test_sessions_cannot_move_to_another_users_plan(client, auth):
+    bob_plan = create(client, auth('bob@example.com'), 'study_plans')
+    headers = auth()
+    session_id = create(client, headers, 'study_sessions')
+    response = client.put('{}/study_sessions/{}'.format(API, session_id), json={'study_plan_id': bob_plan},
+                          headers=headers)
+    assert response.status_code == 400
+    assert response.get_json() == {'message': 'study plan {} not found'.format(bob_plan)}
@@ -0,0 +1,64 @@
+import json
+import os
+import pytest
+from utils import metrics as metrics_module
+from utils.metrics import Metrics, render
+
+API = '/study_plan'
+ITEM_ROUTE = '/study_plan/study_plans/<int:study_plan_id>'
+
+
+@pytest.fixture
+def fresh_metrics():
+    metrics_module.metrics.reset()
+    yield metrics_module.metrics
+    metrics_module.metrics.reset()
+
+
+def scrape(client):
+    response = client.get('/metrics')
+    assert response.status_code == 200 and response.mimetype == 'text/plain'
+    series = {}
+    for line in response.get_data(as_text=True).splitlines():
+        if line and not line.startswith('#'):
+            name, value = line.rsplit(' ', 1)
+            series[name] = float(value)
+    return series
+
+
+def test_requests_are_recorded_per_route_template(client, auth, fresh_metrics):
+    headers = auth()
+    plan_id = client.post(API + '/study_plans', json={'title': 'Plan', 'description': 'x'},
+                          headers=headers).get_json()['study_plan']['id']
+    sizes = [len(client.get('{}/study_plans/{}'.format(API, item_id), headers=headers).get_data())
+             for item_id in (plan_id, plan_id, 999)]
+    client.get('/no-such-page')
+
+    series = scrape(client)
+    labels = 'method="GET",route="{}"'.format(ITEM_ROUTE)
+    assert series['http_responses_total{%s,status="200"}' % labels] == 2
+    assert series['http_responses_total{%s,status="404"}' % labels] == 1
+    assert series['http_request_duration_seconds_count{%s}' % labels] == 3
+    assert series['http_request_duration_seconds_bucket{%s,le="+Inf"}' % labels] == 3
+    assert series['http_request_duration_seconds_bucket{%s,le="0.005"}' % labels] <= \
+        series['http_request_duration_seconds_bucket{%s,le="10.0"}' % labels]
+    assert series['http_response_size_bytes_sum{%s}' % labels] == sum(sizes)
+    assert series['http_requests_in_flight{%s}' % labels] == 0
+    assert series['http_responses_total{method="GET",route="unmatched",status="404"}'] == 1
+
+
+def test_scrapes_add_up_other_workers_and_forget_dead_ones_gauges(tmp_path, fresh_metrics):
+    local = Metrics(directory=str(tmp_path))
+    local.started(('GET', '/a'))
+    local.finished(('GET', '/a'), 0.002, 200, 10)
+    # in_flight, latency buckets, latency sum, size buckets, size sum, statuses
+    other = [3, [1] + [0] * 11, 0.001, [1] + [0] * 6, 5, {'200': 1}]
+    for pid in (os.getppid(), 2 ** 22 + 1):
+        with open(tmp_path / 'metrics-{}.json'.format(pid), 'w') as out:
+            json.dump({'series': {'GET /a': other}, 'values': {}}, out)
+
+    merged, _ = local.collect()
+    in_flight, latency, _, _, size_sum, statuses = merged['GET /a']
+    assert statuses == {'200': 3} and size_sum == 20 and sum(latency) == 3
+    assert in_flight == 3
+    assert 'http_requests_in_flight{method="GET",route="/a"} 3' in render(merged)
@@ -0,0 +1,56 @@
+import json
+from models import db, StudyPlan, User
+from utils import streaming
+from utils.database import insert_rows
+
+API = '/study_plan'
+NDJSON = {'Accept': 'application/x-ndjson'}
+
+
+def seed_plans(app, email, count):
+    with app.app_context():
+        owner_id = db.session.query(User.id).filter_by(email=email).scalar()
+        with db.engine.begin() as conn:
+            return insert_rows(conn, StudyPlan.__table__, [
+                {'title': 'Plan %d' % i, 'description': 'x', 'owner_id': owner_id} for i in range(count)])
+
+
+def read_lines(response):
+    assert response.status_code == 200
+    assert response.mimetype == 'application/x-ndjson'
+    return [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+
+def test_whole_collection_is_streamed_past_the_page_limit(app, client, auth):
+    headers = auth()
+    auth('bob@example.com')
+    ids = seed_plans(app, 'ada@example.com', 250)
+    seed_plans(app, 'bob@example.com', 3)
+
+    documents = read_lines(client.get(API + '/study_plans', headers={**headers, **NDJSON}))
+    assert [document['id'] for document in documents] == ids
+    assert documents[0]['title'] == 'Plan 0' and 'created_at' in documents[0]
+
+    paged = client.get(API + '/study_plans', headers=headers)
+    assert paged.mimetype == 'application/json' and len(paged.get_json()['study_plans']) == 50
+
+
+def test_stream_honours_fields_and_tag_filters(client, auth):
+    headers = auth()
+    for tags in ('exam', 'exam', None):
+        client.post(API + '/study_plans', json={'title': 'T', 'description': 'x', 'tags': tags}, headers=headers)
+    documents = read_lines(client.get(API + '/study_plans?tags=exam&fields=id,title',
+                                      headers={**headers, **NDJSON}))
+    assert documents == [{'id': 1, 'title': 'T'}, {'id': 2, 'title': 'T'}]
+    assert read_lines(client.get(API + '/study_materials', headers={**headers, **NDJSON})) == []
+
+
+def test_lines_are_grouped_into_bounded_writes(app, client, auth, monkeypatch):
+    headers = auth()
+    seed_plans(app, 'ada@example.com', 20)
+    monkeypatch.setattr(streaming, 'STREAM_FLUSH_BYTES', 200)
+    response = client.get(API + '/study_plans', headers={**headers, **NDJSON})
+    chunks = list(response.response)
+    assert len(chunks) > 1
+    assert all(chunk.endswith(b'\n') for chunk in chunks)
+    assert sum(chunk.count(b'\n') for chunk in chunks) == 20
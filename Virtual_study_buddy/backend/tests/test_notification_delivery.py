@@ -0,0 +1,138 @@
+import smtplib
+import socket
+import time
+from datetime import datetime, timedelta
+from email import message_from_bytes
+from email.message import EmailMessage
+
+import pytest
+from models import db
+from utils.notification import DeliveryPipeline, ReminderDispatcher, ReminderNotifier, SMTPConnectionPool
+
+API = '/study_plan'
+START = datetime(2030, 1, 1, 9, 0)
+
+
+class FakeConnection:
+    def __init__(self, outbox, responses):
+        self.outbox = outbox
+        self.responses = responses
+
+    def send_message(self, message):
+        if self.responses:
+            raise self.responses.pop(0)
+        self.outbox.append(message)
+
+    def close(self):
+        pass
+
+    quit = close
+
+
+class FakePool(SMTPConnectionPool):
+    """
+    SMTPConnectionPool whose connects fail with `connect_errors` in turn and
+    whose sends fail with `send_errors` in turn.
+    """
+
+    def __init__(self, connect_errors=(), send_errors=()):
+        super().__init__(size=2)
+        self.connect_errors = list(connect_errors)
+        self.send_errors = list(send_errors)
+        self.outbox = []
+
+    def _connect(self):
+        if self.connect_errors:
+            raise self.connect_errors.pop(0)
+        return FakeConnection(self.outbox, self.send_errors)
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def message(to='ada@example.com'):
+    result = EmailMessage()
+    result['To'] = to
+    result.set_content('x')
+    return result
+
+
+def test_connect_failures_and_temporary_rejections_are_retried():
+    pool = FakePool(connect_errors=[ConnectionRefusedError(), smtplib.SMTPConnectError(421, b'busy')],
+                    send_errors=[smtplib.SMTPResponseException(451, b'try later')])
+    pipeline = DeliveryPipeline(pool, max_retries=3, backoff=0.001)
+    assert pipeline.deliver([message()]) == [True]
+    assert pipeline.stats()['retried'] == 3 and len(pool.outbox) == 1
+    pipeline.shutdown()
+
+
+def test_permanent_rejections_and_persistent_outages_give_up():
+    pipeline = DeliveryPipeline(FakePool(send_errors=[smtplib.SMTPResponseException(550, b'no such user')]),
+                                max_retries=3, backoff=0.001)
+    assert pipeline.deliver([message()]) == [False]
+    assert pipeline.stats()['retried'] == 0
+    pipeline = DeliveryPipeline(FakePool(connect_errors=[OSError('down')] * 10), max_retries=2, backoff=0.001)
+    assert pipeline.deliver([message()]) == [False]
+    assert pipeline.stats()['failed'] == 1
+    assert pipeline.stats()['retried'] == 2
+
+
+def test_unexpected_errors_fail_the_message_and_free_the_connection():
+    pool = FakePool(send_errors=[UnicodeEncodeError('ascii', 'é', 0, 1, 'bad')] * 3)
+    pipeline = DeliveryPipeline(pool, concurrency=2, max_retries=3, backoff=0.001)
+    assert pipeline.deliver([message() for _ in range(3)]) == [False] * 3
+    assert pipeline.stats()['failed'] == 3 and pipeline.stats()['retried'] == 0
+    futures = pipeline.submit([message(), message()])
+    assert [future.result(timeout=5) for future in futures] == [True, True]
+    pipeline.shutdown()
+
+
+def test_throughput_ignores_idle_time():
+    pipeline = DeliveryPipeline(FakePool())
+    assert pipeline.stats()['messages_per_second'] == 0.0
+    time.sleep(0.5)
+    pipeline.deliver([message() for _ in range(4)])
+    assert pipeline.stats()['messages_per_second'] > 40
+    pipeline.shutdown()
+
+
+def test_due_reminders_reach_a_local_smtp_server_as_one_digest_per_user(app, client, auth):
+    controller = pytest.importorskip('aiosmtpd.controller')
+
+    class Handler:
+        def __init__(self):
+            self.messages = []
+
+        async def handle_DATA(self, server, session, envelope):
+            self.messages.append(message_from_bytes(envelope.content))
+            return '250 OK'
+
+    headers = auth()
+    for minutes in (1, 2):
+        assert client.post(API + '/reminders', json={
+            'title': 'Review %d' % minutes, 'description': 'x',
+            'reminder_time': (START + timedelta(minutes=minutes)).isoformat()}, headers=headers).status_code == 201
+
+    handler = Handler()
+    port = free_port()
+    server = controller.Controller(handler, hostname='127.0.0.1', port=port)
+    server.start()
+    try:
+        pipeline = DeliveryPipeline(SMTPConnectionPool(host='127.0.0.1', port=port, size=2))
+        with app.app_context():
+            futures = []
+            notifier = ReminderNotifier(db.engine, pipeline)
+            dispatcher = ReminderDispatcher(db.engine, lambda ids: futures.extend(notifier(ids)))
+            dispatcher.tick(START)
+            dispatcher.tick(START + timedelta(minutes=5))
+        assert [future.result(timeout=10) for future in futures] == [True]
+        pipeline.shutdown()
+    finally:
+        server.stop()
+    sent, = handler.messages
+    assert sent['To'] == 'ada@example.com'
+    assert sent['Subject'] == 'You have 2 study reminders'
+    assert 'Review 1' in sent.get_payload() and 'Review 2' in sent.get_payload()
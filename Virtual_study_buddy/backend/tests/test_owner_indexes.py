@@ -0,0 +1,54 @@
+import pytest
+from sqlalchemy import event
+from models import db
+
+API = '/study_plan'
+
+
+def plans_for(app, client, url, headers):
+    """
+    SQLite's plan for every statement the request runs against a study table.
+    """
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if 'FROM study_' in statement or 'FROM reminder' in statement:
+            statements.append((statement, parameters))
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', record)
+    try:
+        assert client.get(url, headers=headers).status_code == 200
+    finally:
+        event.remove(engine, 'before_cursor_execute', record)
+    with engine.connect() as conn:
+        return [' '.join(row[-1] for row in conn.exec_driver_sql('EXPLAIN QUERY PLAN ' + statement, parameters))
+                for statement, parameters in statements]
+
+
+@pytest.mark.parametrize('collection, table', [
+    ('study_plans', 'study_plan'),
+    ('study_materials', 'study_material'),
+    ('study_sessions', 'study_session'),
+    ('reminders', 'reminder'),
+])
+def test_owner_list_pages_are_index_range_scans(app, client, auth, collection, table):
+    headers = auth()
+    plans = plans_for(app, client, '{}/{}?limit=10'.format(API, collection), headers)
+    assert plans
+    for plan in plans:
+        assert 'INDEX ix_{}_owner_id'.format(table) in plan, plan
+
+
+def test_owner_indexes_exist(app):
+    with app.app_context(), db.engine.connect() as conn:
+        names = {row[0] for row in conn.exec_driver_sql("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    assert {
+        'ix_study_plan_owner_id_due_date',
+        'ix_study_material_owner_id_due_date',
+        'ix_study_session_owner_id_due_date',
+        'ix_study_session_study_plan_id',
+        'ix_reminder_owner_id_reminder_time',
+        'ix_reminder_reminder_time',
+    } <= names
@@ -0,0 +1,55 @@
+import pytest
+from utils.pagination import encode_cursor
+
+API = '/study_plan'
+COLLECTIONS = (
+    ('study_plans', {}),
+    ('study_materials', {'link': 'https://example.com'}),
+    ('study_sessions', {}),
+    ('reminders', {'reminder_time': '2030-01-01T09:00:00'}),
+)
+
+
+def create(client, headers, collection, extra, count):
+    for i in range(count):
+        body = dict(extra, title='Item %d' % i, description='Notes %d' % i)
+        assert client.post('{}/{}'.format(API, collection), json=body, headers=headers).status_code == 201
+
+
+@pytest.mark.parametrize('collection, extra', COLLECTIONS)
+def test_pages_follow_the_cursor_without_gaps_or_overlap(client, auth, collection, extra):
+    headers = auth()
+    if collection == 'study_sessions':
+        plan = client.post(API + '/study_plans', json={'title': 'Plan', 'description': 'x'}, headers=headers)
+        extra = {'study_plan_id': plan.get_json()['study_plan']['id']}
+    create(client, headers, collection, extra, 5)
+    seen = []
+    cursor = None
+    while True:
+        url = '{}/{}?limit=2'.format(API, collection) + ('&after=' + cursor if cursor else '')
+        body = client.get(url, headers=headers).get_json()
+        seen.extend(item['id'] for item in body[collection])
+        cursor = body['next_cursor']
+        if cursor is None:
+            break
+    assert seen == sorted(seen) and len(set(seen)) == 5
+
+
+def test_pages_only_hold_the_users_own_items(client, auth):
+    create(client, auth('other@example.com'), 'study_plans', {}, 3)
+    headers = auth()
+    create(client, headers, 'study_plans', {}, 1)
+    body = client.get(API + '/study_plans', headers=headers).get_json()
+    assert [plan['title'] for plan in body['study_plans']] == ['Item 0']
+    assert body['next_cursor'] is None
+
+
+@pytest.mark.parametrize('cursor', ['not-a-cursor', encode_cursor(['1']), encode_cursor([True]), encode_cursor([1, 2])])
+def test_malformed_cursors_are_rejected(client, auth, cursor):
+    response = client.get(API + '/study_plans?after=' + cursor, headers=auth())
+    assert response.status_code == 400
+    assert response.get_json()['message'] == 'Malformed cursor'
+
+
+def test_limit_must_be_an_integer(client, auth):
+    assert client.get(API + '/study_plans?limit=ten', headers=auth()).status_code == 400
@@ -0,0 +1,42 @@
+import threading
+from conftest import PASSWORD, login, register
+from models import db, User
+from utils.hashing import hash_rounds, hasher
+
+
+def test_register_and_login(client, app):
+    assert register(client, 'ada@example.com').status_code == 201
+    assert register(client, 'ada@example.com').status_code == 400
+    assert login(client, 'ada@example.com').status_code == 200
+    assert login(client, 'ada@example.com', 'wrong password').status_code == 401
+    assert login(client, 'nobody@example.com').status_code == 401
+    with app.app_context():
+        stored = db.session.query(User).filter_by(email='ada@example.com').one()._password
+    assert stored.startswith('$2b$') and stored != PASSWORD
+
+
+def test_login_upgrades_a_weaker_hash(client, app, monkeypatch):
+    register(client, 'ada@example.com')
+    monkeypatch.setattr(hasher, 'rounds', hasher.rounds + 1)
+    assert login(client, 'ada@example.com').status_code == 200
+    with app.app_context():
+        stored = db.session.query(User).filter_by(email='ada@example.com').one()._password
+    assert hash_rounds(stored) == hasher.rounds
+    assert login(client, 'ada@example.com').status_code == 200
+
+
+def test_full_queue_is_answered_503(client, monkeypatch):
+    slots = threading.BoundedSemaphore(1)
+    slots.acquire()
+    monkeypatch.setattr(hasher, '_slots', slots)
+    response = register(client, 'ada@example.com')
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == str(hasher.retry_after)
+
+
+def test_slow_hash_is_answered_503(client, monkeypatch):
+    monkeypatch.setattr(hasher, 'rounds', 12)
+    monkeypatch.setattr(hasher, 'timeout', 0.001)
+    response = register(client, 'ada@example.com')
+    assert response.status_code == 503
+    assert 'Retry-After' in response.headers
@@ -0,0 +1,58 @@
+import os
+import time
+import pytest
+from utils import profiler
+
+
+@pytest.fixture
+def no_profile():
+    profiler._profile = None
+    yield
+    profiler.stop_profile()
+    profiler._profile = None
+
+
+def test_only_admins_may_profile(client, auth, no_profile):
+    assert client.get('/admin/profile').status_code == 401
+    headers = auth()
+    assert client.post('/admin/profile', json={}, headers=headers).status_code == 403
+    assert client.get('/admin/profile', headers=headers).status_code == 403
+
+
+def test_profile_samples_requests_and_writes_folded_stacks(app, client, auth, no_profile):
+    user = auth()
+    admin = auth('admin@example.com')
+    assert client.get('/admin/profile', headers=admin).status_code == 404
+    assert client.post('/admin/profile', json={'seconds': 0}, headers=admin).status_code == 400
+    assert client.post('/admin/profile', json={'interval_ms': 'fast'}, headers=admin).status_code == 400
+    original = app.wsgi_app
+
+    response = client.post('/admin/profile', json={'seconds': 30, 'interval_ms': 1}, headers=admin)
+    assert response.status_code == 202
+    assert response.get_json()['profile']['running'] is True
+    assert client.post('/admin/profile', json={}, headers=admin).status_code == 409
+
+    deadline = time.monotonic() + 5
+    while profiler._profile.samples.total() < 20 and time.monotonic() < deadline:
+        client.get('/study_plan/study_plans', headers=user)
+
+    status = client.delete('/admin/profile', headers=admin).get_json()['profile']
+    assert status['running'] is False and status['samples'] > 0
+    assert status['requests']['GET /study_plan/study_plans'] > 0
+    assert app.wsgi_app == original
+
+    path, = [path for path in status['files'] if path.endswith('GET_study_plan_study_plans.folded')]
+    assert path.startswith(os.path.abspath(profiler.PROFILE_DIR))
+    with open(path) as folded:
+        stack, count = folded.readline().rsplit(' ', 1)
+    assert stack.startswith('GET /study_plan/study_plans;') and int(count) > 0
+    assert client.get('/admin/profile', headers=admin).get_json()['profile']['id'] == status['id']
+
+
+def test_every_nth_request_is_sampled(app, client, auth, no_profile):
+    headers = auth('admin@example.com')
+    client.post('/admin/profile', json={'every': 3, 'interval_ms': 1000}, headers=headers)
+    for _ in range(6):
+        client.get('/metrics')
+    status = client.delete('/admin/profile', headers=headers).get_json()['profile']
+    assert status['requests'].get('GET /metrics') == 2
@@ -0,0 +1,49 @@
+import logging
+import re
+from utils import query_stats
+from utils.query_stats import QueryStats, statement_shape
+
+API = '/study_plan'
+SERVER_TIMING = re.compile(r'^db;desc="(\d+) queries";dur=\d+\.\d\d$')
+
+
+def test_requests_report_their_queries(client, auth, caplog):
+    headers = auth()
+    with caplog.at_level(logging.INFO, logger='utils.query_stats'):
+        response = client.get(API + '/study_plans', headers=headers)
+    match = SERVER_TIMING.match(response.headers['Server-Timing'])
+    assert match and int(match.group(1)) >= 1
+
+    record, = [record for record in caplog.records if getattr(record, 'route', None) == API + '/study_plans']
+    assert record.db_queries == int(match.group(1))
+    assert record.status == 200 and record.method == 'GET' and record.db_repeated == 0
+
+
+def test_slow_queries_are_logged_without_their_values(client, caplog, monkeypatch):
+    monkeypatch.setattr(query_stats, 'DB_SLOW_QUERY_MS', 0)
+    with caplog.at_level(logging.WARNING, logger='utils.query_stats'):
+        client.post('/login', json={'email': 'secret-person@example.com', 'password': 'hunter2hunter2'})
+    slow = [record for record in caplog.records if record.getMessage().startswith('Slow query')]
+    assert slow
+    assert not any('secret-person' in record.getMessage() or 'hunter2' in record.getMessage() for record in slow)
+
+
+def test_repeated_selects_are_flagged(app, caplog):
+    stats = QueryStats()
+    for item_id in range(12):
+        stats.shapes[statement_shape('SELECT * FROM reminder WHERE id = {}'.format(item_id))] += 1
+    stats.shapes[statement_shape('UPDATE reminder SET title = ?')] += 12
+    stats.count = 24
+    with app.test_request_context('/study_plan/reminders'), caplog.at_level(logging.WARNING, 'utils.query_stats'):
+        query_stats._current.set(stats)
+        response = query_stats._finish(app.response_class())
+    assert response.headers['Server-Timing'].startswith('db;desc="24 queries"')
+    warning, = [record for record in caplog.records if record.levelno == logging.WARNING]
+    assert warning.repeats == 12 and warning.statement == 'SELECT * FROM reminder WHERE id = ?'
+
+
+def test_statement_shapes_drop_literals_and_collapse_lists():
+    assert statement_shape("SELECT * FROM t WHERE a = 'x''y' AND b = 3.5") == 'SELECT * FROM t WHERE a = ? AND b = ?'
+    assert statement_shape('SELECT * FROM t WHERE id IN (?, ?, ?)') == 'SELECT * FROM t WHERE id IN (?)'
+    assert statement_shape('INSERT INTO t (a, b) VALUES (?, ?), (?, ?),\n (?, ?)') == \
+        'INSERT INTO t (a, b) VALUES (?)'
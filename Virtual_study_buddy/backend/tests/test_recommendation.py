@@ -0,0 +1,94 @@
+import numpy as np
+from utils.recommendation import MaterialRecommender, tokenize
+
+API = '/study_plan'
+
+DOCUMENTS = [
+    (1, 'Python generators', 'Lazy iteration with yield in Python', 'python,iterators'),
+    (2, 'Python decorators', 'Wrapping functions in Python', 'python,functions'),
+    (3, 'Organic chemistry', 'Alkanes, alkenes and reaction mechanisms', 'chemistry'),
+    (4, 'Cell biology', 'Mitochondria and the cell membrane', 'biology'),
+    (5, 'Python asyncio', 'Coroutines and the event loop in Python', 'python,async'),
+]
+
+
+def create_material(client, headers, title, description, tags, public=True):
+    response = client.post(API + '/study_materials', json={
+        'title': title, 'description': description, 'link': 'https://example.com/' + title.replace(' ', '-'),
+        'tags': tags, 'is_public': public}, headers=headers)
+    assert response.status_code == 201, response.get_json()
+    return response.get_json()['study_material']['id']
+
+
+def test_scores_match_a_dense_tfidf_cosine():
+    recommender = MaterialRecommender.fit(DOCUMENTS)
+    vocabulary = sorted({term for _, *fields in DOCUMENTS for term in tokenize(*fields)})
+    tf = np.zeros((len(DOCUMENTS), len(vocabulary)))
+    for row, (_, *fields) in enumerate(DOCUMENTS):
+        for term in tokenize(*fields):
+            tf[row, vocabulary.index(term)] += 1
+    tf[tf > 0] = 1 + np.log(tf[tf > 0])
+    idf = np.log((1 + len(DOCUMENTS)) / (1 + (tf > 0).sum(axis=0))) + 1
+    weighted = tf * idf
+    query = weighted[0] / np.linalg.norm(weighted[0])
+    expected = weighted @ query / np.linalg.norm(weighted, axis=1)
+
+    vector = recommender.profile([1])
+    columns = [recommender.vocabulary[term] for term in vocabulary]
+    assert np.allclose(vector[columns], query, atol=1e-5)
+    assert np.allclose(recommender.scores(vector), expected, atol=1e-5)
+    ranked = recommender.recommend([1], k=2)
+    assert [material_id for material_id, _ in ranked] == list(np.argsort(-expected)[1:3] + 1)
+
+
+def test_top_k_skips_excluded_and_unrelated_materials():
+    recommender = MaterialRecommender.fit(DOCUMENTS)
+    ranked = recommender.search(recommender.text_profile('python'), k=10, exclude=[2])
+    assert sorted(material_id for material_id, _ in ranked) == [1, 5]
+    assert recommender.text_profile('quantum') is None
+
+
+def test_recommendations_come_from_other_users_materials(client, auth, recommendation_state):
+    ada = auth()
+    bob = auth('bob@example.com')
+    create_material(client, ada, *DOCUMENTS[0][1:])
+    create_material(client, ada, *DOCUMENTS[1][1:])
+    chemistry = create_material(client, bob, *DOCUMENTS[2][1:])
+    create_material(client, bob, *DOCUMENTS[3][1:])
+    asyncio = create_material(client, bob, *DOCUMENTS[4][1:])
+
+    response = client.get(API + '/study_materials/recommendations?k=2', headers=ada)
+    assert response.status_code == 200
+    recommendations = response.get_json()['recommendations']
+    assert recommendations[0]['id'] == asyncio
+    assert recommendations[0]['title'] == 'Python asyncio'
+    scores = [item['score'] for item in recommendations]
+    assert scores == sorted(scores, reverse=True)
+
+    response = client.get(API + '/study_materials/recommendations?q=alkenes', headers=ada)
+    assert [item['id'] for item in response.get_json()['recommendations']] == [chemistry]
+
+
+def test_private_materials_are_not_recommended(client, auth, recommendation_state):
+    ada = auth()
+    bob = auth('bob@example.com')
+    create_material(client, ada, *DOCUMENTS[0][1:])
+    create_material(client, bob, *DOCUMENTS[4][1:], public=False)
+    create_material(client, bob, *DOCUMENTS[2][1:], public=False)
+    decorators = create_material(client, bob, *DOCUMENTS[1][1:])
+
+    response = client.get(API + '/study_materials/recommendations?k=1', headers=ada)
+    assert [item['id'] for item in response.get_json()['recommendations']] == [decorators]
+    response = client.get(API + '/study_materials/recommendations?q=alkenes', headers=ada)
+    assert response.get_json() == {'message': 'No recommendations found'}
+    response = client.get(API + '/study_materials/recommendations?q=python', headers=ada)
+    assert [item['id'] for item in response.get_json()['recommendations']] == [decorators]
+
+
+def test_bad_k_and_empty_profiles(client, auth, recommendation_state):
+    headers = auth()
+    response = client.get(API + '/study_materials/recommendations?k=ten', headers=headers)
+    assert response.status_code == 400
+    response = client.get(API + '/study_materials/recommendations', headers=headers)
+    assert response.get_json() == {'message': 'No recommendations found'}
+    assert client.get(API + '/study_materials/recommendations').status_code == 401
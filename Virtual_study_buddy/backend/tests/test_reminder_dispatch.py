@@ -0,0 +1,50 @@
+from datetime import datetime, timedelta
+from models import db
+from utils.notification import ReminderDispatcher
+
+API = '/study_plan'
+START = datetime(2030, 1, 1, 9, 0)
+
+
+def create_reminder(client, headers, at):
+    response = client.post(API + '/reminders', json={
+        'title': 'Reminder', 'description': 'x', 'reminder_time': at.isoformat()}, headers=headers)
+    assert response.status_code == 201
+    return response.get_json()['reminder']['id']
+
+
+def test_due_reminders_fire_once_with_edits_and_deletes_applied(app, client, auth):
+    headers = auth()
+    first = create_reminder(client, headers, START + timedelta(seconds=10))
+    moved = create_reminder(client, headers, START + timedelta(seconds=20))
+    deleted = create_reminder(client, headers, START + timedelta(seconds=30))
+    fired = []
+    with app.app_context():
+        dispatcher = ReminderDispatcher(db.engine, fired.extend, clock=lambda: START)
+        dispatcher.tick(START)
+        assert fired == [] and len(dispatcher) == 3
+
+        assert client.put('{}/reminders/{}'.format(API, moved), json={
+            'reminder_time': (START + timedelta(seconds=5)).isoformat()}, headers=headers).status_code == 200
+        assert client.delete('{}/reminders/{}'.format(API, deleted), headers=headers).status_code == 200
+
+        dispatcher.tick(START + timedelta(seconds=6))
+        assert fired == [moved]
+        dispatcher.tick(START + timedelta(seconds=60))
+        assert fired == [moved, first]
+        dispatcher.tick(START + timedelta(seconds=120))
+        assert fired == [moved, first]
+
+
+def test_reminders_beyond_the_window_are_loaded_when_it_advances(app, client, auth):
+    headers = auth()
+    later = create_reminder(client, headers, START + timedelta(hours=2))
+    fired = []
+    with app.app_context():
+        dispatcher = ReminderDispatcher(db.engine, fired.extend, window=timedelta(minutes=5))
+        next_run = dispatcher.tick(START)
+        assert len(dispatcher) == 0 and next_run <= START + timedelta(minutes=5)
+        dispatcher.tick(START + timedelta(hours=2) - timedelta(minutes=1))
+        assert len(dispatcher) == 1
+        dispatcher.tick(START + timedelta(hours=2))
+    assert fired == [later]
@@ -0,0 +1,92 @@
+from utils.search import highlight, match_expression
+
+API = '/study_plan'
+
+
+def create(client, headers, kind, title, description='', tags=None):
+    body = {'title': title, 'description': description, 'tags': tags}
+    if kind == 'study_materials':
+        body['link'] = 'https://example.com'
+    response = client.post('{}/{}'.format(API, kind), json=body, headers=headers)
+    assert response.status_code == 201, response.get_json()
+    return response.get_json()[kind[:-1]]['id']
+
+
+def search(client, headers, **params):
+    response = client.get(API + '/search', query_string=params, headers=headers)
+    assert response.status_code == 200, response.get_json()
+    return response.get_json()
+
+
+def test_results_are_ranked_and_owner_scoped(client, auth):
+    ada = auth()
+    bob = auth('bob@example.com')
+    in_title = create(client, ada, 'study_plans', 'Calculus revision', 'limits')
+    in_description = create(client, ada, 'study_materials', 'Lecture notes', 'chapter on calculus')
+    create(client, bob, 'study_plans', 'Calculus for bob')
+
+    results = search(client, ada, q='calculus')['results']
+    assert [(item['type'], item['id']) for item in results] == [('plans', in_title), ('materials', in_description)]
+    assert results[0]['score'] > results[1]['score']
+    assert '<b>calculus</b>' in results[1]['snippet'].lower()
+
+    assert [item['id'] for item in search(client, ada, q='calc', type='materials')['results']] == [in_description]
+    assert search(client, bob, q='limits')['results'] == []
+
+
+def test_edits_and_deletes_are_reflected(client, auth):
+    headers = auth()
+    plan = create(client, headers, 'study_plans', 'Algebra')
+    assert client.put('{}/study_plans/{}'.format(API, plan), json={'title': 'Geometry'},
+                      headers=headers).status_code == 200
+    assert search(client, headers, q='algebra')['results'] == []
+    assert [item['id'] for item in search(client, headers, q='geometry')['results']] == [plan]
+    assert client.delete('{}/study_plans/{}'.format(API, plan), headers=headers).status_code == 200
+    assert search(client, headers, q='geometry')['results'] == []
+
+
+def test_pages_follow_the_cursor(client, auth):
+    headers = auth()
+    created = {create(client, headers, 'study_plans', 'Physics {}'.format(i)) for i in range(5)}
+    seen = []
+    page = search(client, headers, q='physics', limit=2)
+    while True:
+        assert len(page['results']) <= 2
+        seen.extend(item['id'] for item in page['results'])
+        if not page['next_cursor']:
+            break
+        page = search(client, headers, q='physics', limit=2, after=page['next_cursor'])
+    assert sorted(seen) == sorted(created)
+
+
+def test_bad_requests(client, auth):
+    headers = auth()
+    assert client.get(API + '/search', headers=headers).status_code == 400
+    assert client.get(API + '/search?q=x&type=users', headers=headers).status_code == 400
+    assert client.get(API + '/search?q=x&after=garbage', headers=headers).status_code == 400
+    # FTS5 syntax in the input is searched for literally, never parsed.
+    assert search(client, headers, q='owner_id:2 OR "')['results'] == []
+
+
+def test_match_expression_quotes_words_and_scopes_the_owner():
+    assert match_expression(3, 'the Derivatives of') == \
+        'owner_id:3 AND {title description tags comments}:("derivatives"*)'
+    assert match_expression(3, 'the').endswith('("the"*)')
+    assert match_expression(3, 'ca').endswith('("ca")')
+    assert match_expression(3, '***') is None
+
+
+def test_snippets_escape_stored_markup(client, auth):
+    headers = auth()
+    create(client, headers, 'study_plans', 'Exploit <script>alert(1)</script>',
+           'calculus <img src=x onerror=alert(1)> notes')
+    snippet = search(client, headers, q='calculus')['results'][0]['snippet']
+    assert '<script>' not in snippet and '<img' not in snippet
+    assert '&lt;img src=x onerror=alert(1)&gt;' in snippet
+    assert snippet.startswith('<b>calculus</b>')
+
+
+def test_highlight_only_emits_its_own_tags():
+    assert highlight('a <i> \x02b\x03 c') == 'a &lt;i&gt; <b>b</b> c'
+    assert highlight('\x03x\x02<y>') == 'x<b>&lt;y&gt;</b>'
+    assert highlight(None) is None
@@ -0,0 +1,52 @@
+from datetime import datetime
+from models import db, Reminder
+from utils.serializers import SERIALIZERS, row_serializer, serialize_objects
+
+API = '/study_plan'
+
+
+def test_created_items_read_back_with_iso_dates(client, auth):
+    headers = auth()
+    response = client.post(API + '/reminders', json={'title': 'Exam', 'description': 'x',
+                                                     'reminder_time': '2030-01-01T09:30:00'}, headers=headers)
+    assert response.status_code == 201
+    created = response.get_json()['reminder']
+    assert created['reminder_time'] == '2030-01-01T09:30:00'
+    datetime.fromisoformat(created['created_at'])
+
+    item = client.get('{}/reminders/{}'.format(API, created['id']), headers=headers).get_json()['reminder']
+    assert item == created
+    listed = client.get(API + '/reminders', headers=headers).get_json()['reminders']
+    assert listed == [created]
+
+
+def test_non_object_and_invalid_bodies_are_rejected(client, auth):
+    headers = auth()
+    for body in ([1, 2], 'plan', 42):
+        response = client.post(API + '/study_plans', json=body, headers=headers)
+        assert response.status_code == 400
+        assert response.get_json() == {'message': 'expected a JSON object'}
+    plan_id = client.post(API + '/study_plans', json={'title': 'Plan', 'description': 'x'},
+                          headers=headers).get_json()['study_plan']['id']
+    response = client.put('{}/study_plans/{}'.format(API, plan_id), json=['title'], headers=headers)
+    assert response.get_json() == {'message': 'expected a JSON object'}
+
+    response = client.post(API + '/reminders', json={'title': 'x' * 61, 'description': 'x',
+                                                     'reminder_time': 'tomorrow', 'colour': 'red'}, headers=headers)
+    assert response.status_code == 400
+    message = response.get_json()['message']
+    assert 'title: longer than 60 characters' in message
+    assert 'reminder_time' in message and 'unknown fields: colour' in message
+
+
+def test_generated_serializers_match_the_model_columns(app, client, auth):
+    headers = auth()
+    client.post(API + '/reminders', json={'title': 'Exam', 'description': 'x',
+                                          'reminder_time': '2030-01-01T09:30:00'}, headers=headers)
+    with app.app_context():
+        reminder = db.session.query(Reminder).one()
+        row = db.session.execute(db.select(*Reminder.__table__.c)).one()
+        assert serialize_objects('reminders', [reminder]) == [SERIALIZERS['reminders'](row)]
+        assert list(SERIALIZERS['reminders'](row)) == Reminder.__table__.c.keys()
+    assert row_serializer(('a', 'b')) is row_serializer(('a', 'b'))
+    assert row_serializer(('a', 'b'))((1, 2)) == {'a': 1, 'b': 2}
@@ -0,0 +1,50 @@
+from sqlalchemy import event
+from models import db
+
+API = '/study_plan'
+
+
+def test_list_and_item_responses_carry_only_the_requested_fields(client, auth):
+    headers = auth()
+    plan_id = client.post(API + '/study_plans', json={'title': 'Plan', 'description': 'long text', 'comments': 'c'},
+                          headers=headers).get_json()['study_plan']['id']
+    response = client.get(API + '/study_plans?fields=title,tags', headers=headers)
+    assert response.status_code == 200
+    assert response.get_json()['study_plans'] == [{'id': plan_id, 'title': 'Plan', 'tags': None}]
+
+    response = client.get('{}/study_plans/{}?fields=comments'.format(API, plan_id), headers=headers)
+    assert response.get_json()['study_plan'] == {'id': plan_id, 'comments': 'c'}
+
+    full = client.get('{}/study_plans/{}'.format(API, plan_id), headers=headers).get_json()['study_plan']
+    assert full['description'] == 'long text' and 'created_at' in full
+
+
+def test_unrequested_columns_are_not_selected(app, client, auth):
+    headers = auth()
+    client.post(API + '/study_materials', json={'title': 'Notes', 'description': 'x' * 1000, 'link': 'l'},
+                headers=headers)
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith('SELECT') and 'FROM study_material' in statement:
+            statements.append(statement)
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', record)
+    try:
+        response = client.get(API + '/study_materials?fields=title,link', headers=headers)
+    finally:
+        event.remove(engine, 'before_cursor_execute', record)
+    assert response.get_json()['study_materials'][0] == {'id': 1, 'title': 'Notes', 'link': 'l'}
+    selected, = statements
+    columns = selected.split('FROM')[0]
+    assert 'title' in columns and 'description' not in columns and 'comments' not in columns
+
+
+def test_unknown_fields_are_rejected(client, auth):
+    headers = auth()
+    response = client.get(API + '/reminders?fields=title,password', headers=headers)
+    assert response.status_code == 400
+    assert response.get_json() == {'message': 'unknown fields: password'}
+    assert client.get(API + '/reminders/1?fields=nope', headers=headers).status_code == 400
@@ -0,0 +1,90 @@
+from datetime import datetime, timedelta
+import pytest
+from models import db
+from utils import sync
+from utils.pagination import encode_cursor
+
+API = '/study_plan'
+
+
+@pytest.fixture
+def settled(monkeypatch):
+    monkeypatch.setattr(sync, 'SYNC_SETTLE_SECONDS', 0)
+
+
+def fetch(client, headers, **params):
+    response = client.get(API + '/sync', query_string=params, headers=headers)
+    assert response.status_code == 200, response.get_json()
+    return response.get_json()
+
+
+def summary(changes):
+    return [(change['type'], change['id'], 'deleted' if change.get('deleted') else change['item']['title'])
+            for change in changes]
+
+
+def test_full_then_delta_sync(client, auth, settled):
+    headers = auth()
+    plan = client.post(API + '/study_plans', json={'title': 'Plan', 'description': 'x'},
+                       headers=headers).get_json()['study_plan']['id']
+    material = client.post(API + '/study_materials', json={'title': 'Notes', 'description': 'x', 'link': 'l'},
+                           headers=headers).get_json()['study_material']['id']
+    client.post(API + '/study_plans', json={'title': 'Other user', 'description': 'x'},
+                headers=auth('bob@example.com'))
+
+    full = fetch(client, headers)
+    assert sorted(summary(full['changes'])) == [('materials', material, 'Notes'), ('plans', plan, 'Plan')]
+    assert full['has_more'] is False
+    assert fetch(client, headers, since=full['next_cursor'])['changes'] == []
+
+    client.put('{}/study_plans/{}'.format(API, plan), json={'title': 'Renamed'}, headers=headers)
+    client.delete('{}/study_materials/{}'.format(API, material), headers=headers)
+    reminder = client.post(API + '/reminders', json={'title': 'Soon', 'description': 'x',
+                                                     'reminder_time': '2030-01-01T09:00:00'},
+                           headers=headers).get_json()['reminder']['id']
+    delta = fetch(client, headers, since=full['next_cursor'])
+    assert sorted(summary(delta['changes'])) == [
+        ('materials', material, 'deleted'), ('plans', plan, 'Renamed'), ('reminders', reminder, 'Soon')]
+
+
+def test_small_pages_neither_skip_nor_repeat(client, auth, settled):
+    headers = auth()
+    start = fetch(client, headers)['next_cursor']
+    titles = ['Plan %d' % i for i in range(7)]
+    ids = [client.post(API + '/study_plans', json={'title': title, 'description': 'x'},
+                       headers=headers).get_json()['study_plan']['id'] for title in titles]
+    client.delete('{}/study_plans/{}'.format(API, ids[0]), headers=headers)
+
+    seen = []
+    cursor = start
+    while True:
+        page = fetch(client, headers, since=cursor, limit=2)
+        assert len(page['changes']) <= 2
+        seen.extend(summary(page['changes']))
+        cursor = page['next_cursor']
+        if not page['has_more']:
+            break
+    assert seen == [('plans', item_id, title) for item_id, title in zip(ids[1:], titles[1:])] + \
+        [('plans', ids[0], 'deleted')]
+
+
+def test_recent_writes_wait_for_the_settle_window(client, auth):
+    headers = auth()
+    assert sync.SYNC_SETTLE_SECONDS >= 1
+    client.post(API + '/study_plans', json={'title': 'Fresh', 'description': 'x'}, headers=headers)
+    assert fetch(client, headers)['changes'] == []
+
+
+def test_bad_and_expired_cursors(app, client, auth):
+    headers = auth()
+    assert client.get(API + '/sync?since=garbage', headers=headers).status_code == 400
+    assert client.get(API + '/sync?limit=many', headers=headers).status_code == 400
+    old = encode_cursor((datetime.utcnow() - timedelta(days=sync.SYNC_TOMBSTONE_DAYS + 1), 0, 0))
+    assert client.get(API + '/sync', query_string={'since': old}, headers=headers).status_code == 410
+
+    plan = client.post(API + '/study_plans', json={'title': 'Plan', 'description': 'x'},
+                       headers=headers).get_json()['study_plan']['id']
+    client.delete('{}/study_plans/{}'.format(API, plan), headers=headers)
+    with app.app_context():
+        assert sync.purge_tombstones(db.engine, days=1) == 0
+        assert sync.purge_tombstones(db.engine, days=-1) == 1
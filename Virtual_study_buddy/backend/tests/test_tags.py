@@ -0,0 +1,67 @@
+from utils.tags import parse_tags
+
+API = '/study_plan'
+
+
+def create_plan(client, headers, title, tags):
+    response = client.post(API + '/study_plans', json={'title': title, 'description': 'x', 'tags': tags},
+                           headers=headers)
+    assert response.status_code == 201
+    return response.get_json()['study_plan']['id']
+
+
+def filtered(client, headers, **params):
+    response = client.get(API + '/study_plans', query_string=params, headers=headers)
+    assert response.status_code == 200
+    return sorted(plan['id'] for plan in response.get_json().get('study_plans', []))
+
+
+def counts(client, headers, **params):
+    response = client.get(API + '/tags', query_string=params, headers=headers)
+    assert response.status_code == 200
+    return {item['name']: item['count'] for item in response.get_json()['tags']}
+
+
+def test_list_endpoints_filter_on_whole_tags(client, auth):
+    headers = auth()
+    both = create_plan(client, headers, 'Exam prep', 'Calculus, exam')
+    calculus = create_plan(client, headers, 'Algebra', 'calculus;Linear  Algebra')
+    exam = create_plan(client, headers, 'History', '#exam')
+    create_plan(client, auth('bob@example.com'), 'Bob', 'calculus')
+
+    assert filtered(client, headers, tags='calculus') == sorted([both, calculus])
+    assert filtered(client, headers, tags='Calculus,EXAM') == [both]
+    assert filtered(client, headers, tags='calculus,exam', tag_mode='any') == sorted([both, calculus, exam])
+    assert filtered(client, headers, tags='linear algebra') == [calculus]
+    assert filtered(client, headers, tags='calc') == []
+    assert filtered(client, headers, tags='calculus,unknown') == []
+
+
+def test_counts_follow_edits_and_deletes(client, auth):
+    headers = auth()
+    first = create_plan(client, headers, 'One', 'calculus, exam')
+    create_plan(client, headers, 'Two', 'calculus')
+    create_plan(client, auth('bob@example.com'), 'Bob', 'calculus')
+    assert counts(client, headers) == {'calculus': 2, 'exam': 1}
+
+    assert client.put('{}/study_plans/{}'.format(API, first), json={'tags': 'physics'},
+                      headers=headers).status_code == 200
+    assert counts(client, headers) == {'calculus': 1, 'physics': 1}
+    assert filtered(client, headers, tags='exam') == []
+
+    assert client.delete('{}/study_plans/{}'.format(API, first), headers=headers).status_code == 200
+    assert counts(client, headers) == {'calculus': 1}
+    assert counts(client, headers, type='materials') == {}
+
+
+def test_bad_filters_are_rejected(client, auth):
+    headers = auth()
+    assert client.get(API + '/study_plans?tags=a&tag_mode=some', headers=headers).status_code == 400
+    assert client.get(API + '/study_plans?tags=' + ','.join('t%d' % i for i in range(11)),
+                      headers=headers).status_code == 400
+    assert client.get(API + '/tags?type=users', headers=headers).status_code == 400
+
+
+def test_parse_tags_normalises_and_deduplicates():
+    assert parse_tags('Calculus, linear  algebra;#exam, calculus') == ['calculus', 'linear algebra', 'exam']
+    assert parse_tags(None) == [] and parse_tags(' , ;') == []
@@ -0,0 +1,189 @@
+import os
+from sqlalchemy import case, delete, select, update
+from models import StudyPlan
+from utils.database import insert_rows
+from utils.index_updates import INDEXED_FIELDS, defer_material_changes
+from utils.sync import record_tombstones
+from utils.tags import TAGGED, add_tags, parse_tags, sync_tags
+from utils.validation import MODELS, validate, validate_changes
+from utils.versions import bump_versions
+
+BATCH_MAX_OPERATIONS = int(os.getenv('BATCH_MAX_OPERATIONS', 500))
+BATCH_OPERATIONS = ('create', 'update', 'delete')
+
+
+class InvalidBatchRequest(ValueError):
+    pass
+
+
+def parse_batch(data):
+    """
+    (operations, atomic) from a batch request body:
+        {"operations": [{"op": "create", "data": {...}},
+                        {"op": "update", "id": 1, "data": {...}},
+                        {"op": "delete", "id": 2}],
+         "atomic": false}
+    Only the envelope is checked here; operations are checked one by one
+    by apply_batch.
+    """
+    if not isinstance(data, dict) or not isinstance(data.get('operations'), list):
+        raise InvalidBatchRequest('operations must be a list')
+    operations = data['operations']
+    if not operations:
+        raise InvalidBatchRequest('operations must not be empty')
+    if len(operations) > BATCH_MAX_OPERATIONS:
+        raise InvalidBatchRequest('At most {} operations can be sent in a batch'.format(BATCH_MAX_OPERATIONS))
+    atomic = data.get('atomic', False)
+    if not isinstance(atomic, bool):
+        raise InvalidBatchRequest('atomic must be true or false')
+    return operations, atomic
+
+
+def _result(index, op, status, item_id=None, message=None):
+    result = {'index': index, 'op': op, 'status': status}
+    if item_id is not None:
+        result['id'] = item_id
+    if message:
+        result['message'] = message
+    return result
+
+
+def _check_plans(conn, owner_id, items, results):
+    """
+    Fail the session creates/updates in `items`, (index, op, id, values),
+    that point at a study plan the owner does not have. One query.
+    """
+    plan_ids = {values['study_plan_id'] for _, _, _, values in items if 'study_plan_id' in values}
+    if not plan_ids:
+        return
+    owned = set(conn.execute(
+        select(StudyPlan.id).where(StudyPlan.owner_id == owner_id, StudyPlan.id.in_(plan_ids))
+    ).scalars())
+    for index, op, item_id, values in items:
+        if 'study_plan_id' in values and values['study_plan_id'] not in owned:
+            results[index] = _result(index, op, 400, item_id,
+                                     'study plan {} not found'.format(values['study_plan_id']))
+
+
+def apply_batch(session, kind, owner_id, operations, atomic=False):
+    """
+    Apply creates, partial updates and deletes of `kind` for `owner_id` in
+    `session`'s transaction and return one result per operation, in order.
+    The caller commits.
+
+    The number of statements does not grow with the batch: one SELECT
+    checks that every id named belongs to the owner, creates are multi-row
+    INSERTs, all updates are a single UPDATE that sets each column with
+    CASE id WHEN ..., and all deletes are a single DELETE. Operations that
+    are invalid or name an id the owner does not have get their own 400 or
+    404 result and the rest are applied; with `atomic`, nothing is.
+    """
+    model = MODELS[kind]
+    table = model.__table__
+    owner_id = int(owner_id)
+    results = [None] * len(operations)
+    creates = []
+    updates = {}
+    deletes = []
+    seen = set()
+    for index, operation in enumerate(operations):
+        op = operation.get('op') if isinstance(operation, dict) else None
+        if op not in BATCH_OPERATIONS:
+            results[index] = _result(index, op, 400, message='op must be one of: {}'.format(', '.join(BATCH_OPERATIONS)))
+            continue
+        item_id = None
+        if op != 'create':
+            item_id = operation.get('id')
+            if isinstance(item_id, bool) or not isinstance(item_id, int):
+                results[index] = _result(index, op, 400, message='id must be an integer')
+                continue
+            if item_id in seen:
+                results[index] = _result(index, op, 400, item_id, 'id appears more than once in the batch')
+                continue
+            seen.add(item_id)
+        data = operation.get('data')
+        if op != 'delete' and not isinstance(data, dict):
+            results[index] = _result(index, op, 400, item_id, 'data must be an object')
+            continue
+        try:
+            if op == 'create':
+                creates.append((index, validate(kind, data)))
+            elif op == 'update':
+                updates[item_id] = (index, validate_changes(kind, data))
+            else:
+                deletes.append((index, item_id))
+        except ValueError as e:
+            results[index] = _result(index, op, 400, item_id, str(e))
+
+    conn = session.connection()
+    ids = list(updates) + [item_id for _, item_id in deletes]
+    owned = set()
+    if ids:
+        owned.update(conn.execute(
+            select(table.c.id).where(table.c.owner_id == owner_id, table.c.id.in_(ids))
+        ).scalars())
+    for op, items in (('update', [(index, item_id) for item_id, (index, _) in updates.items()]), ('delete', deletes)):
+        for index, item_id in items:
+            if item_id not in owned:
+                results[index] = _result(index, op, 404, item_id, '{} not found'.format(model.__name__))
+    if kind == 'sessions':
+        _check_plans(conn, owner_id, [(index, 'create', None, values) for index, values in creates] +
+                     [(index, 'update', item_id, values) for item_id, (index, values) in updates.items()], results)
+
+    creates = [(index, values) for index, values in creates if results[index] is None]
+    updates = {item_id: item for item_id, item in updates.items() if results[item[0]] is None}
+    deletes = [(index, item_id) for index, item_id in deletes if results[index] is None]
+    if atomic and any(result is not None for result in results):
+        for index, operation in enumerate(operations):
+            if results[index] is None:
+                results[index] = _result(index, operation['op'], 424, operation.get('id'),
+                                         'not applied: another operation in the batch failed')
+        return results
+
+    material_changes = {}
+    if creates:
+        rows = [dict(values, owner_id=owner_id) for _, values in creates]
+        new_ids = insert_rows(conn, table, rows)
+        add_tags(conn, kind, [(item_id, owner_id, parse_tags(row['tags'])) for item_id, row in zip(new_ids, rows)])
+        for (index, _), item_id, row in zip(creates, new_ids, rows):
+            results[index] = _result(index, 'create', 201, item_id)
+            material_changes[item_id] = tuple(row[field] for field in INDEXED_FIELDS)
+
+    if updates:
+        columns = {}
+        for item_id, (_, values) in updates.items():
+            for name, value in values.items():
+                columns.setdefault(name, {})[item_id] = value
+        conn.execute(
+            update(table)
+            .where(table.c.owner_id == owner_id, table.c.id.in_(list(updates)))
+            .values({name: case(whens, value=table.c.id, else_=table.c[name]) for name, whens in columns.items()})
+        )
+        sync_tags(conn, kind, [(item_id, owner_id, values['tags'])
+                               for item_id, (_, values) in updates.items() if 'tags' in values])
+        for item_id, (index, _) in updates.items():
+            results[index] = _result(index, 'update', 200, item_id)
+        reindex = [item_id for item_id, (_, values) in updates.items()
+                   if any(field in values for field in INDEXED_FIELDS)]
+        if kind == 'materials' and reindex:
+            material_changes.update(
+                (row[0], tuple(row[1:])) for row in
+                conn.execute(select(table.c.id, *(table.c[field] for field in INDEXED_FIELDS))
+                             .where(table.c.id.in_(reindex)))
+            )
+
+    if deletes:
+        delete_ids = [item_id for _, item_id in deletes]
+        association = TAGGED[kind][1]
+        conn.execute(delete(association).where(association.c.item_id.in_(delete_ids)))
+        conn.execute(delete(table).where(table.c.owner_id == owner_id, table.c.id.in_(delete_ids)))
+        record_tombstones(conn, owner_id, kind, delete_ids)
+        for index, item_id in deletes:
+            results[index] = _result(index, 'delete', 200, item_id)
+            material_changes[item_id] = None
+
+    if creates or updates or deletes:
+        bump_versions(conn, owner_id, (kind,))
+    if kind == 'materials' and material_changes:
+        defer_material_changes(session, material_changes)
+    return results
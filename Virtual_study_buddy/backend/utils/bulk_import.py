@@ -0,0 +1,215 @@
+import csv
+import io
+import json
+import os
+from sqlalchemy import select
+from sqlalchemy.exc import SQLAlchemyError
+from models import StudyPlan, StudyMaterial, StudySession
+from utils.database import insert_rows
+from utils.index_updates import publish_material_changes
+from utils.tags import add_tags, parse_tags
+from utils.validation import SERVER_COLUMNS, validate
+from utils.versions import bump_versions
+
+try:
+    from orjson import loads as json_loads
+except ImportError:
+    json_loads = json.loads
+
+IMPORT_CHUNK_ROWS = int(os.getenv('IMPORT_CHUNK_ROWS', 5000))
+IMPORT_MAX_ERRORS = int(os.getenv('IMPORT_MAX_ERRORS', 1000))
+
+# Inserted in this order within a chunk, so sessions can refer to plans
+# created earlier in the same import.
+IMPORT_TYPES = {
+    'plans': StudyPlan,
+    'materials': StudyMaterial,
+    'sessions': StudySession,
+}
+IMPORT_FORMATS = {
+    'text/csv': 'csv',
+    'application/x-ndjson': 'ndjson',
+    'application/jsonl': 'ndjson',
+}
+# Keys that may appear in a record without being columns: `type` selects
+# the model, plans may carry a `ref` that sessions name in `plan_ref`, and
+# the server-set columns found in an export are ignored.
+RECORD_KEYS = frozenset(('type', 'ref', 'plan_ref') + SERVER_COLUMNS)
+
+
+class InvalidImportRequest(ValueError):
+    pass
+
+
+def read_ndjson(stream):
+    """
+    Yield (line number, record) from a text stream of NDJSON, one line at a
+    time. Lines that are not JSON objects yield an error string instead.
+    """
+    for line_number, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            record = json_loads(line)
+        except ValueError as e:
+            yield line_number, 'invalid JSON: {}'.format(e)
+            continue
+        yield line_number, record if isinstance(record, dict) else 'expected a JSON object'
+
+
+def read_csv(stream):
+    """
+    Yield (line number, record) from a text stream of CSV with a header row.
+    Empty cells are treated as missing.
+    """
+    reader = csv.DictReader(stream)
+    for row in reader:
+        if None in row:
+            yield reader.line_num, 'more cells than header columns'
+            continue
+        yield reader.line_num, {key: value for key, value in row.items() if value not in ('', None)}
+
+
+class BulkImport:
+    """
+    Validates records as they are read and inserts them in chunks of
+    `chunk_rows`, one transaction per chunk, with multi-row INSERTs. Tags and the recommendation index are updated
+    for the new rows like any other write. A chunk that fails in the
+    database is retried row by row so the failure lands on the right line.
+
+    Rows that fail are reported by line number; the rest are imported.
+    """
+
+    def __init__(self, engine, owner_id, default_type=None, chunk_rows=IMPORT_CHUNK_ROWS,
+                 max_errors=IMPORT_MAX_ERRORS):
+        self.engine = engine
+        self.owner_id = int(owner_id)
+        self.default_type = default_type
+        self.chunk_rows = chunk_rows
+        self.max_errors = max_errors
+        self.inserted = dict.fromkeys(IMPORT_TYPES, 0)
+        self.error_count = 0
+        self.errors = []
+        self._refs = {}
+        self._pending = {kind: [] for kind in IMPORT_TYPES}
+        self._size = 0
+
+    def _error(self, line_number, message):
+        self.error_count += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append({'line': line_number, 'message': message})
+
+    def add(self, line_number, record):
+        if isinstance(record, str):
+            self._error(line_number, record)
+            return
+        kind = record.get('type', self.default_type)
+        if kind not in IMPORT_TYPES:
+            self._error(line_number, 'type must be one of: {}'.format(', '.join(IMPORT_TYPES)))
+            return
+        try:
+            # study_plan_id may be left for plan_ref to fill in.
+            values = validate(kind, record, RECORD_KEYS, ('study_plan_id',) if 'plan_ref' in record else ())
+        except ValueError as e:
+            self._error(line_number, str(e))
+            return
+        values['owner_id'] = self.owner_id
+        self._pending[kind].append((line_number, values, parse_tags(values['tags']), record.get('ref'),
+                                    record.get('plan_ref')))
+        self._size += 1
+        if self._size >= self.chunk_rows:
+            self.flush()
+
+    def _resolve_plans(self, conn, sessions, refs):
+        """
+        Fill in study_plan_id from plan_ref and set aside sessions whose
+        plan is unknown or belongs to someone else. Returns (sessions,
+        errors).
+        """
+        plan_ids = {values['study_plan_id'] for _, values, _, _, plan_ref in sessions if plan_ref is None}
+        owned = set()
+        if plan_ids:
+            owned.update(conn.execute(
+                select(StudyPlan.id).where(StudyPlan.owner_id == self.owner_id, StudyPlan.id.in_(plan_ids))
+            ).scalars())
+        resolved = []
+        errors = []
+        for item in sessions:
+            line_number, values, _, _, plan_ref = item
+            if plan_ref is not None:
+                plan_id = refs.get(plan_ref, self._refs.get(plan_ref))
+                if plan_id is None:
+                    errors.append((line_number, 'plan_ref {!r} does not name an imported plan'.format(plan_ref)))
+                    continue
+                values['study_plan_id'] = plan_id
+            elif values['study_plan_id'] not in owned:
+                errors.append((line_number, 'study plan {} not found'.format(values['study_plan_id'])))
+                continue
+            resolved.append(item)
+        return resolved, errors
+
+    def _insert(self, pending):
+        refs = {}
+        counts = {}
+        materials = []
+        errors = []
+        with self.engine.begin() as conn:
+            for kind, items in pending.items():
+                if kind == 'sessions':
+                    items, errors = self._resolve_plans(conn, items, refs)
+                if not items:
+                    continue
+                table = IMPORT_TYPES[kind].__table__
+                ids = insert_rows(conn, table, [item[1] for item in items])
+                add_tags(conn, kind, [(item_id, self.owner_id, item[2]) for item_id, item in zip(ids, items)])
+                if kind == 'plans':
+                    refs.update((item[3], item_id) for item_id, item in zip(ids, items) if item[3] is not None)
+                if kind == 'materials':
+                    materials = [(item_id, (values['title'], values['description'], values['tags']))
+                                 for item_id, (_, values, _, _, _) in zip(ids, items)]
+                counts[kind] = len(ids)
+            bump_versions(conn, self.owner_id, counts)
+        self._refs.update(refs)
+        for line_number, message in errors:
+            self._error(line_number, message)
+        publish_material_changes(materials)
+        for kind, count in counts.items():
+            self.inserted[kind] += count
+
+    def flush(self):
+        pending, self._pending = self._pending, {kind: [] for kind in IMPORT_TYPES}
+        self._size = 0
+        try:
+            self._insert(pending)
+        except SQLAlchemyError:
+            for kind, items in pending.items():
+                for item in items:
+                    try:
+                        self._insert({kind: [item]})
+                    except SQLAlchemyError as e:
+                        self._error(item[0], 'could not be saved: {}'.format(getattr(e, 'orig', None) or e))
+
+    def run(self, records):
+        for line_number, record in records:
+            self.add(line_number, record)
+        self.flush()
+        return self.summary()
+
+    def summary(self):
+        return {
+            'inserted': self.inserted,
+            'error_count': self.error_count,
+            'errors': sorted(self.errors, key=lambda error: error['line']),
+        }
+
+
+def import_stream(engine, owner_id, stream, fmt, default_type=None, **options):
+    """
+    Import a binary stream of CSV or NDJSON (`fmt`), reading it
+    incrementally.
+    """
+    if default_type is not None and default_type not in IMPORT_TYPES:
+        raise InvalidImportRequest('type must be one of: {}'.format(', '.join(IMPORT_TYPES)))
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='' if fmt == 'csv' else None)
+    records = read_csv(text) if fmt == 'csv' else read_ndjson(text)
+    return BulkImport(engine, owner_id, default_type, **options).run(records)
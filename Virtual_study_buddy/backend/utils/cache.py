@@ -0,0 +1,137 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import make_transient_to_detached
+from sqlalchemy.orm.attributes import set_committed_value
+from utils.database import db
+from utils.metrics import register_value
+
+IDENTITY_CACHE_SIZE = int(os.getenv('IDENTITY_CACHE_SIZE', 4096))
+IDENTITY_CACHE_TTL = float(os.getenv('IDENTITY_CACHE_TTL', 30))
+IDENTITY_FIELDS = ('email', 'username')
+
+
+class TTLCache:
+    """
+    Thread-safe mapping with a per-entry time to live and least-recently-used
+    eviction once `maxsize` entries are held.
+    """
+
+    def __init__(self, maxsize=1024, ttl=60.0, timer=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._timer = timer
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                if entry[1] > self._timer():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return entry[0]
+                del self._data[key]
+            self.misses += 1
+            return None
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (value, self._timer() + self.ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def pop(self, key):
+        with self._lock:
+            entry = self._data.pop(key, None)
+        return entry[0] if entry is not None else None
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'size': len(self._data),
+                'maxsize': self.maxsize,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
+
+
+identity_cache = TTLCache(maxsize=IDENTITY_CACHE_SIZE, ttl=IDENTITY_CACHE_TTL)
+
+for name, kind, key, help_text in (
+    ('identity_cache_hits_total', 'counter', 'hits', 'User lookups served from the identity cache.'),
+    ('identity_cache_misses_total', 'counter', 'misses', 'User lookups that went to the database.'),
+    ('identity_cache_evictions_total', 'counter', 'evictions', 'Entries evicted to stay within the size limit.'),
+    ('identity_cache_entries', 'gauge', 'size', 'Users held in the identity cache.'),
+):
+    register_value(name, kind, help_text, lambda key=key: identity_cache.stats()[key])
+
+
+def _snapshot(instance):
+    mapper = inspect(instance).mapper
+    return tuple((attr.key, getattr(instance, attr.key)) for attr in mapper.column_attrs)
+
+
+def _restore(model, snapshot):
+    instance = model.__mapper__.class_manager.new_instance()
+    for key, value in snapshot:
+        set_committed_value(instance, key, value)
+    make_transient_to_detached(instance)
+    return instance
+
+
+def load_user(model, **criteria):
+    """
+    `model.query.filter_by(**criteria).first()` for a single identity field,
+    served from the identity cache when possible. Cached rows are kept as
+    plain column snapshots and merged into the current session without a
+    SELECT.
+    """
+    (field, value), = criteria.items()
+    key = (model.__name__, field, value)
+    snapshot = identity_cache.get(key)
+    if snapshot is not None:
+        return db.session.merge(_restore(model, snapshot), load=False)
+    user = db.session.query(model).filter_by(**criteria).first()
+    if user is not None:
+        identity_cache.set(key, _snapshot(user))
+    return user
+
+
+def invalidate_user(user):
+    state = inspect(user)
+    model = state.mapper.class_
+    for field in IDENTITY_FIELDS:
+        if field not in state.mapper.column_attrs:
+            continue
+        history = state.attrs[field].history
+        for value in set(history.deleted or ()) | set(history.unchanged or ()) | set(history.added or ()):
+            identity_cache.pop((model.__name__, field, value))
+
+
+def _invalidate_on_write(mapper, connection, target):
+    invalidate_user(target)
+
+
+def track_identity_model(model):
+    """
+    Drop cached entries for `model` whenever a row is updated or deleted
+    through the ORM (update_user, delete_user, OTP enable/disable, ...).
+    """
+    event.listen(model, 'after_update', _invalidate_on_write)
+    event.listen(model, 'after_delete', _invalidate_on_write)
@@ -0,0 +1,46 @@
+import os
+from datetime import datetime
+from sqlalchemy import and_, bindparam, func, select
+from sqlalchemy.orm import relationship, selectinload
+
+DASHBOARD_ITEMS = int(os.getenv('DASHBOARD_ITEMS', 10))
+
+# item type ('plans', ...) -> relationship of User to its upcoming items
+UPCOMING = {}
+
+
+def upcoming(user_model, model, item_type, column, limit=DASHBOARD_ITEMS):
+    """
+    Add `upcoming_<item_type>` to `user_model`: the user's first `limit`
+    rows of `model` whose `column` is now or later, soonest first.
+
+    Only ids are ranked, per owner with ROW_NUMBER(), so the ranking reads
+    nothing but the (owner_id, `column`) index, and selectinload caps the
+    lists of any number of users in one query. The owner filter it adds is
+    on the PARTITION BY column, which SQLite and PostgreSQL push down into
+    the ranking.
+    """
+    now = bindparam('now_{}'.format(item_type), callable_=datetime.utcnow, type_=column.type)
+    ranked = (
+        select(model.id, model.owner_id,
+               func.row_number().over(partition_by=model.owner_id, order_by=(column, model.id)).label('rank'))
+        .where(column >= now)
+        .subquery()
+    )
+    name = 'upcoming_{}'.format(item_type)
+    setattr(user_model, name, relationship(
+        model,
+        secondary=ranked,
+        primaryjoin=and_(user_model.id == ranked.c.owner_id, ranked.c.rank <= limit),
+        secondaryjoin=model.id == ranked.c.id,
+        order_by=ranked.c.rank,
+        viewonly=True,
+    ))
+    UPCOMING[item_type] = getattr(user_model, name)
+
+
+def dashboard_options():
+    """
+    Loader options that fetch every upcoming_* list with one SELECT each.
+    """
+    return [selectinload(attribute) for attribute in UPCOMING.values()]
@@ -0,0 +1,180 @@
+import os
+import sqlite3
+from flask_sqlalchemy import SQLAlchemy
+from operator import itemgetter
+from sqlalchemy import create_engine, event, func, insert, select
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool, StaticPool
+
+DEFAULT_DATABASE_URI = 'sqlite:///study_buddy.db'
+SQLITE_MAX_VARIABLES = 32766
+INSERT_BATCH_ROWS = 500
+SQLITE_BEGIN_MODES = ('DEFERRED', 'IMMEDIATE', 'EXCLUSIVE')
+SQLITE_BEGIN = os.getenv('SQLITE_BEGIN', 'DEFERRED').upper()
+if SQLITE_BEGIN not in SQLITE_BEGIN_MODES:
+    raise ValueError('SQLITE_BEGIN must be one of {}'.format(', '.join(SQLITE_BEGIN_MODES)))
+
+db = SQLAlchemy()
+
+
+def _env_int(name, default):
+    return int(os.getenv(name, default))
+
+
+def database_uri():
+    return os.getenv('DATABASE_URL', DEFAULT_DATABASE_URI)
+
+
+def busy_timeout_ms():
+    """
+    How long a SQLite connection waits for another writer's lock.
+    """
+    return _env_int('SQLITE_BUSY_TIMEOUT_MS', 5000)
+
+
+def _is_memory_sqlite(uri):
+    return uri in ('sqlite://', 'sqlite:///:memory:') or 'mode=memory' in uri
+
+
+def engine_options(uri=None):
+    """
+    Engine keyword arguments shared by the Flask app and standalone workers.
+
+    Everything is tunable through the environment:
+        DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT, DB_POOL_RECYCLE,
+        DB_STATEMENT_CACHE_SIZE, SQLITE_CACHED_STATEMENTS, SQLITE_BUSY_TIMEOUT_MS
+    """
+    uri = uri or database_uri()
+    options = {
+        'pool_pre_ping': True,
+        'query_cache_size': _env_int('DB_STATEMENT_CACHE_SIZE', 1200),
+    }
+    if uri.startswith('sqlite'):
+        options['connect_args'] = {
+            'check_same_thread': False,
+            'cached_statements': _env_int('SQLITE_CACHED_STATEMENTS', 256),
+            'timeout': busy_timeout_ms() / 1000.0,
+        }
+        if _is_memory_sqlite(uri):
+            # Every connection to :memory: is a separate database, so keep one.
+            options['poolclass'] = StaticPool
+            return options
+        options['poolclass'] = QueuePool
+    options.update(
+        pool_size=_env_int('DB_POOL_SIZE', 10),
+        max_overflow=_env_int('DB_MAX_OVERFLOW', 20),
+        pool_timeout=_env_int('DB_POOL_TIMEOUT', 30),
+        pool_recycle=_env_int('DB_POOL_RECYCLE', 1800),
+    )
+    return options
+
+
+@event.listens_for(Engine, 'connect')
+def _configure_sqlite_connection(dbapi_connection, connection_record):
+    if not isinstance(dbapi_connection, sqlite3.Connection):
+        return
+    # Let SQLAlchemy emit BEGIN itself (see _begin_sqlite_transaction) instead of
+    # the driver's implicit, deferred transactions.
+    dbapi_connection.isolation_level = None
+    cursor = dbapi_connection.cursor()
+    cursor.execute('PRAGMA journal_mode=WAL')
+    cursor.execute('PRAGMA synchronous=NORMAL')
+    cursor.execute('PRAGMA busy_timeout={}'.format(busy_timeout_ms()))
+    cursor.execute('PRAGMA mmap_size={}'.format(_env_int('SQLITE_MMAP_SIZE', 268435456)))
+    cursor.execute('PRAGMA cache_size={}'.format(_env_int('SQLITE_CACHE_SIZE', -65536)))
+    cursor.execute('PRAGMA temp_store=MEMORY')
+    cursor.close()
+
+
+@event.listens_for(Engine, 'begin')
+def _begin_sqlite_transaction(conn):
+    if conn.dialect.name != 'sqlite':
+        return
+    # SQLITE_BEGIN=IMMEDIATE takes the write lock up front, so a transaction
+    # that reads and then writes waits on busy_timeout instead of failing with
+    # "database is locked" when another writer got in first.
+    conn.exec_driver_sql('BEGIN ' + SQLITE_BEGIN)
+
+
+def init_app(app):
+    app.config.setdefault('SQLALCHEMY_DATABASE_URI', database_uri())
+    app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', engine_options(app.config['SQLALCHEMY_DATABASE_URI']))
+    db.init_app(app)
+
+
+def make_engine(uri=None, **overrides):
+    """
+    Build an engine for code running outside a Flask app context
+    (background workers, CLI tools) with the same pool and PRAGMA settings.
+    """
+    uri = uri or database_uri()
+    options = engine_options(uri)
+    options.update(overrides)
+    return create_engine(uri, **options)
+
+
+def make_session_factory(engine=None):
+    return sessionmaker(bind=engine or make_engine(), expire_on_commit=False)
+
+
+def insert_many(conn, table, rows, batch_rows=INSERT_BATCH_ROWS):
+    """
+    Insert `rows` (dicts with the same keys) as multi-row INSERT ... VALUES
+    statements of up to `batch_rows` rows.
+
+    On SQLite, executemany runs one statement per row, and FTS5 writes out
+    its pending terms at every statement boundary, so an insert into a
+    table with a search index trigger is about ten times slower row by row
+    than in batches. Parameters go to the driver as plain tuples, through
+    the columns' bind processors only, since SQLAlchemy's per-row
+    parameter handling otherwise costs more than the insert. Python-side
+    column defaults for keys the rows leave out are evaluated once and
+    shared by every row.
+    """
+    if not rows:
+        return
+    if conn.dialect.name != 'sqlite':
+        conn.execute(insert(table), rows)
+        return
+    defaults = {column.key: column.default.arg(None) if column.default.is_callable else column.default.arg
+                for column in table.c
+                if column.default is not None and not column.default.is_sequence and column.key not in rows[0]}
+    if defaults:
+        rows = [dict(row, **defaults) for row in rows]
+    columns = list(rows[0])
+    getter = itemgetter(*columns) if len(columns) > 1 else lambda row: (row[columns[0]],)
+    processors = [(index, processor) for index, processor in
+                  ((index, table.c[name].type.dialect_impl(conn.dialect).bind_processor(conn.dialect))
+                   for index, name in enumerate(columns))
+                  if processor is not None]
+    batch_rows = max(1, min(batch_rows, SQLITE_MAX_VARIABLES // len(columns)))
+    statement = 'INSERT INTO {} ({}) VALUES '.format(table.name, ', '.join(columns))
+    placeholder = '({})'.format(', '.join('?' * len(columns)))
+    for offset in range(0, len(rows), batch_rows):
+        params = []
+        for row in rows[offset:offset + batch_rows]:
+            values = getter(row)
+            if processors:
+                values = list(values)
+                for index, processor in processors:
+                    values[index] = processor(values[index])
+            params.extend(values)
+        count = len(params) // len(columns)
+        conn.exec_driver_sql(statement + ', '.join([placeholder] * count), tuple(params))
+
+
+def insert_rows(conn, table, rows):
+    """
+    Insert `rows` (dicts with the same keys) in batches and return their new
+    ids, in order.
+    """
+    if conn.dialect.name != 'sqlite':
+        return conn.execute(insert(table).returning(table.c.id, sort_by_parameter_order=True), rows).scalars().all()
+    # SQLAlchemy can only keep RETURNING in parameter order on SQLite by
+    # inserting row by row. SQLite gives each new row max(rowid) + 1 and the
+    # transaction holds the write lock until commit, so the new ids are the
+    # range ending at the new maximum.
+    insert_many(conn, table, rows)
+    last_id = conn.execute(select(func.max(table.c.id))).scalar()
+    return list(range(last_id - len(rows) + 1, last_id + 1))
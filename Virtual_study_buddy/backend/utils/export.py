@@ -0,0 +1,299 @@
+import gzip
+import io
+import logging
+import os
+import secrets
+import threading
+from datetime import datetime, timedelta
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from models import db, StudyPlan, StudyMaterial, StudySession, Reminder, export_job
+from utils.database import make_engine
+from utils.streaming import _encoder, ndjson_lines
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+EXPORT_DIR = os.getenv('EXPORT_DIR', 'instance/exports')
+EXPORT_COMPRESSION = os.getenv('EXPORT_COMPRESSION', 'gzip')
+EXPORT_CHUNK_ROWS = int(os.getenv('EXPORT_CHUNK_ROWS', 5000))
+EXPORT_WORKERS = int(os.getenv('EXPORT_WORKERS', 1))
+EXPORT_POLL_SECONDS = float(os.getenv('EXPORT_POLL_SECONDS', 5))
+EXPORT_STALE_SECONDS = int(os.getenv('EXPORT_STALE_SECONDS', 600))
+EXPORT_TTL_HOURS = int(os.getenv('EXPORT_TTL_HOURS', 48))
+# By default exports are run by a separate `python -m utils.export`, which
+# picks up new jobs within EXPORT_POLL_SECONDS, so a large export does not
+# compete with requests for the web process's CPU and GIL. Set to 1 to run
+# the worker inside the web process instead, for development and tests.
+EXPORT_IN_PROCESS = os.getenv('EXPORT_IN_PROCESS', '0') == '1'
+
+EXPORT_FORMAT = 1
+EXPORT_SECTIONS = (
+    ('plans', StudyPlan),
+    ('materials', StudyMaterial),
+    ('sessions', StudySession),
+    ('reminders', Reminder),
+)
+ACTIVE_STATUSES = ('queued', 'running')
+ARCHIVE_SUFFIXES = {'gzip': '.ndjson.gz', 'zstd': '.ndjson.zst'}
+ARCHIVE_MIMETYPES = {'gzip': 'application/gzip', 'zstd': 'application/zstd'}
+
+
+class InvalidExportRequest(ValueError):
+    pass
+
+
+def compressions():
+    return ('gzip', 'zstd') if zstandard is not None else ('gzip',)
+
+
+def _open_archive(path, compression):
+    if compression == 'zstd':
+        writer = zstandard.ZstdCompressor(level=3).stream_writer(open(path, 'wb'))
+        return io.TextIOWrapper(writer, encoding='utf-8')
+    return gzip.open(path, 'wt', encoding='utf-8', compresslevel=6)
+
+
+def request_export(owner_id, compression=None):
+    """
+    Queue an export of everything the owner has, or return the export that
+    is already queued or running for them. The caller commits.
+
+    The partial unique index on export_job.owner_id admits one active job
+    per owner, so when concurrent requests both find none, one INSERT
+    fails and that request returns the other's job.
+    """
+    compression = compression or EXPORT_COMPRESSION
+    if compression not in compressions():
+        raise InvalidExportRequest('compression must be one of: {}'.format(', '.join(compressions())))
+    for attempt in range(2):
+        active = db.session.execute(
+            select(export_job).where(export_job.c.owner_id == owner_id, export_job.c.status.in_(ACTIVE_STATUSES))
+        ).first()
+        if active:
+            return active
+        now = datetime.utcnow()
+        job_id = secrets.token_hex(16)
+        try:
+            with db.session.begin_nested():
+                db.session.execute(insert(export_job).values(
+                    id=job_id, owner_id=owner_id, status='queued', compression=compression, rows_done=0,
+                    created_at=now, updated_at=now,
+                ))
+        except IntegrityError:
+            if attempt:
+                raise
+            continue
+        return get_export(owner_id, job_id)
+
+
+def get_export(owner_id, job_id):
+    return db.session.execute(
+        select(export_job).where(export_job.c.id == job_id, export_job.c.owner_id == owner_id)
+    ).first()
+
+
+def export_status(job):
+    return {
+        'id': job.id,
+        'status': job.status,
+        'compression': job.compression,
+        'rows_done': job.rows_done,
+        'rows_total': job.rows_total,
+        'progress': job.rows_done / job.rows_total if job.rows_total else (1.0 if job.status == 'done' else 0.0),
+        'size': job.size,
+        'error': job.error,
+        'created_at': job.created_at.isoformat(),
+        'finished_at': job.finished_at.isoformat() if job.finished_at else None,
+    }
+
+
+class ExportWorker:
+    """
+    Runs queued exports from export_job on `workers` background threads.
+
+    A job is claimed with a conditional UPDATE, so any number of workers,
+    in any number of processes, can share the queue. Each section is read
+    with keyset pagination over the owner_id index, `chunk_rows` rows per
+    short read transaction, and written straight into the compressed
+    archive: no connection is held between chunks and memory stays at one
+    chunk. Progress is saved after every chunk; jobs whose progress stops
+    for `stale_after` are assumed lost with their worker and re-queued.
+
+    The archive is NDJSON: a header line describing the export, then one
+    line per row with its section in `type`. It is written to a `.part`
+    file and renamed when complete. Finished jobs and their archives are
+    removed after `ttl`.
+    """
+
+    def __init__(self, engine, directory=EXPORT_DIR, workers=EXPORT_WORKERS, chunk_rows=EXPORT_CHUNK_ROWS,
+                 poll_interval=EXPORT_POLL_SECONDS, stale_after=timedelta(seconds=EXPORT_STALE_SECONDS),
+                 ttl=timedelta(hours=EXPORT_TTL_HOURS), clock=datetime.utcnow):
+        self.engine = engine
+        self.directory = os.path.abspath(directory)
+        self.workers = workers
+        self.chunk_rows = chunk_rows
+        self.poll_interval = poll_interval
+        self.stale_after = stale_after
+        self.ttl = ttl
+        self.clock = clock
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._threads = []
+
+    def claim(self):
+        """
+        Take the oldest queued job, returning (id, owner_id, compression),
+        or None when there is nothing to do.
+        """
+        now = self.clock()
+        with self.engine.begin() as conn:
+            conn.execute(
+                update(export_job)
+                .where(export_job.c.status == 'running', export_job.c.updated_at < now - self.stale_after)
+                .values(status='queued', updated_at=now)
+            )
+            job = conn.execute(
+                select(export_job.c.id, export_job.c.owner_id, export_job.c.compression)
+                .where(export_job.c.status == 'queued')
+                .order_by(export_job.c.created_at)
+                .limit(1)
+            ).first()
+            if job is None:
+                return None
+            claimed = conn.execute(
+                update(export_job)
+                .where(export_job.c.id == job.id, export_job.c.status == 'queued')
+                .values(status='running', rows_done=0, updated_at=now)
+            ).rowcount
+        return job if claimed else None
+
+    def _save(self, job_id, **values):
+        with self.engine.begin() as conn:
+            conn.execute(update(export_job).where(export_job.c.id == job_id).values(updated_at=self.clock(), **values))
+
+    def _write_section(self, out, job_id, owner_id, kind, table, done):
+        last_id = 0
+        while True:
+            with self.engine.connect() as conn:
+                rows = conn.execute(
+                    select(*table.c)
+                    .where(table.c.owner_id == owner_id, table.c.id > last_id)
+                    .order_by(table.c.id)
+                    .limit(self.chunk_rows)
+                ).all()
+            if not rows:
+                return done
+            out.writelines(ndjson_lines(rows, {'type': kind}))
+            last_id = rows[-1].id
+            done += len(rows)
+            self._save(job_id, rows_done=done)
+
+    def export(self, job):
+        job_id, owner_id, compression = job
+        sections = [(kind, model.__table__) for kind, model in EXPORT_SECTIONS]
+        with self.engine.connect() as conn:
+            counts = {
+                kind: conn.execute(select(func.count()).select_from(table).where(table.c.owner_id == owner_id)).scalar()
+                for kind, table in sections
+            }
+        self._save(job_id, rows_total=sum(counts.values()))
+
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, job_id + ARCHIVE_SUFFIXES[compression])
+        partial = path + '.part'
+        try:
+            with _open_archive(partial, compression) as out:
+                out.write(_encoder.encode({
+                    'type': 'export', 'format': EXPORT_FORMAT, 'owner_id': owner_id,
+                    'exported_at': self.clock(), 'counts': counts,
+                }) + '\n')
+                done = 0
+                for kind, table in sections:
+                    done = self._write_section(out, job_id, owner_id, kind, table, done)
+            os.replace(partial, path)
+        except BaseException:
+            if os.path.exists(partial):
+                os.remove(partial)
+            raise
+        self._save(job_id, status='done', path=path, size=os.path.getsize(path), finished_at=self.clock())
+
+    def purge(self):
+        cutoff = self.clock() - self.ttl
+        with self.engine.begin() as conn:
+            expired = conn.execute(
+                select(export_job.c.id, export_job.c.path)
+                .where(export_job.c.status.in_(('done', 'failed')), export_job.c.finished_at < cutoff)
+            ).all()
+            for _, path in expired:
+                if path and os.path.exists(path):
+                    os.remove(path)
+            if expired:
+                conn.execute(delete(export_job).where(export_job.c.id.in_([job_id for job_id, _ in expired])))
+
+    def run(self):
+        while not self._stopped.is_set():
+            try:
+                job = self.claim()
+                if job is None:
+                    self.purge()
+            except Exception:
+                logger.exception('Export queue poll failed')
+                job = None
+            if job is None:
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+                continue
+            try:
+                self.export(job)
+            except Exception as e:
+                logger.exception('Export %s failed', job.id)
+                try:
+                    self._save(job.id, status='failed', error=str(e), finished_at=self.clock())
+                except Exception:
+                    logger.exception('Could not record failure of export %s', job.id)
+
+    def notify(self):
+        """
+        Wake an idle worker, e.g. right after an export was queued in this
+        process.
+        """
+        self._wakeup.set()
+
+    def start(self):
+        for number in range(self.workers):
+            thread = threading.Thread(target=self.run, name='export-{}'.format(number), daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def stop(self, timeout=None):
+        self._stopped.set()
+        self._wakeup.set()
+        for thread in self._threads:
+            thread.join(timeout)
+
+
+_worker = None
+_lock = threading.Lock()
+
+
+def get_export_worker(engine):
+    """
+    Process-wide export worker, started on first use when exports run in
+    the web process (EXPORT_IN_PROCESS=1), otherwise None.
+    """
+    global _worker
+    if EXPORT_IN_PROCESS and _worker is None:
+        with _lock:
+            if _worker is None:
+                _worker = ExportWorker(engine).start()
+    return _worker
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    ExportWorker(make_engine()).run()
@@ -0,0 +1,135 @@
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+import bcrypt
+
+BCRYPT_LOG_ROUNDS = int(os.getenv('BCRYPT_LOG_ROUNDS', 12))
+HASHING_WORKERS = int(os.getenv('HASHING_WORKERS', os.cpu_count() or 1))
+HASHING_MAX_PENDING = int(os.getenv('HASHING_MAX_PENDING', HASHING_WORKERS * 4))
+HASHING_TIMEOUT = float(os.getenv('HASHING_TIMEOUT', 10))
+HASHING_RETRY_AFTER = int(os.getenv('HASHING_RETRY_AFTER', 1))
+
+
+class HashingUnavailable(Exception):
+    """
+    Hashing cannot be done right now; answer 503 with Retry-After.
+    """
+    message = 'Password hashing is unavailable'
+
+    def __init__(self, retry_after):
+        super().__init__(self.message)
+        self.retry_after = retry_after
+
+
+class HashingQueueFull(HashingUnavailable):
+    message = 'Password hashing queue is full'
+
+
+class HashingTimeout(HashingUnavailable):
+    message = 'Password hashing timed out'
+
+
+def _to_bytes(value):
+    return value if isinstance(value, bytes) else value.encode('utf-8')
+
+
+def _hash_password(password, rounds):
+    return bcrypt.hashpw(_to_bytes(password), bcrypt.gensalt(rounds)).decode('utf-8')
+
+
+def _check_password(hashed, password):
+    try:
+        return bcrypt.checkpw(_to_bytes(password), _to_bytes(hashed))
+    except ValueError:
+        return False
+
+
+def hash_rounds(hashed):
+    """
+    Work factor of a bcrypt hash ("$2b$12$..." -> 12), or None if unparsable.
+    """
+    parts = _to_bytes(hashed).split(b'$')
+    try:
+        return int(parts[2])
+    except (IndexError, ValueError):
+        return None
+
+
+class PasswordHasher:
+    """
+    Runs bcrypt in a process pool so request threads never burn CPU on it.
+
+    At most `max_pending` hashes may be queued or running per process; past
+    that, callers get HashingQueueFull, and HashingTimeout when a result
+    takes longer than `timeout`; both are HashingUnavailable and should be
+    answered 503 with Retry-After.
+    The pool is created lazily so forked workers (gunicorn --preload) each get
+    their own.
+    """
+
+    def __init__(self, workers=HASHING_WORKERS, max_pending=HASHING_MAX_PENDING, rounds=BCRYPT_LOG_ROUNDS,
+                 timeout=HASHING_TIMEOUT, retry_after=HASHING_RETRY_AFTER):
+        self.workers = workers
+        self.rounds = rounds
+        self.timeout = timeout
+        self.retry_after = retry_after
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._lock = threading.Lock()
+        self._executor = None
+        self._pid = None
+
+    def _get_executor(self):
+        if self._executor is None or self._pid != os.getpid():
+            with self._lock:
+                if self._executor is None or self._pid != os.getpid():
+                    self._executor = ProcessPoolExecutor(max_workers=self.workers)
+                    self._pid = os.getpid()
+        return self._executor
+
+    def _release(self, future):
+        self._slots.release()
+
+    def _run(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            raise HashingQueueFull(self.retry_after)
+        try:
+            future = self._get_executor().submit(fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(self._release)
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            # A queued job is dropped; a running one finishes and frees its slot.
+            future.cancel()
+            raise HashingTimeout(self.retry_after)
+
+    def hash(self, password):
+        return self._run(_hash_password, password, self.rounds)
+
+    def check(self, hashed, password):
+        return self._run(_check_password, hashed, password)
+
+    def needs_rehash(self, hashed):
+        rounds = hash_rounds(hashed)
+        return rounds is None or rounds < self.rounds
+
+    def check_and_upgrade(self, hashed, password):
+        """
+        Verify `password`; on success also return a fresh hash when the stored
+        one uses a lower work factor than configured, else None.
+        """
+        if not self.check(hashed, password):
+            return False, None
+        if self.needs_rehash(hashed):
+            return True, self.hash(password)
+        return True, None
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+hasher = PasswordHasher()
@@ -0,0 +1,23 @@
+from flask import g
+from flask_jwt_extended import get_jwt_identity
+from models import User
+from utils.cache import load_user
+
+
+class UnknownUser(Exception):
+    pass
+
+
+def current_user_id():
+    """
+    User.id of the signed-in user. Access tokens carry the user's email
+    (see /login), which is resolved through the identity cache once per
+    request. Raises UnknownUser when the email no longer names a user.
+    """
+    user_id = g.get('current_user_id')
+    if user_id is None:
+        user = load_user(User, email=get_jwt_identity())
+        if user is None:
+            raise UnknownUser('User not found')
+        user_id = g.current_user_id = user.id
+    return user_id
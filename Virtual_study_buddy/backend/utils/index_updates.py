@@ -0,0 +1,95 @@
+import queue
+import threading
+import time
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, object_session
+
+INDEXED_FIELDS = ('title', 'description', 'tags')
+
+# (enqueued_at, material_id, (title, description, tags) or None if deleted)
+material_changes = queue.SimpleQueue()
+# Set while an index updater consumes the queue, so processes that never
+# serve recommendations do not accumulate changes.
+consuming = threading.Event()
+
+
+def publish_material_changes(changes):
+    """
+    Queue committed changes for the recommendation index. `changes` is an
+    iterable of (material_id, (title, description, tags) or None). Write
+    paths that bypass the ORM must call this after commit themselves.
+    """
+    if not consuming.is_set():
+        return
+    now = time.monotonic()
+    for material_id, document in changes:
+        material_changes.put((now, material_id, document))
+
+
+def _pending(target):
+    return object_session(target).info.setdefault('material_changes', {})
+
+
+def defer_material_changes(session, changes):
+    """
+    Queue changes written through `session`'s connection without the ORM,
+    to be published when the session commits and dropped if it rolls back.
+    """
+    session.info.setdefault('material_changes', {}).update(changes)
+
+
+def _record_insert(mapper, connection, target):
+    _pending(target)[target.id] = tuple(getattr(target, field) for field in INDEXED_FIELDS)
+
+
+def _record_update(mapper, connection, target):
+    state = inspect(target)
+    if any(state.attrs[field].history.has_changes() for field in INDEXED_FIELDS):
+        _record_insert(mapper, connection, target)
+
+
+def _record_delete(mapper, connection, target):
+    _pending(target)[target.id] = None
+
+
+# Flushed changes are held on the session until its outermost transaction
+# ends, so rolled-back writes never reach the index. Each SAVEPOINT keeps a
+# copy of what was pending when it began, restored if it rolls back.
+@event.listens_for(Session, 'after_transaction_create')
+def _mark_savepoint(session, transaction):
+    if transaction.nested:
+        savepoints = session.info.setdefault('material_savepoints', {})
+        savepoints[transaction] = dict(session.info.get('material_changes', {}))
+
+
+@event.listens_for(Session, 'after_commit')
+def _publish_on_commit(session):
+    # Also fired when a SAVEPOINT is released; the outer transaction may
+    # still roll back.
+    if session.in_nested_transaction():
+        return
+    session.info.pop('material_savepoints', None)
+    pending = session.info.pop('material_changes', None)
+    if pending:
+        publish_material_changes(pending.items())
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _discard_on_rollback(session, previous_transaction):
+    if previous_transaction.parent is None:
+        session.info.pop('material_savepoints', None)
+        session.info.pop('material_changes', None)
+    elif previous_transaction.nested:
+        pending = session.info.get('material_savepoints', {}).pop(previous_transaction, None)
+        if pending is not None:
+            session.info['material_changes'] = pending
+
+
+def track_material_model(model):
+    """
+    Feed ORM inserts, text edits and deletes of `model` to the
+    recommendation index once their transaction commits.
+    """
+    event.listen(model, 'after_insert', _record_insert)
+    event.listen(model, 'after_update', _record_update)
+    event.listen(model, 'after_delete', _record_delete)
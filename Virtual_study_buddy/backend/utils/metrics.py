@@ -0,0 +1,258 @@
+import glob
+import json
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from flask import Response, request
+
+logger = logging.getLogger(__name__)
+
+# Set to a directory shared by all worker processes (and emptied before
+# they start) to have /metrics report the sum over every process.
+METRICS_DIR = os.getenv('METRICS_DIR')
+METRICS_FLUSH_SECONDS = float(os.getenv('METRICS_FLUSH_SECONDS', 5))
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (100, 1000, 10000, 100000, 1000000, 10000000)
+UNMATCHED = 'unmatched'
+PROMETHEUS = 'text/plain; version=0.0.4; charset=utf-8'
+
+# name -> (type, help, read): process-wide numbers kept elsewhere, such as
+# cache counters, reported with the request series and summed the same way.
+VALUES = {}
+
+
+def register_value(name, kind, help_text, read):
+    """
+    Report `read()` as the Prometheus `kind` ('counter' or 'gauge') `name`.
+    """
+    VALUES[name] = (kind, help_text, read)
+
+
+class RouteSeries:
+    __slots__ = ('in_flight', 'latency', 'latency_sum', 'size', 'size_sum', 'statuses')
+
+    def __init__(self):
+        self.in_flight = 0
+        self.latency = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.latency_sum = 0.0
+        self.size = [0] * (len(SIZE_BUCKETS) + 1)
+        self.size_sum = 0
+        self.statuses = {}
+
+    def as_list(self):
+        statuses = {str(status): count for status, count in self.statuses.items()}
+        return [self.in_flight, list(self.latency), self.latency_sum, list(self.size), self.size_sum, statuses]
+
+
+class Metrics:
+    """
+    Per-process request metrics keyed by (method, route template).
+
+    Each request takes one uncontended lock twice to update plain lists
+    and ints; buckets are found by bisection. Nothing is formatted until
+    /metrics is scraped. With METRICS_DIR set, a background thread writes
+    this process's series to METRICS_DIR/metrics-<pid>.json every
+    METRICS_FLUSH_SECONDS and a scrape adds up every file there, keeping
+    the counts of exited workers but their gauges, in flight requests
+    included, only while they live. Numbers kept elsewhere, such as cache
+    counters, are added with register_value().
+    """
+
+    def __init__(self, directory=METRICS_DIR, flush_interval=METRICS_FLUSH_SECONDS):
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self._series = {}
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def reset(self):
+        self._series = {}
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def started(self, key):
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = RouteSeries()
+            series.in_flight += 1
+
+    def finished(self, key, seconds, status, size):
+        latency_bucket = bisect_left(LATENCY_BUCKETS, seconds)
+        size_bucket = bisect_left(SIZE_BUCKETS, size) if size is not None else None
+        with self._lock:
+            series = self._series[key]
+            series.in_flight -= 1
+            series.latency[latency_bucket] += 1
+            series.latency_sum += seconds
+            series.statuses[status] = series.statuses.get(status, 0) + 1
+            if size_bucket is not None:
+                series.size[size_bucket] += 1
+                series.size_sum += size
+
+    def snapshot(self):
+        with self._lock:
+            series = {'{} {}'.format(*key): series.as_list() for key, series in self._series.items()}
+        return {'series': series, 'values': {name: read() for name, (_, _, read) in VALUES.items()}}
+
+    def flush(self):
+        path = os.path.join(self.directory, 'metrics-{}.json'.format(os.getpid()))
+        with open(path + '.tmp', 'w') as out:
+            json.dump(self.snapshot(), out)
+        os.replace(path + '.tmp', path)
+
+    def _run(self):
+        while True:
+            time.sleep(self.flush_interval)
+            try:
+                self.flush()
+            except OSError:
+                logger.exception('Could not write metrics to %s', self.directory)
+
+    def ensure_flushing(self):
+        if self.directory and self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    os.makedirs(self.directory, exist_ok=True)
+                    self._thread = threading.Thread(target=self._run, name='metrics-flush', daemon=True)
+                    self._thread.start()
+
+    def collect(self):
+        """
+        Series and values of this process, plus those flushed by every
+        other process when METRICS_DIR is set, summed. Returns (series by
+        route, values by name).
+        """
+        merged = {}
+        values = {}
+        sources = [self.snapshot()]
+        if self.directory:
+            own = 'metrics-{}.json'.format(os.getpid())
+            for path in glob.glob(os.path.join(self.directory, 'metrics-*.json')):
+                name = os.path.basename(path)
+                if name == own:
+                    continue
+                try:
+                    with open(path) as source:
+                        snapshot = json.load(source)
+                except (OSError, ValueError):
+                    continue
+                if not _alive(int(name[len('metrics-'):-len('.json')])):
+                    for route_values in snapshot['series'].values():
+                        route_values[0] = 0
+                    snapshot['values'] = {name: value for name, value in snapshot['values'].items()
+                                          if VALUES.get(name, ('gauge',))[0] == 'counter'}
+                sources.append(snapshot)
+        for snapshot in sources:
+            for name, value in snapshot['values'].items():
+                values[name] = values.get(name, 0) + value
+            for key, (in_flight, latency, latency_sum, size, size_sum, statuses) in snapshot['series'].items():
+                total = merged.get(key)
+                if total is None:
+                    merged[key] = [in_flight, list(latency), latency_sum, list(size), size_sum, dict(statuses)]
+                    continue
+                total[0] += in_flight
+                total[1] = [a + b for a, b in zip(total[1], latency)]
+                total[2] += latency_sum
+                total[3] = [a + b for a, b in zip(total[3], size)]
+                total[4] += size_sum
+                for status, count in statuses.items():
+                    total[5][status] = total[5].get(status, 0) + count
+        return merged, values
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _labels(key, **extra):
+    method, route = key.split(' ', 1)
+    labels = dict(method=method, route=route, **extra)
+    return '{' + ','.join('{}="{}"'.format(name, str(value).replace('\\', '\\\\').replace('"', '\\"'))
+                          for name, value in labels.items()) + '}'
+
+
+def _histogram(lines, name, key, buckets, counts, total):
+    cumulative = 0
+    for bound, count in zip(buckets, counts):
+        cumulative += count
+        lines.append('{}_bucket{} {}'.format(name, _labels(key, le=bound), cumulative))
+    cumulative += counts[-1]
+    lines.append('{}_bucket{} {}'.format(name, _labels(key, le='+Inf'), cumulative))
+    lines.append('{}_sum{} {}'.format(name, _labels(key), total))
+    lines.append('{}_count{} {}'.format(name, _labels(key), cumulative))
+
+
+def render(merged, values=None):
+    """
+    Prometheus text exposition of collect()'s series and values.
+    """
+    keys = sorted(merged)
+    lines = ['# HELP http_request_duration_seconds Request latency by route.',
+             '# TYPE http_request_duration_seconds histogram']
+    for key in keys:
+        _histogram(lines, 'http_request_duration_seconds', key, LATENCY_BUCKETS, merged[key][1], merged[key][2])
+    lines += ['# HELP http_response_size_bytes Response body size by route, where known.',
+              '# TYPE http_response_size_bytes histogram']
+    for key in keys:
+        _histogram(lines, 'http_response_size_bytes', key, SIZE_BUCKETS, merged[key][3], merged[key][4])
+    lines += ['# HELP http_requests_in_flight Requests being handled.', '# TYPE http_requests_in_flight gauge']
+    lines += ['http_requests_in_flight{} {}'.format(_labels(key), merged[key][0]) for key in keys]
+    lines += ['# HELP http_responses_total Responses by route and status code.', '# TYPE http_responses_total counter']
+    for key in keys:
+        lines += ['http_responses_total{} {}'.format(_labels(key, status=status), count)
+                  for status, count in sorted(merged[key][5].items())]
+    for name, value in sorted((values or {}).items()):
+        if name in VALUES:
+            kind, help_text, _ = VALUES[name]
+            lines += ['# HELP {} {}'.format(name, help_text), '# TYPE {} {}'.format(name, kind)]
+        lines.append('{} {}'.format(name, value))
+    return '\n'.join(lines) + '\n'
+
+
+metrics = Metrics()
+os.register_at_fork(after_in_child=metrics.reset)
+
+
+def _start():
+    # Each access through the `request` proxy costs about as much as the
+    # recording itself, so resolve it once per hook.
+    req = request._get_current_object()
+    rule = req.url_rule
+    key = (req.method, rule.rule if rule is not None else UNMATCHED)
+    req.environ['metrics.started'] = (key, time.perf_counter())
+    metrics.ensure_flushing()
+    metrics.started(key)
+
+
+def _finish(response):
+    started = request.environ.pop('metrics.started', None)
+    if started is not None:
+        key, began = started
+        size = None if response.is_streamed else sum(map(len, response.response))
+        metrics.finished(key, time.perf_counter() - began, response.status_code, size)
+    return response
+
+
+def _metrics_view():
+    return Response(render(*metrics.collect()), mimetype=PROMETHEUS)
+
+
+def init_app(app):
+    """
+    Record latency, response size, status and in-flight requests for every
+    route and serve them at /metrics. Keep /metrics internal, e.g. behind
+    the load balancer.
+    """
+    app.before_request(_start)
+    app.after_request(_finish)
+    app.add_url_rule('/metrics', 'metrics', _metrics_view)
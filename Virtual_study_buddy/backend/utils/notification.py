@@ -0,0 +1,394 @@
+import heapq
+import logging
+import os
+import queue
+import random
+import smtplib
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from email.message import EmailMessage
+from sqlalchemy import delete, func, select
+from models import Reminder, User, reminder_schedule_log
+from utils.database import make_engine
+
+logger = logging.getLogger(__name__)
+
+REMINDER_WINDOW_SECONDS = int(os.getenv('REMINDER_WINDOW_SECONDS', 300))
+REMINDER_POLL_SECONDS = float(os.getenv('REMINDER_POLL_SECONDS', 1))
+REMINDER_GRACE_SECONDS = int(os.getenv('REMINDER_GRACE_SECONDS', 60))
+
+SMTP_HOST = os.getenv('SMTP_HOST', 'localhost')
+SMTP_PORT = int(os.getenv('SMTP_PORT', 25))
+SMTP_USERNAME = os.getenv('SMTP_USERNAME')
+SMTP_PASSWORD = os.getenv('SMTP_PASSWORD')
+SMTP_STARTTLS = os.getenv('SMTP_STARTTLS', '0') == '1'
+SMTP_TIMEOUT = float(os.getenv('SMTP_TIMEOUT', 10))
+SMTP_POOL_SIZE = int(os.getenv('SMTP_POOL_SIZE', 4))
+SMTP_MAX_RETRIES = int(os.getenv('SMTP_MAX_RETRIES', 3))
+NOTIFICATION_SENDER = os.getenv('NOTIFICATION_SENDER', 'reminders@studybuddy.local')
+
+
+class ReminderDispatcher:
+    """
+    Fires reminders when their `reminder_time` arrives.
+
+    Only the upcoming window of reminders is loaded, with a range query on
+    ix_reminder_reminder_time, into a min-heap keyed on reminder_time. The
+    dispatcher sleeps until the head of the heap is due, the next poll of
+    reminder_schedule_log, or the point where the next window must be loaded,
+    whichever is first. Inserts, edits and deletes made by any process reach
+    the heap through reminder_schedule_log, which is read incrementally by
+    sequence number. Edited reminders are handled by lazy deletion: the heap
+    may hold stale entries, and `_scheduled` says which one is current.
+
+    Run a single dispatcher per database, since it prunes the log it consumes.
+    `on_due` is called with a list of reminder ids.
+    """
+
+    def __init__(self, engine, on_due, window=timedelta(seconds=REMINDER_WINDOW_SECONDS),
+                 poll_interval=timedelta(seconds=REMINDER_POLL_SECONDS),
+                 grace=timedelta(seconds=REMINDER_GRACE_SECONDS), clock=datetime.utcnow):
+        self.engine = engine
+        self.on_due = on_due
+        self.window = window
+        self.poll_interval = poll_interval
+        self.grace = grace
+        self.clock = clock
+        self._heap = []
+        self._scheduled = {}
+        self._window_end = None
+        self._last_seq = 0
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def __len__(self):
+        return len(self._scheduled)
+
+    def _push(self, reminder_id, reminder_time):
+        self._scheduled[reminder_id] = reminder_time
+        heapq.heappush(self._heap, (reminder_time, reminder_id))
+
+    def _load_window(self, conn, now):
+        start = self._window_end if self._window_end is not None else now - self.grace
+        end = max(start, now) + self.window
+        table = Reminder.__table__
+        rows = conn.execute(
+            select(table.c.id, table.c.reminder_time)
+            .where(table.c.reminder_time >= start, table.c.reminder_time < end)
+        )
+        for reminder_id, reminder_time in rows:
+            self._push(reminder_id, reminder_time)
+        self._window_end = end
+
+    def _apply_changes(self, conn):
+        log = reminder_schedule_log
+        changes = conn.execute(
+            select(log.c.seq, log.c.reminder_id, log.c.reminder_time)
+            .where(log.c.seq > self._last_seq)
+            .order_by(log.c.seq)
+        ).all()
+        for seq, reminder_id, reminder_time in changes:
+            if reminder_time is not None and reminder_time < self._window_end:
+                self._push(reminder_id, reminder_time)
+            else:
+                # Deleted, or moved past the loaded window: the window query
+                # will pick it up again when its time comes.
+                self._scheduled.pop(reminder_id, None)
+            self._last_seq = seq
+        if changes:
+            conn.execute(delete(log).where(log.c.seq <= self._last_seq))
+
+    def _pop_due(self, now):
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            reminder_time, reminder_id = heapq.heappop(self._heap)
+            if self._scheduled.get(reminder_id) == reminder_time:
+                del self._scheduled[reminder_id]
+                due.append(reminder_id)
+        return due
+
+    def tick(self, now=None):
+        """
+        Sync with the database, fire everything that is due and return the
+        time at which the dispatcher next needs to run.
+        """
+        now = now or self.clock()
+        with self.engine.begin() as conn:
+            if self._window_end is None:
+                # Read the log position and the first window in one
+                # transaction so no change falls between them.
+                self._last_seq = conn.execute(select(func.coalesce(func.max(reminder_schedule_log.c.seq), 0))).scalar()
+                self._load_window(conn, now)
+            else:
+                self._apply_changes(conn)
+            while now + self.window / 2 >= self._window_end:
+                self._load_window(conn, now)
+        due = self._pop_due(now)
+        if due:
+            try:
+                self.on_due(due)
+            except Exception:
+                logger.exception('Reminder delivery failed for %d reminders', len(due))
+        next_run = min(now + self.poll_interval, self._window_end - self.window / 2)
+        if self._heap:
+            next_run = min(next_run, self._heap[0][0])
+        return next_run
+
+    def notify(self):
+        """
+        Wake the dispatcher early, e.g. right after a reminder was committed
+        in this process.
+        """
+        self._wakeup.set()
+
+    def run(self):
+        while not self._stopped.is_set():
+            try:
+                next_run = self.tick()
+            except Exception:
+                logger.exception('Reminder dispatcher tick failed')
+                next_run = self.clock() + self.poll_interval
+            delay = (next_run - self.clock()).total_seconds()
+            if delay > 0:
+                self._wakeup.wait(delay)
+            self._wakeup.clear()
+
+    def start(self):
+        self._thread = threading.Thread(target=self.run, name='reminder-dispatcher', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=None):
+        self._stopped.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+
+class SMTPConnectionPool:
+    """
+    Keeps up to `size` authenticated SMTP connections open and hands them out
+    one caller at a time. Connections that fail are closed and replaced lazily.
+    """
+
+    def __init__(self, host=SMTP_HOST, port=SMTP_PORT, size=SMTP_POOL_SIZE, username=SMTP_USERNAME,
+                 password=SMTP_PASSWORD, starttls=SMTP_STARTTLS, timeout=SMTP_TIMEOUT):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.starttls = starttls
+        self.timeout = timeout
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+
+    def _connect(self):
+        conn = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        if self.starttls:
+            conn.starttls()
+        if self.username:
+            conn.login(self.username, self.password)
+        return conn
+
+    def acquire(self):
+        self._slots.acquire()
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        try:
+            return self._connect()
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def release(self, conn, broken=False):
+        if broken:
+            try:
+                conn.close()
+            except Exception:
+                pass
+        else:
+            self._idle.put(conn)
+        self._slots.release()
+
+    def close(self):
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                conn.quit()
+            except Exception:
+                conn.close()
+
+
+def _is_permanent(error):
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return True
+    code = getattr(error, 'smtp_code', None)
+    return code is not None and 500 <= code < 600
+
+
+class DeliveryPipeline:
+    """
+    Sends messages through an SMTPConnectionPool from `concurrency` worker
+    threads. Transient failures, including failures to connect, are
+    retried with exponential backoff and jitter. Permanent (5xx) rejections
+    of a message are not.
+    """
+
+    def __init__(self, pool, concurrency=SMTP_POOL_SIZE, max_retries=SMTP_MAX_RETRIES, backoff=0.5,
+                 max_backoff=30.0):
+        self.pool = pool
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.sent = 0
+        self.failed = 0
+        self.retried = 0
+        # Throughput counts only time with a message in flight, not the idle
+        # gaps between batches.
+        self._busy = 0.0
+        self._busy_since = None
+        self._in_flight = 0
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='smtp')
+
+    def _send(self, message):
+        with self._lock:
+            if not self._in_flight:
+                self._busy_since = time.monotonic()
+            self._in_flight += 1
+        try:
+            return self._send_with_retries(message)
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+                if not self._in_flight:
+                    self._busy += time.monotonic() - self._busy_since
+
+    def _send_with_retries(self, message):
+        for attempt in range(self.max_retries + 1):
+            conn = None
+            try:
+                conn = self.pool.acquire()
+                conn.send_message(message)
+            except (smtplib.SMTPException, OSError) as e:
+                if conn is not None:
+                    self.pool.release(conn, broken=not isinstance(e, smtplib.SMTPResponseException))
+                # A failure to connect (refused, timed out, 421 greeting) says
+                # nothing about this message, so it is always worth a retry.
+                if (conn is not None and _is_permanent(e)) or attempt == self.max_retries:
+                    logger.warning('Giving up on reminder email to %s: %s', message['To'], e)
+                    with self._lock:
+                        self.failed += 1
+                    return False
+                with self._lock:
+                    self.retried += 1
+                delay = min(self.max_backoff, self.backoff * 2 ** attempt)
+                time.sleep(delay * random.uniform(0.5, 1.0))
+            except Exception:
+                # Not an SMTP failure, so retrying will not help; the
+                # connection is in an unknown state.
+                if conn is not None:
+                    self.pool.release(conn, broken=True)
+                logger.exception('Giving up on reminder email to %s', message['To'])
+                with self._lock:
+                    self.failed += 1
+                return False
+            else:
+                self.pool.release(conn)
+                with self._lock:
+                    self.sent += 1
+                return True
+
+    def submit(self, messages):
+        return [self._executor.submit(self._send, message) for message in messages]
+
+    def deliver(self, messages):
+        return [future.result() for future in self.submit(messages)]
+
+    def stats(self):
+        with self._lock:
+            elapsed = self._busy
+            if self._in_flight:
+                elapsed += time.monotonic() - self._busy_since
+            return {
+                'sent': self.sent,
+                'failed': self.failed,
+                'retried': self.retried,
+                'messages_per_second': self.sent / elapsed if elapsed > 0 else 0.0,
+            }
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
+        self.pool.close()
+
+
+def build_digests(conn, reminder_ids, sender=NOTIFICATION_SENDER, chunk_size=500):
+    """
+    Load the given reminders with their owners' addresses, `chunk_size` ids
+    per query, and render one message per user listing all of that user's
+    due reminders.
+    """
+    reminders = Reminder.__table__
+    users = User.__table__
+    grouped = defaultdict(list)
+    addresses = {}
+    for offset in range(0, len(reminder_ids), chunk_size):
+        rows = conn.execute(
+            select(reminders.c.owner_id, users.c.email, reminders.c.title, reminders.c.description,
+                   reminders.c.reminder_time)
+            .join(users, users.c.id == reminders.c.owner_id)
+            .where(reminders.c.id.in_(reminder_ids[offset:offset + chunk_size]))
+        )
+        for owner_id, email, title, description, reminder_time in rows:
+            addresses[owner_id] = email
+            grouped[owner_id].append((reminder_time, title, description))
+
+    messages = []
+    for owner_id, items in grouped.items():
+        items.sort(key=lambda item: item[0])
+        message = EmailMessage()
+        message['From'] = sender
+        message['To'] = addresses[owner_id]
+        if len(items) == 1:
+            message['Subject'] = 'Reminder: {}'.format(items[0][1])
+        else:
+            message['Subject'] = 'You have {} study reminders'.format(len(items))
+        message.set_content('\n'.join(
+            '{:%Y-%m-%d %H:%M} {}{}'.format(reminder_time, title, ' - ' + description if description else '')
+            for reminder_time, title, description in items
+        ))
+        messages.append(message)
+    return messages
+
+
+class ReminderNotifier:
+    """
+    `on_due` callback for ReminderDispatcher: turns due reminder ids into
+    per-user digests and hands them to the delivery pipeline without waiting
+    for the SMTP round trips.
+    """
+
+    def __init__(self, engine, pipeline, sender=NOTIFICATION_SENDER):
+        self.engine = engine
+        self.pipeline = pipeline
+        self.sender = sender
+
+    def __call__(self, reminder_ids):
+        with self.engine.connect() as conn:
+            messages = build_digests(conn, reminder_ids, self.sender)
+        return self.pipeline.submit(messages)
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    engine = make_engine()
+    pipeline = DeliveryPipeline(SMTPConnectionPool())
+    ReminderDispatcher(engine, ReminderNotifier(engine, pipeline)).run()
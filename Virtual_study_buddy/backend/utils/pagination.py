@@ -0,0 +1,82 @@
+import base64
+import json
+from datetime import datetime
+from sqlalchemy import tuple_
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 200
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(values):
+    payload = [value.isoformat() if isinstance(value, datetime) else value for value in values]
+    raw = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor, columns):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        payload = json.loads(raw)
+    except (ValueError, TypeError):
+        raise InvalidCursor('Malformed cursor')
+    if not isinstance(payload, list) or len(payload) != len(columns):
+        raise InvalidCursor('Malformed cursor')
+    values = []
+    for column, value in zip(columns, payload):
+        if value is not None:
+            value = _cursor_value(column.type.python_type, value)
+        values.append(value)
+    return values
+
+
+def _cursor_value(python_type, value):
+    # The payload is client-supplied JSON, so each value is checked against
+    # its column before it can reach a comparison.
+    if python_type is datetime:
+        if isinstance(value, str):
+            try:
+                return datetime.fromisoformat(value)
+            except ValueError:
+                pass
+    elif python_type is int:
+        if isinstance(value, int) and not isinstance(value, bool):
+            return value
+    elif python_type is float:
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            return value
+    elif python_type is str:
+        if isinstance(value, str):
+            return value
+    raise InvalidCursor('Malformed cursor')
+
+
+def parse_page_args(args):
+    """
+    Read `limit` and `after` from the query string, clamping the limit.
+    """
+    try:
+        limit = int(args.get('limit', DEFAULT_LIMIT))
+    except (TypeError, ValueError):
+        raise InvalidCursor('limit must be an integer')
+    return max(1, min(limit, MAX_LIMIT)), args.get('after') or None
+
+
+def paginate(query, columns, limit, after=None):
+    """
+    Keyset pagination: fetch one page of `query` ordered by `columns`, starting
+    strictly after the row encoded in `after`. `columns` must end with a unique
+    column so the ordering is total. Returns (rows, next_cursor).
+    """
+    if after:
+        values = decode_cursor(after, columns)
+        query = query.filter(tuple_(*columns) > tuple_(*values))
+    rows = query.order_by(*columns).limit(limit + 1).all()
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        return rows, encode_cursor([getattr(last, column.key) for column in columns])
+    return rows, None
@@ -0,0 +1,270 @@
+import logging
+import os
+import re
+import signal
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from flask import current_app, jsonify, request
+from flask_jwt_extended import get_jwt_identity, jwt_required
+from werkzeug.exceptions import HTTPException
+from utils.metrics import UNMATCHED
+
+logger = logging.getLogger(__name__)
+
+PROFILE_DIR = os.getenv('PROFILE_DIR', 'instance/profiles')
+PROFILE_MAX_SECONDS = float(os.getenv('PROFILE_MAX_SECONDS', 300))
+PROFILE_DEFAULT_SECONDS = float(os.getenv('PROFILE_DEFAULT_SECONDS', 30))
+PROFILE_INTERVAL_MS = float(os.getenv('PROFILE_INTERVAL_MS', 5))
+# JWT identities allowed to use /admin/profile, comma separated.
+PROFILE_ADMINS = frozenset(filter(None, (name.strip() for name in os.getenv('PROFILE_ADMINS', '').split(','))))
+# e.g. SIGUSR2; sending it to a worker starts a PROFILE_DEFAULT_SECONDS
+# profile there, or stops the running one. Unset, no handler is installed.
+PROFILE_SIGNAL = os.getenv('PROFILE_SIGNAL')
+
+
+class InvalidProfileRequest(ValueError):
+    pass
+
+
+class ProfilerBusy(Exception):
+    pass
+
+
+class Profile:
+    """
+    Statistical profile of the requests this process serves for `seconds`.
+
+    While running, app.wsgi_app is wrapped to note which route each
+    thread is serving, for one request in `every`; a background thread
+    reads every such thread's stack each `interval` seconds and counts it
+    under its route. Stopping puts the original wsgi_app back, so nothing
+    is left on the request path, and writes one collapsed-stack file per
+    route (<route>.folded, the route as the root frame) for flamegraph.pl
+    or speedscope. Time spent streaming a response body after the view
+    returns is not sampled.
+    """
+
+    def __init__(self, app, seconds, interval, every=1, directory=PROFILE_DIR):
+        self.app = app
+        self.seconds = seconds
+        self.interval = interval
+        self.every = every
+        self.id = '{}-{}'.format(datetime.utcnow().strftime('%Y%m%dT%H%M%S'), os.getpid())
+        self.directory = os.path.join(os.path.abspath(directory), self.id)
+        self.started_at = None
+        self.stopped_at = None
+        self.samples = Counter()
+        self.requests = Counter()
+        self.files = []
+        self._active = {}
+        self._labels = {}
+        self._seen = 0
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._wsgi_app = None
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self.stopped_at is None
+
+    def _route(self, environ):
+        try:
+            rule, _ = self.app.url_map.bind_to_environ(environ).match(return_rule=True)
+        except HTTPException:
+            return '{} {}'.format(environ['REQUEST_METHOD'], UNMATCHED)
+        return '{} {}'.format(environ['REQUEST_METHOD'], rule.rule)
+
+    def _call(self, environ, start_response):
+        with self._lock:
+            self._seen += 1
+            chosen = self._seen % self.every == 0
+        if not chosen:
+            return self._wsgi_app(environ, start_response)
+        route = self._route(environ)
+        ident = threading.get_ident()
+        with self._lock:
+            self.requests[route] += 1
+        self._active[ident] = route
+        try:
+            return self._wsgi_app(environ, start_response)
+        finally:
+            self._active.pop(ident, None)
+
+    def _label(self, code):
+        label = self._labels.get(code)
+        if label is None:
+            label = self._labels[code] = '{} ({}:{})'.format(
+                getattr(code, 'co_qualname', code.co_name), os.path.basename(code.co_filename), code.co_firstlineno)
+        return label
+
+    def _stack(self, frame, route):
+        labels = []
+        # Frames above the wrapper belong to the server, not the request.
+        while frame is not None and frame.f_code is not _ENTRY:
+            labels.append(self._label(frame.f_code))
+            frame = frame.f_back
+        labels.append(route)
+        return ';'.join(reversed(labels))
+
+    def _sample(self):
+        deadline = time.monotonic() + self.seconds
+        while not self._stopped.wait(self.interval) and time.monotonic() < deadline:
+            frames = sys._current_frames()
+            for ident, route in list(self._active.items()):
+                frame = frames.get(ident)
+                if frame is not None:
+                    self.samples[route, self._stack(frame, route)] += 1
+            del frames
+        self._finish()
+
+    def _finish(self):
+        if self.app.wsgi_app == self._call:
+            self.app.wsgi_app = self._wsgi_app
+        self.stopped_at = datetime.utcnow()
+        try:
+            self.files = self.write()
+        except OSError:
+            logger.exception('Could not write profile %s', self.id)
+        logger.info('Profile %s finished: %d samples over %d requests', self.id,
+                    sum(self.samples.values()), sum(self.requests.values()))
+
+    def write(self):
+        by_route = {}
+        for (route, stack), count in self.samples.items():
+            by_route.setdefault(route, []).append('{} {}\n'.format(stack, count))
+        os.makedirs(self.directory, exist_ok=True)
+        paths = []
+        for route, lines in sorted(by_route.items()):
+            path = os.path.join(self.directory, re.sub(r'[^A-Za-z0-9]+', '_', route).strip('_') + '.folded')
+            with open(path, 'w') as out:
+                out.writelines(sorted(lines))
+            paths.append(path)
+        return paths
+
+    def start(self):
+        self.started_at = datetime.utcnow()
+        self._wsgi_app = self.app.wsgi_app
+        self.app.wsgi_app = self._call
+        self._thread = threading.Thread(target=self._sample, name='profiler', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=None):
+        self._stopped.set()
+        if self._thread is not threading.current_thread():
+            self._thread.join(timeout)
+
+    def status(self):
+        return {
+            'id': self.id,
+            'running': self.running,
+            'pid': os.getpid(),
+            'every': self.every,
+            'interval_ms': self.interval * 1000,
+            'started_at': self.started_at.isoformat(),
+            'stopped_at': self.stopped_at.isoformat() if self.stopped_at else None,
+            'samples': sum(self.samples.values()),
+            'requests': dict(self.requests),
+            'files': self.files,
+        }
+
+
+_ENTRY = Profile._call.__code__
+
+_profile = None
+_lock = threading.Lock()
+
+
+def _number(data, name, default, cast, minimum, maximum=None):
+    value = data.get(name, default)
+    try:
+        value = cast(value)
+    except (TypeError, ValueError):
+        raise InvalidProfileRequest('{} must be a number'.format(name))
+    if value < minimum:
+        raise InvalidProfileRequest('{} must be at least {}'.format(name, minimum))
+    if maximum is not None and value > maximum:
+        raise InvalidProfileRequest('{} must be at most {}'.format(name, maximum))
+    return value
+
+
+def start_profile(app, data):
+    """
+    Start profiling this process with the options in `data` (seconds,
+    interval_ms, every). Raises ProfilerBusy if a profile is running.
+    """
+    global _profile
+    seconds = _number(data, 'seconds', PROFILE_DEFAULT_SECONDS, float, 1, PROFILE_MAX_SECONDS)
+    interval_ms = _number(data, 'interval_ms', PROFILE_INTERVAL_MS, float, 1, 1000)
+    every = _number(data, 'every', 1, int, 1)
+    with _lock:
+        if _profile is not None and _profile.running:
+            raise ProfilerBusy(_profile.id)
+        _profile = Profile(app, seconds, interval_ms / 1000, every).start()
+        return _profile
+
+
+def stop_profile():
+    """
+    Stop the running profile, if any, and return the latest one.
+    """
+    with _lock:
+        if _profile is not None and _profile.running:
+            _profile.stop()
+        return _profile
+
+
+def _toggle(app):
+    try:
+        with _lock:
+            running = _profile is not None and _profile.running
+        if running:
+            stop_profile()
+        else:
+            start_profile(app, {})
+    except Exception:
+        logger.exception('Profiler signal failed')
+
+
+def _admin_only(view):
+    def wrapper():
+        if str(get_jwt_identity()) not in PROFILE_ADMINS:
+            return jsonify({'message': 'Forbidden'}), 403
+        return view()
+    wrapper.__name__ = view.__name__
+    return jwt_required()(wrapper)
+
+
+def _profile_view():
+    if request.method == 'POST':
+        try:
+            profile = start_profile(current_app._get_current_object(), request.get_json(silent=True) or {})
+        except InvalidProfileRequest as e:
+            return jsonify({'message': str(e)}), 400
+        except ProfilerBusy as e:
+            return jsonify({'message': 'Profile {} is already running'.format(e)}), 409
+        return jsonify({'profile': profile.status()}), 202
+    profile = stop_profile() if request.method == 'DELETE' else _profile
+    if profile is None:
+        return jsonify({'message': 'No profile has been taken'}), 404
+    return jsonify({'profile': profile.status()}), 200
+
+
+def init_app(app):
+    """
+    Serve /admin/profile to the identities in PROFILE_ADMINS: POST starts
+    a profile of this worker ({"seconds", "interval_ms", "every"}), GET
+    reports on it and DELETE stops it early. Each request reaches a single
+    worker; to profile them all, send PROFILE_SIGNAL to each worker pid.
+    Nothing runs per request unless a profile is.
+    """
+    app.add_url_rule('/admin/profile', 'profile', _admin_only(_profile_view), methods=['GET', 'POST', 'DELETE'])
+    if PROFILE_SIGNAL and threading.current_thread() is threading.main_thread():
+        # The handler may interrupt code holding _lock, so leave the work
+        # to a thread of its own.
+        signal.signal(getattr(signal, PROFILE_SIGNAL), lambda signum, frame: threading.Thread(
+            target=_toggle, args=(app,), name='profiler-signal', daemon=True).start())
@@ -0,0 +1,114 @@
+import logging
+import os
+import re
+import time
+from collections import Counter
+from contextvars import ContextVar
+from functools import lru_cache
+from flask import request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+DB_SLOW_QUERY_MS = float(os.getenv('DB_SLOW_QUERY_MS', 100))
+# Identical SELECT shapes run this many times in one request are reported
+# as a likely N+1.
+DB_REPEAT_THRESHOLD = int(os.getenv('DB_REPEAT_THRESHOLD', 10))
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_PLACEHOLDERS = re.compile(r'\((?:\s*(?:\?|%s|:\w+)\s*,)+\s*(?:\?|%s|:\w+)\s*\)')
+_ROWS = re.compile(r'(\(\?\))(?:\s*,\s*\(\?\))+')
+_SPACE = re.compile(r'\s+')
+
+_current = ContextVar('query_stats', default=None)
+
+
+@lru_cache(maxsize=2048)
+def statement_shape(statement):
+    """
+    `statement` with literals replaced by ? and placeholder lists and
+    multi-row VALUES collapsed, so it can be logged without data and
+    statements that differ only in their arguments compare equal.
+    """
+    shape = _STRING.sub('?', statement)
+    shape = _NUMBER.sub('?', shape)
+    shape = _PLACEHOLDERS.sub('(?)', shape)
+    shape = _ROWS.sub(r'\1', shape)
+    return _SPACE.sub(' ', shape).strip()
+
+
+class QueryStats:
+    __slots__ = ('count', 'seconds', 'shapes')
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.shapes = Counter()
+
+    def repeated(self, threshold=DB_REPEAT_THRESHOLD):
+        return [(shape, count) for shape, count in self.shapes.most_common()
+                if count >= threshold and shape.startswith('SELECT')]
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current.get() is not None:
+        context._query_started = time.perf_counter()
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current.get()
+    if stats is None or not hasattr(context, '_query_started'):
+        return
+    elapsed = time.perf_counter() - context._query_started
+    shape = statement_shape(statement)
+    stats.count += 1
+    stats.seconds += elapsed
+    stats.shapes[shape] += 1
+    if elapsed * 1000 >= DB_SLOW_QUERY_MS:
+        logger.warning('Slow query (%.1f ms) in %s %s: %s', elapsed * 1000, request.method, request.path, shape,
+                       extra={'db_ms': round(elapsed * 1000, 3), 'statement': shape})
+
+
+def _start():
+    _current.set(QueryStats())
+
+
+def _finish(response):
+    stats = _current.get()
+    if stats is None:
+        return response
+    _current.set(None)
+    db_ms = stats.seconds * 1000
+    response.headers.add('Server-Timing', 'db;desc="{} queries";dur={:.2f}'.format(stats.count, db_ms))
+    repeated = stats.repeated()
+    for shape, count in repeated:
+        logger.warning('Likely N+1 in %s %s: %d x %s', request.method, request.path, count, shape,
+                       extra={'statement': shape, 'repeats': count})
+    route = request.url_rule.rule if request.url_rule else None
+    logger.info('%s %s %d: %d queries, %.1f ms in the database', request.method, request.path,
+                response.status_code, stats.count, db_ms,
+                extra={'method': request.method, 'path': request.path, 'route': route,
+                       'status': response.status_code, 'db_queries': stats.count, 'db_ms': round(db_ms, 3),
+                       'db_repeated': len(repeated)})
+    return response
+
+
+def _discard(exception):
+    _current.set(None)
+
+
+def init_app(app):
+    """
+    Count the SQL statements each request runs and the time spent in them,
+    reported in a Server-Timing header and one log record per request.
+    Statements slower than DB_SLOW_QUERY_MS are logged, without their
+    parameters; repeated SELECTs are flagged as likely N+1. Queries run
+    while a streamed body is being sent are not included.
+    """
+    app.before_request(_start)
+    app.after_request(_finish)
+    app.teardown_request(_discard)
@@ -0,0 +1,757 @@
+import argparse
+import copy
+import hashlib
+import json
+import logging
+import os
+import queue
+import re
+import shutil
+import threading
+import time
+from collections import Counter
+import numpy as np
+from scipy import sparse
+from sqlalchemy import select
+from models import StudyMaterial
+from utils.index_updates import consuming, material_changes
+
+logger = logging.getLogger(__name__)
+
+RECOMMENDER_REFRESH_SECONDS = int(os.getenv('RECOMMENDER_REFRESH_SECONDS', 3600))
+RECOMMENDER_INDEX_PATH = os.getenv('RECOMMENDER_INDEX_PATH', 'instance/recommendation_index')
+RECOMMENDER_INDEX_CHECK_SECONDS = int(os.getenv('RECOMMENDER_INDEX_CHECK_SECONDS', 30))
+RECOMMENDER_UPDATE_SECONDS = float(os.getenv('RECOMMENDER_UPDATE_SECONDS', 1))
+RECOMMENDER_UPDATE_BATCH = int(os.getenv('RECOMMENDER_UPDATE_BATCH', 5000))
+# How often each process looks for materials other processes have added.
+RECOMMENDER_POLL_SECONDS = float(os.getenv('RECOMMENDER_POLL_SECONDS', 10))
+
+TOKEN_RE = re.compile(r'[a-z0-9]+')
+STOP_WORDS = frozenset((
+    'a an and are as at be by for from has in is it its of on or that the this to was were will with'
+).split())
+
+
+def tokenize(*fields):
+    tokens = []
+    for field in fields:
+        if field:
+            tokens.extend(token for token in TOKEN_RE.findall(field.lower())
+                          if len(token) > 1 and token not in STOP_WORDS)
+    return tokens
+
+
+class MaterialRecommender:
+    """
+    Content-based recommendations over StudyMaterial title, description and
+    tags.
+
+    Each material is stored as a row of sublinear term frequencies
+    (1 + log tf) in a CSR matrix, next to per-term document frequencies.
+    IDF weights and row norms are derived from those, so the TF-IDF cosine
+    of every material against a profile vector is one sparse mat-vec:
+        scores = (TF @ (idf * q)) / ||TF * idf||
+    The top k are then picked with argpartition.
+    """
+
+    def __init__(self):
+        self.vocabulary = {}
+        self.ids = np.empty(0, dtype=np.int64)
+        self.tf = sparse.csr_matrix((0, 0), dtype=np.float32)
+        self.df = np.zeros(0, dtype=np.int64)
+        self.row_of = {}
+        self.idf = np.zeros(0, dtype=np.float32)
+        self.norms = np.zeros(0, dtype=np.float32)
+
+    def __len__(self):
+        return len(self.row_of)
+
+    def _term_ids(self, tokens, grow=True):
+        counts = Counter(tokens)
+        cols = []
+        values = []
+        for term, count in counts.items():
+            col = self.vocabulary.get(term)
+            if col is None:
+                if not grow:
+                    continue
+                col = self.vocabulary[term] = len(self.vocabulary)
+            cols.append(col)
+            values.append(1.0 + np.log(count))
+        return cols, values
+
+    @classmethod
+    def fit(cls, documents):
+        """
+        Build from an iterable of (id, title, description, tags) tuples.
+        """
+        self = cls()
+        ids = []
+        indptr = [0]
+        indices = []
+        data = []
+        for material_id, title, description, tags in documents:
+            cols, values = self._term_ids(tokenize(title, description, tags))
+            self.row_of[material_id] = len(ids)
+            ids.append(material_id)
+            indices.extend(cols)
+            data.extend(values)
+            indptr.append(len(indices))
+        self.ids = np.asarray(ids, dtype=np.int64)
+        self.tf = sparse.csr_matrix(
+            (np.asarray(data, dtype=np.float32), np.asarray(indices, dtype=np.int32), np.asarray(indptr, dtype=np.int64)),
+            shape=(len(ids), len(self.vocabulary)),
+        )
+        self.df = np.bincount(self.tf.indices, minlength=len(self.vocabulary)).astype(np.int64)
+        self.refresh_weights()
+        return self
+
+    def refresh_weights(self):
+        n_docs = len(self.row_of)
+        self.idf = (np.log((1.0 + n_docs) / (1.0 + self.df)) + 1.0).astype(np.float32)
+        squared = self.tf.multiply(self.tf).tocsr()
+        norms = np.sqrt(squared @ (self.idf ** 2))
+        norms[norms == 0] = 1.0
+        self.norms = norms.astype(np.float32)
+
+    def apply(self, changes, compact_ratio=0.25):
+        """
+        Return a copy with `changes` ({material_id: (title, description,
+        tags) or None}) folded in, leaving this instance untouched for
+        concurrent readers.
+
+        Replaced and deleted rows are zeroed in place of being removed, and
+        their terms are subtracted from the document frequencies; new
+        versions are appended as fresh rows. IDF and norms are then
+        recomputed from the stored term frequencies, which is O(nnz) rather
+        than a re-tokenising refit. Zeroed rows are compacted away once they
+        exceed `compact_ratio` of the matrix.
+        """
+        updated = copy.copy(self)
+        updated.vocabulary = dict(self.vocabulary)
+        updated.row_of = dict(self.row_of)
+        tf = self.tf
+        data = tf.data.copy()
+        df = self.df.copy()
+        for material_id in changes:
+            row = updated.row_of.pop(material_id, None)
+            if row is not None:
+                start, stop = tf.indptr[row], tf.indptr[row + 1]
+                df[tf.indices[start:stop]] -= 1
+                data[start:stop] = 0
+
+        ids = []
+        indptr = [0]
+        indices = []
+        values = []
+        for material_id, document in changes.items():
+            if document is None:
+                continue
+            cols, weights = updated._term_ids(tokenize(*document))
+            updated.row_of[material_id] = tf.shape[0] + len(ids)
+            ids.append(material_id)
+            indices.extend(cols)
+            values.extend(weights)
+            indptr.append(len(indices))
+
+        n_terms = len(updated.vocabulary)
+        appended = sparse.csr_matrix(
+            (np.asarray(values, dtype=np.float32), np.asarray(indices, dtype=np.int32), np.asarray(indptr, dtype=np.int64)),
+            shape=(len(ids), n_terms),
+        )
+        updated.tf = sparse.vstack([
+            sparse.csr_matrix((data, tf.indices, tf.indptr), shape=(tf.shape[0], n_terms)),
+            appended,
+        ], format='csr')
+        updated.ids = np.concatenate([self.ids, np.asarray(ids, dtype=np.int64)])
+        updated.df = np.concatenate([df, np.zeros(n_terms - len(df), dtype=np.int64)])
+        updated.df += np.bincount(appended.indices, minlength=n_terms)
+
+        if updated.tf.shape[0] - len(updated.row_of) > compact_ratio * updated.tf.shape[0]:
+            live = np.fromiter(sorted(updated.row_of.values()), dtype=np.int64, count=len(updated.row_of))
+            updated.tf = updated.tf[live]
+            updated.ids = updated.ids[live]
+            updated.row_of = {int(material_id): row for row, material_id in enumerate(updated.ids)}
+        updated.refresh_weights()
+        return updated
+
+    def profile(self, material_ids):
+        """
+        Mean of the L2-normalised TF-IDF vectors of the given materials, as a
+        dense vector over the vocabulary, or None if none are indexed.
+        """
+        rows = [self.row_of[material_id] for material_id in material_ids if material_id in self.row_of]
+        if not rows:
+            return None
+        weighted = self.tf[rows].multiply(self.idf).multiply(1.0 / self.norms[rows][:, None])
+        vector = np.asarray(weighted.sum(axis=0)).ravel()
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else None
+
+    def text_profile(self, text):
+        cols, values = self._term_ids(tokenize(text), grow=False)
+        if not cols:
+            return None
+        vector = np.zeros(len(self.vocabulary), dtype=np.float32)
+        vector[cols] = np.asarray(values, dtype=np.float32) * self.idf[cols]
+        return vector / np.linalg.norm(vector)
+
+    def scores(self, vector):
+        return (self.tf @ (vector * self.idf)) / self.norms
+
+    def top_k(self, scores, k, exclude=()):
+        exclude_rows = [self.row_of[material_id] for material_id in exclude if material_id in self.row_of]
+        if exclude_rows:
+            scores = scores.copy()
+            scores[exclude_rows] = -np.inf
+        k = min(k, len(scores))
+        if k <= 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(int(self.ids[row]), float(scores[row])) for row in top if scores[row] > 0]
+
+    def search(self, vector, k=10, exclude=()):
+        return self.top_k(self.scores(vector), k, exclude=exclude)
+
+    def recommend(self, material_ids, k=10):
+        """
+        Materials most similar to the profile of `material_ids`, excluding
+        those materials themselves, as [(material_id, score), ...].
+        """
+        vector = self.profile(material_ids)
+        if vector is None:
+            return []
+        return self.search(vector, k, exclude=material_ids)
+
+
+def _term_hash(term):
+    return int.from_bytes(hashlib.blake2b(term.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+class ANNIndex:
+    """
+    Approximate nearest-neighbour index for material recommendations.
+
+    Materials are stored as L2-normalised TF-IDF rows whose columns are term
+    hashes modulo `n_buckets`, so queries need no vocabulary. Candidate
+    generation only indexes each material under its `terms_per_row`
+    highest-weighted terms: a query looks up the postings of its own
+    `query_terms` heaviest terms, heaviest first, until `budget` postings
+    have been read, and the union is re-ranked by exact cosine. Heavy terms
+    are rare, so the budget is mostly spent on short, selective lists.
+    Postings are stored as (bucket, row) pairs sorted by bucket, so a lookup
+    is a searchsorted range.
+
+    Every array is saved as a separate .npy file and opened with
+    mmap_mode='r', so all workers share the same page-cache copy.
+    """
+
+    FILES = ('ids', 'indptr', 'indices', 'data', 'idf', 'postings', 'posting_rows')
+
+    def __init__(self, arrays, meta):
+        self.meta = meta
+        self.n_buckets = meta['n_buckets']
+        self.terms_per_row = meta['terms_per_row']
+        self.query_terms = meta['query_terms']
+        self.budget = meta['budget']
+        for name in self.FILES:
+            setattr(self, name, arrays[name])
+
+    def __len__(self):
+        return len(self.ids)
+
+    @classmethod
+    def build(cls, recommender, terms_per_row=8, query_terms=32, budget=4096, n_buckets=1 << 22, snapshot_at=None):
+        """
+        Index `recommender`. `snapshot_at` is the time.time() at which its
+        documents were read, so overlays can drop changes the index holds.
+        """
+        terms = sorted(recommender.vocabulary, key=recommender.vocabulary.get)
+        hashes = np.array([_term_hash(term) for term in terms], dtype=np.uint64)
+        buckets = (hashes % np.uint64(n_buckets)).astype(np.int64)
+
+        live = np.array(sorted(recommender.row_of.values()), dtype=np.int64)
+        live = live[np.argsort(recommender.ids[live], kind='stable')]
+        weighted = sparse.csr_matrix(
+            recommender.tf[live].multiply(recommender.idf).multiply(1.0 / recommender.norms[live][:, None]),
+            dtype=np.float32,
+        )
+        rows = sparse.csr_matrix((weighted.data, buckets[weighted.indices], weighted.indptr),
+                                 shape=(len(live), n_buckets))
+        rows.sum_duplicates()
+
+        owner = np.repeat(np.arange(len(live), dtype=np.int32), np.diff(rows.indptr))
+        ranked = np.lexsort((-rows.data, owner))
+        rank = np.arange(len(ranked)) - rows.indptr[owner[ranked]]
+        kept = ranked[rank < terms_per_row]
+        by_bucket = np.argsort(rows.indices[kept], kind='stable')
+
+        idf = np.ones(n_buckets, dtype=np.float32)
+        idf[buckets] = recommender.idf
+        arrays = {
+            'ids': recommender.ids[live].astype(np.int64),
+            'indptr': rows.indptr.astype(np.int64),
+            'indices': rows.indices.astype(np.int32),
+            'data': rows.data.astype(np.float32),
+            'idf': idf,
+            'postings': rows.indices[kept][by_bucket].astype(np.int32),
+            'posting_rows': owner[kept][by_bucket],
+        }
+        meta = {'n_buckets': n_buckets, 'terms_per_row': terms_per_row, 'query_terms': query_terms,
+                'budget': budget, 'size': int(len(live)), 'built_at': time.time(), 'snapshot_at': snapshot_at}
+        return cls(arrays, meta)
+
+    def save(self, path):
+        """
+        Write to a sibling directory and swap it into place, so workers never
+        see a half-written index. Old mappings stay valid until reopened.
+        """
+        staging = '{}.tmp-{}'.format(path, os.getpid())
+        os.makedirs(staging, exist_ok=True)
+        for name in self.FILES:
+            np.save(os.path.join(staging, name + '.npy'), np.ascontiguousarray(getattr(self, name)))
+        with open(os.path.join(staging, 'meta.json'), 'w') as f:
+            json.dump(self.meta, f)
+        retired = None
+        if os.path.exists(path):
+            retired = '{}.old-{}'.format(path, os.getpid())
+            os.replace(path, retired)
+        os.replace(staging, path)
+        if retired:
+            shutil.rmtree(retired, ignore_errors=True)
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        with open(os.path.join(path, 'meta.json')) as f:
+            meta = json.load(f)
+        arrays = {
+            name: np.load(os.path.join(path, name + '.npy'), mmap_mode='r' if mmap else None)
+            for name in cls.FILES
+        }
+        return cls(arrays, meta)
+
+    def rows_for(self, material_ids):
+        material_ids = np.asarray(list(material_ids), dtype=np.int64)
+        if not len(material_ids) or not len(self.ids):
+            return np.empty(0, dtype=np.int64)
+        rows = np.minimum(np.searchsorted(self.ids, material_ids), len(self.ids) - 1)
+        return rows[self.ids[rows] == material_ids]
+
+    def _gather(self, rows):
+        """
+        Concatenated (row position, bucket, weight) entries of the given rows.
+        """
+        starts = np.asarray(self.indptr[rows])
+        lengths = np.asarray(self.indptr[rows + 1]) - starts
+        owner = np.repeat(np.arange(len(rows)), lengths)
+        flat = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths) + np.repeat(starts, lengths)
+        return owner, np.asarray(self.indices[flat]), np.asarray(self.data[flat])
+
+    def _normalise(self, buckets, weights):
+        buckets, inverse = np.unique(buckets, return_inverse=True)
+        weights = np.bincount(inverse, weights=weights).astype(np.float32)
+        norm = np.linalg.norm(weights)
+        return (buckets, weights / norm) if norm else None
+
+    def profile(self, material_ids):
+        """
+        Sum of the given materials' rows, normalised, as (buckets, weights).
+        """
+        rows = np.sort(self.rows_for(material_ids))
+        if not len(rows):
+            return None
+        _, buckets, weights = self._gather(rows)
+        return self._normalise(buckets, weights)
+
+    def text_profile(self, *fields):
+        counts = Counter(tokenize(*fields))
+        if not counts:
+            return None
+        hashes = np.array([_term_hash(term) for term in counts], dtype=np.uint64)
+        buckets = (hashes % np.uint64(self.n_buckets)).astype(np.int64)
+        weights = (1.0 + np.log(np.fromiter(counts.values(), dtype=np.float32))) * self.idf[buckets]
+        return self._normalise(buckets, weights)
+
+    def candidates(self, vector, budget=None):
+        """
+        Rows posted under the query's heaviest terms, taken in descending
+        weight order until `budget` postings have been read.
+        """
+        budget = budget or self.budget
+        buckets, weights = vector
+        buckets = buckets[np.argsort(-weights)[:self.query_terms]]
+        lo = np.searchsorted(self.postings, buckets, side='left')
+        hi = np.searchsorted(self.postings, buckets, side='right')
+        found = []
+        read = 0
+        for start, stop in zip(lo, hi):
+            if stop > start:
+                found.append(self.posting_rows[start:min(stop, start + budget - read)])
+                read += len(found[-1])
+                if read >= budget:
+                    break
+        if not found:
+            return np.empty(0, dtype=np.int64)
+        return np.unique(np.concatenate(found)).astype(np.int64)
+
+    def search(self, vector, k=10, exclude=()):
+        rows = self.candidates(vector)
+        if len(exclude):
+            rows = np.setdiff1d(rows, self.rows_for(exclude), assume_unique=True)
+        if not len(rows):
+            return []
+        buckets, weights = vector
+        owner, row_buckets, row_weights = self._gather(rows)
+        at = np.minimum(np.searchsorted(buckets, row_buckets), len(buckets) - 1)
+        hit = buckets[at] == row_buckets
+        scores = np.bincount(owner[hit], weights=row_weights[hit] * weights[at[hit]], minlength=len(rows))
+        k = min(k, len(rows))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(int(self.ids[rows[i]]), float(scores[i])) for i in top if scores[i] > 0]
+
+    def recommend(self, material_ids, k=10):
+        vector = self.profile(material_ids)
+        if vector is None:
+            return []
+        return self.search(vector, k, exclude=material_ids)
+
+
+class ANNOverlay:
+    """
+    An ANNIndex with the material changes made since it was built laid
+    over it, so new and edited materials are recommended without a
+    rebuild.
+
+    Changed and deleted materials are hidden from the index; the current
+    version of each changed one is kept as a normalised (buckets, weights)
+    row, weighted like the index's own rows, and scored exactly against
+    every query. The overlay therefore grows until the next build: rebuild
+    the index on a schedule. Loading a newer index keeps only the changes
+    applied after its documents were read.
+    """
+
+    def __init__(self, index, rows=None):
+        self.index = index
+        self.meta = index.meta
+        # material_id -> (time.time() applied, row or None if deleted)
+        self.rows = rows or {}
+
+    def __len__(self):
+        live = sum(1 for _, row in self.rows.values() if row is not None)
+        return len(self.index) - len(self.index.rows_for(self.rows)) + live
+
+    @property
+    def max_id(self):
+        ids = [int(self.index.ids[-1])] if len(self.index.ids) else []
+        return max(ids + list(self.rows), default=0)
+
+    def apply(self, changes, applied_at=None):
+        """
+        Return a copy with `changes` ({material_id: (title, description,
+        tags) or None}) laid over the index.
+        """
+        applied_at = applied_at or time.time()
+        rows = dict(self.rows)
+        for material_id, document in changes.items():
+            rows[material_id] = (applied_at, self.index.text_profile(*document) if document else None)
+        return ANNOverlay(self.index, rows)
+
+    def rebase(self, index):
+        """
+        The same changes over a newer `index`, less those it already holds.
+        """
+        since = index.meta.get('snapshot_at')
+        return ANNOverlay(index, {
+            material_id: entry for material_id, entry in self.rows.items() if since is None or entry[0] >= since
+        })
+
+    def text_profile(self, text):
+        return self.index.text_profile(text)
+
+    def profile(self, material_ids):
+        rows = np.sort(self.index.rows_for([material_id for material_id in material_ids
+                                            if material_id not in self.rows]))
+        buckets = []
+        weights = []
+        if len(rows):
+            _, row_buckets, row_weights = self.index._gather(rows)
+            buckets.append(row_buckets)
+            weights.append(row_weights)
+        for material_id in material_ids:
+            row = self.rows.get(material_id, (None, None))[1]
+            if row is not None:
+                buckets.append(row[0])
+                weights.append(row[1])
+        if not buckets:
+            return None
+        return self.index._normalise(np.concatenate(buckets), np.concatenate(weights))
+
+    def search(self, vector, k=10, exclude=()):
+        exclude = set(exclude)
+        ranked = self.index.search(vector, k, exclude=list(exclude.union(self.rows)))
+        buckets, weights = vector
+        for material_id, (_, row) in self.rows.items():
+            if row is None or material_id in exclude:
+                continue
+            _, at, row_at = np.intersect1d(buckets, row[0], assume_unique=True, return_indices=True)
+            score = float(weights[at] @ row[1][row_at])
+            if score > 0:
+                ranked.append((material_id, score))
+        ranked.sort(key=lambda pair: -pair[1])
+        return ranked[:k]
+
+    def recommend(self, material_ids, k=10):
+        vector = self.profile(material_ids)
+        if vector is None:
+            return []
+        return self.search(vector, k, exclude=material_ids)
+
+
+def load_documents(conn, batch_size=10000, after=None, limit=None):
+    table = StudyMaterial.__table__
+    statement = select(table.c.id, table.c.title, table.c.description, table.c.tags).order_by(table.c.id)
+    if after is not None:
+        statement = statement.where(table.c.id > after)
+    result = conn.execution_options(yield_per=batch_size).execute(statement.limit(limit))
+    for row in result:
+        yield tuple(row)
+
+
+_recommender = None
+_built_at = 0.0
+# Changes folded in while a background refit runs, applied to its result;
+# None when no refit is running.
+_refit_changes = None
+_updater = None
+_lock = threading.Lock()
+
+
+def _refit(engine):
+    global _recommender, _built_at, _refit_changes
+    try:
+        with engine.connect() as conn:
+            fitted = MaterialRecommender.fit(load_documents(conn))
+    except Exception:
+        logger.exception('Recommendation refit failed')
+        fitted = None
+    with _lock:
+        changes, _refit_changes = _refit_changes, None
+        if fitted is not None:
+            _recommender = fitted.apply(changes) if changes else fitted
+        _built_at = time.monotonic()
+
+
+def _start_updater(engine):
+    # Called holding _lock.
+    if _updater is None:
+        IndexUpdater(engine).start()
+
+
+def get_recommender(engine):
+    """
+    Process-wide recommender. The first call fits it; after
+    RECOMMENDER_REFRESH_SECONDS it is refit from the database on a
+    background thread while requests keep using the current one.
+    """
+    global _recommender, _built_at, _refit_changes
+    if _recommender is None:
+        with _lock:
+            if _recommender is None:
+                with engine.connect() as conn:
+                    _recommender = MaterialRecommender.fit(load_documents(conn))
+                _built_at = time.monotonic()
+                _start_updater(engine)
+    elif time.monotonic() - _built_at > RECOMMENDER_REFRESH_SECONDS and _refit_changes is None:
+        with _lock:
+            if _refit_changes is None and time.monotonic() - _built_at > RECOMMENDER_REFRESH_SECONDS:
+                _refit_changes = {}
+                threading.Thread(target=_refit, args=(engine,), name='recommendation-refit', daemon=True).start()
+    return _recommender
+
+
+class IndexUpdater:
+    """
+    Folds committed StudyMaterial changes from utils.index_updates into the
+    process-wide recommender and the overlay of the ANN index in
+    micro-batches: it waits for a change, keeps collecting for up to
+    `interval` seconds or `max_batch` changes, then publishes updated
+    copies. Only writes made in this process are queued, so every `poll`
+    seconds it also reads materials added past the highest indexed id,
+    which brings in other workers' inserts; their edits and deletes arrive
+    with the periodic refit or the next index build.
+
+    Freshness lag (queued to searchable) is tracked per batch.
+    """
+
+    def __init__(self, engine=None, interval=RECOMMENDER_UPDATE_SECONDS, max_batch=RECOMMENDER_UPDATE_BATCH,
+                 poll=RECOMMENDER_POLL_SECONDS):
+        self.engine = engine
+        self.interval = interval
+        self.max_batch = max_batch
+        self.poll_interval = poll
+        self.batches = 0
+        self.received = 0
+        self.applied = 0
+        self.polled = 0
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+        self.total_lag = 0.0
+        self._polled_at = time.monotonic()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def _collect(self):
+        try:
+            first = material_changes.get(timeout=self.interval)
+        except queue.Empty:
+            return []
+        batch = [first]
+        deadline = time.monotonic() + self.interval
+        while len(batch) < self.max_batch:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(material_changes.get(timeout=timeout))
+            except queue.Empty:
+                break
+        return batch
+
+    def fold(self, changes):
+        """
+        Publish copies of the recommender and the ANN overlay with
+        `changes` ({material_id: document or None}) folded in.
+        """
+        global _recommender, _index
+        with _lock:
+            if _recommender is not None:
+                _recommender = _recommender.apply(changes)
+            if _refit_changes is not None:
+                _refit_changes.update(changes)
+            if _index is not None:
+                _index = _index.apply(changes)
+
+    def apply(self, batch):
+        changes = {}
+        for _, material_id, document in batch:
+            changes[material_id] = document
+        self.fold(changes)
+        now = time.monotonic()
+        lags = [now - enqueued_at for enqueued_at, _, _ in batch]
+        self.batches += 1
+        self.received += len(batch)
+        self.applied += len(changes)
+        self.last_lag = max(lags)
+        self.max_lag = max(self.max_lag, self.last_lag)
+        self.total_lag += sum(lags)
+
+    def poll(self):
+        """
+        Fold in materials with ids above the highest one indexed, up to
+        `max_batch` of them. Refolding a material already held is harmless.
+        """
+        with _lock:
+            indexed = []
+            if _recommender is not None:
+                indexed.append(int(_recommender.ids.max()) if len(_recommender.ids) else 0)
+            if _index is not None:
+                indexed.append(_index.max_id)
+        if not indexed:
+            return
+        with self.engine.connect() as conn:
+            changes = {row[0]: row[1:] for row in load_documents(conn, after=min(indexed), limit=self.max_batch)}
+        if changes:
+            self.fold(changes)
+            self.polled += len(changes)
+
+    def stats(self):
+        return {
+            'batches': self.batches,
+            'received': self.received,
+            'applied': self.applied,
+            'polled': self.polled,
+            'pending': material_changes.qsize(),
+            'last_lag': self.last_lag,
+            'max_lag': self.max_lag,
+            'mean_lag': self.total_lag / self.received if self.received else 0.0,
+        }
+
+    def run(self):
+        while not self._stopped.is_set():
+            batch = self._collect()
+            if batch:
+                try:
+                    self.apply(batch)
+                except Exception:
+                    logger.exception('Recommendation index update failed for %d changes', len(batch))
+            if self.engine is not None and time.monotonic() - self._polled_at >= self.poll_interval:
+                self._polled_at = time.monotonic()
+                try:
+                    self.poll()
+                except Exception:
+                    logger.exception('Polling for new materials failed')
+
+    def start(self):
+        global _updater
+        _updater = self
+        consuming.set()
+        self._thread = threading.Thread(target=self.run, name='recommendation-index', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=None):
+        global _updater
+        consuming.clear()
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        _updater = None
+
+
+_index = None
+_index_mtime = None
+_index_checked = 0.0
+
+
+def get_ann_index(engine, path=RECOMMENDER_INDEX_PATH):
+    """
+    Memory-mapped ANN index from `path` with this process's changes since
+    it was built overlaid (see ANNOverlay), reopened when a rebuild
+    replaces it, or None if no index has been built.
+    """
+    global _index, _index_mtime, _index_checked
+    now = time.monotonic()
+    if _index_checked and now - _index_checked < RECOMMENDER_INDEX_CHECK_SECONDS:
+        return _index
+    with _lock:
+        _index_checked = now
+        try:
+            mtime = os.stat(os.path.join(path, 'meta.json')).st_mtime
+        except OSError:
+            _index = _index_mtime = None
+            return None
+        if mtime != _index_mtime:
+            index = ANNIndex.load(path)
+            _index = _index.rebase(index) if _index is not None else ANNOverlay(index)
+            _index_mtime = mtime
+            _start_updater(engine)
+    return _index
+
+
+if __name__ == '__main__':
+    from utils.database import make_engine
+
+    parser = argparse.ArgumentParser(description='Build the material recommendation ANN index.')
+    parser.add_argument('--path', default=RECOMMENDER_INDEX_PATH)
+    parser.add_argument('--terms-per-row', type=int, default=8)
+    parser.add_argument('--query-terms', type=int, default=32)
+    parser.add_argument('--budget', type=int, default=4096)
+    args = parser.parse_args()
+    snapshot_at = time.time()
+    with make_engine().connect() as conn:
+        recommender = MaterialRecommender.fit(load_documents(conn))
+    ANNIndex.build(recommender, args.terms_per_row, args.query_terms, args.budget,
+                   snapshot_at=snapshot_at).save(args.path)
+    print('indexed {} materials into {}'.format(len(recommender), args.path))
@@ -0,0 +1,97 @@
+import html
+import re
+from sqlalchemy import Float, Integer, String, column, func, literal, literal_column, select, table, union_all
+from models import db
+from utils.pagination import paginate
+
+SEARCH_TABLES = {
+    'plans': 'study_plan_fts',
+    'materials': 'study_material_fts',
+}
+# bm25 weights per FTS column: title, description, tags, comments, owner_id.
+# owner_id is only there for scoping and must not affect the score.
+BM25_WEIGHTS = (10.0, 1.0, 5.0, 2.0, 0.0)
+MAX_TERMS = 16
+MIN_PREFIX = 3
+SNIPPET_TOKENS = 12
+# FTS5 wraps matches in these control characters instead of HTML, so
+# highlight() can escape the stored text before adding <b> tags.
+MATCH_START = '\x02'
+MATCH_END = '\x03'
+# bm25() computes each term's IDF by walking its whole doclist, so a word
+# found in most rows costs tens of milliseconds at a million rows while
+# adding almost nothing to the score. Such words are dropped from queries.
+STOP_WORDS = frozenset((
+    'a an and are as at be by for from has how i in is it its of on or that the this to was were what will with'
+).split())
+
+TERM_RE = re.compile(r'\w+', re.UNICODE)
+# A highlighted run, or the plain text up to the next one. Stray markers,
+# which stored text can contain too, are dropped and every <b> is closed.
+_MATCHED = re.compile('({start})?([^{start}{end}]*)(?:{end})?'.format(start=MATCH_START, end=MATCH_END))
+
+
+def match_expression(owner_id, text):
+    """
+    FTS5 MATCH expression for free text typed by a user: every word must
+    appear in one of the text columns, the last one as a prefix so results
+    follow as-you-type input, and the row must belong to `owner_id`. Words
+    are quoted, so FTS5 operators in the input are taken literally. Stop
+    words are skipped unless nothing else is left. Returns None if the text
+    has no searchable words.
+    """
+    words = TERM_RE.findall(text.lower())
+    terms = [word for word in words if word not in STOP_WORDS][:MAX_TERMS] or words[:MAX_TERMS]
+    if not terms:
+        return None
+    phrases = ['"{}"'.format(term) for term in terms]
+    if len(terms[-1]) >= MIN_PREFIX:
+        phrases[-1] += '*'
+    return 'owner_id:{} AND {{title description tags comments}}:({})'.format(int(owner_id), ' '.join(phrases))
+
+
+def highlight(snippet):
+    """
+    HTML for a snippet from search(): the stored text escaped, and the
+    matched words in <b>. Titles, descriptions, tags and comments are user
+    input, so the snippet must never be sent unescaped.
+    """
+    if snippet is None:
+        return None
+    parts = []
+    for match in _MATCHED.finditer(snippet):
+        text = html.escape(match.group(2))
+        parts.append('<b>{}</b>'.format(text) if match.group(1) else text)
+    return ''.join(parts)
+
+
+def _ranked(kind, expression):
+    name = SEARCH_TABLES[kind]
+    fts = table(name, column('rowid', Integer), column('title', String))
+    source = literal_column(name)
+    return (
+        select(
+            literal(kind, String).label('kind'),
+            fts.c.rowid.label('id'),
+            fts.c.title.label('title'),
+            func.snippet(source, -1, MATCH_START, MATCH_END, '...', SNIPPET_TOKENS, type_=String).label('snippet'),
+            func.bm25(source, *BM25_WEIGHTS, type_=Float).label('rank'),
+        )
+        .select_from(fts)
+        .where(source.op('MATCH')(expression))
+    )
+
+
+def search(owner_id, text, kinds=tuple(SEARCH_TABLES), limit=20, after=None):
+    """
+    Owner-scoped full-text search over plans and/or materials, best bm25
+    match first, one keyset page at a time. Returns (rows, next_cursor),
+    where rows have kind, id, title, snippet and rank (lower is better).
+    Pass the snippet through highlight() before showing it as HTML.
+    """
+    expression = match_expression(owner_id, text)
+    if expression is None:
+        return [], None
+    selects = [_ranked(kind, expression) for kind in kinds]
+    ranked = (selects[0] if len(selects) == 1 else union_all(*selects)).subquery('ranked')
+    return paginate(db.session.query(ranked), [ranked.c.rank, ranked.c.kind, ranked.c.id], limit, after)
@@ -0,0 +1,98 @@
+from datetime import date
+from functools import lru_cache
+from operator import attrgetter
+from flask.json.provider import DefaultJSONProvider
+from utils.validation import MODELS
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+@lru_cache(maxsize=None)
+def row_serializer(keys):
+    """
+    Function mapping a result row with columns `keys` to a dict, generated
+    once per column set as a single dict display that indexes the row by
+    position; several times faster than dict(row._mapping).
+    """
+    body = ', '.join('{!r}: row[{}]'.format(key, index) for index, key in enumerate(keys))
+    return eval('lambda row: {' + body + '}')
+
+
+def serialize(row):
+    return row_serializer(row._fields)(row)
+
+
+def serialize_rows(rows):
+    if not rows:
+        return []
+    to_dict = row_serializer(rows[0]._fields)
+    return [to_dict(row) for row in rows]
+
+
+# Full-row serializers for every model, generated at import time.
+SERIALIZERS = {kind: row_serializer(tuple(model.__table__.c.keys())) for kind, model in MODELS.items()}
+_ATTRIBUTES = {kind: attrgetter(*model.__table__.c.keys()) for kind, model in MODELS.items()}
+
+
+def serialize_objects(kind, objects):
+    """
+    Loaded instances of MODELS[kind] as dicts, with the same keys as the
+    rows the list endpoints return.
+    """
+    values = _ATTRIBUTES[kind]
+    to_dict = SERIALIZERS[kind]
+    return [to_dict(values(obj)) for obj in objects]
+
+
+class InvalidFields(ValueError):
+    pass
+
+
+def parse_fields(args, model, always=('id',)):
+    """
+    The columns of `model` named in the `fields` query parameter (comma
+    separated), plus `always`, in table order; every column when `fields`
+    is not given. Columns a response never asked for are then neither
+    selected nor serialized.
+    """
+    table = model.__table__
+    value = args.get('fields')
+    if not value:
+        return list(table.c)
+    names = {name.strip() for name in value.split(',') if name.strip()}
+    unknown = names.difference(table.c.keys())
+    if unknown:
+        raise InvalidFields('unknown fields: {}'.format(', '.join(sorted(unknown))))
+    names.update(always)
+    return [column for column in table.c if column.key in names]
+
+
+def _default(value):
+    if isinstance(value, date):
+        return value.isoformat()
+    return DefaultJSONProvider.default(value)
+
+
+class JSONProvider(DefaultJSONProvider):
+    """
+    Encodes with orjson when it is installed and the standard library
+    otherwise. Dates are ISO 8601 either way, as in NDJSON streams and
+    exports.
+    """
+
+    default = staticmethod(_default)
+
+    def dumps(self, obj, **kwargs):
+        if orjson is None:
+            return super().dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=self.default, option=orjson.OPT_NON_STR_KEYS).decode('utf-8')
+
+    def response(self, *args, **kwargs):
+        if orjson is None or self._app.debug:
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(orjson.dumps(obj, default=self.default, option=orjson.OPT_NON_STR_KEYS),
+                                        mimetype=self.mimetype)
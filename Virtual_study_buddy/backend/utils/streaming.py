@@ -0,0 +1,66 @@
+import json
+import logging
+from datetime import date, datetime
+from flask import Response, stream_with_context
+
+logger = logging.getLogger(__name__)
+
+NDJSON = 'application/x-ndjson'
+STREAM_BATCH_ROWS = 1000
+STREAM_FLUSH_BYTES = 64 * 1024
+
+
+def wants_ndjson(request):
+    return request.accept_mimetypes.best_match(['application/json', NDJSON]) == NDJSON
+
+
+def _default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError('{!r} is not JSON serializable'.format(value))
+
+
+_encoder = json.JSONEncoder(default=_default, separators=(',', ':'))
+
+
+def ndjson_lines(rows, extra=None):
+    """
+    Encode result rows one JSON document per line, grouping lines into
+    writes of about STREAM_FLUSH_BYTES. Keys in `extra` are added to every
+    document, ahead of the row's own.
+    """
+    keys = None
+    buffer = []
+    size = 0
+    for row in rows:
+        if keys is None:
+            keys = row._fields
+        document = dict(zip(keys, row))
+        if extra:
+            document = {**extra, **document}
+        line = _encoder.encode(document) + '\n'
+        buffer.append(line)
+        size += len(line)
+        if size >= STREAM_FLUSH_BYTES:
+            yield ''.join(buffer)
+            buffer = []
+            size = 0
+    if buffer:
+        yield ''.join(buffer)
+
+
+def stream_ndjson(query, batch_rows=STREAM_BATCH_ROWS):
+    """
+    Stream every row of `query`, a Query over plain columns, as NDJSON.
+    Rows are fetched `batch_rows` at a time with yield_per and written as
+    they are encoded, so memory stays flat however large the collection is.
+    """
+    def generate():
+        try:
+            yield from ndjson_lines(query.yield_per(batch_rows))
+        except Exception:
+            # Headers are gone by now; a truncated stream is all that's left.
+            logger.exception('NDJSON stream aborted')
+            raise
+
+    return Response(stream_with_context(generate()), mimetype=NDJSON)
@@ -0,0 +1,142 @@
+import os
+from datetime import datetime, timedelta
+from sqlalchemy import and_, delete, event, or_, select
+from utils.database import busy_timeout_ms, db, insert_many
+from utils.pagination import InvalidCursor, decode_cursor, encode_cursor
+
+SYNC_DEFAULT_LIMIT = 500
+SYNC_MAX_LIMIT = 5000
+# Rows are stamped before their transaction commits, so a transaction
+# can commit a stamp older than one already synced. Changes from the last
+# SYNC_SETTLE_SECONDS are held back until such writers have committed. A
+# writer can wait up to the SQLite busy timeout for the write lock after
+# stamping, so the window is never shorter than that.
+SYNC_SETTLE_SECONDS = max(float(os.getenv('SYNC_SETTLE_SECONDS', busy_timeout_ms() / 1000.0 + 1)),
+                          busy_timeout_ms() / 1000.0)
+SYNC_TOMBSTONE_DAYS = int(os.getenv('SYNC_TOMBSTONE_DAYS', 90))
+
+# Deleted items, kept for SYNC_TOMBSTONE_DAYS so clients can drop them.
+tombstone = db.Table(
+    'tombstone',
+    db.Column('id', db.Integer, primary_key=True),
+    db.Column('owner_id', db.Integer, nullable=False),
+    db.Column('item_type', db.String(20), nullable=False),
+    db.Column('item_id', db.Integer, nullable=False),
+    db.Column('deleted_at', db.DateTime(), nullable=False),
+    db.Index('ix_tombstone_owner_id_deleted_at', 'owner_id', 'deleted_at'),
+)
+
+# item type -> model, in the order their changes are merged
+SYNCED = {}
+
+
+class CursorExpired(InvalidCursor):
+    pass
+
+
+def record_tombstones(connection, owner_id, item_type, item_ids):
+    """
+    Note the deletion of the owner's `item_ids`. Write paths that bypass
+    the ORM must call this themselves, in the deleting transaction.
+    """
+    now = datetime.utcnow()
+    insert_many(connection, tombstone, [
+        {'owner_id': owner_id, 'item_type': item_type, 'item_id': item_id, 'deleted_at': now}
+        for item_id in item_ids
+    ])
+
+
+def _tombstone_on_delete(item_type):
+    def listener(mapper, connection, target):
+        record_tombstones(connection, target.owner_id, item_type, [target.id])
+    return listener
+
+
+def track_tombstones(model, item_type):
+    """
+    Include `model` in delta sync and record a tombstone for every ORM
+    delete of it.
+    """
+    SYNCED[item_type] = model
+    event.listen(model, 'after_delete', _tombstone_on_delete(item_type))
+
+
+def parse_sync_args(args):
+    """
+    Read `limit` and `since` from the query string. Returns (limit,
+    position); position is None for a full sync.
+    """
+    try:
+        limit = int(args.get('limit', SYNC_DEFAULT_LIMIT))
+    except (TypeError, ValueError):
+        raise InvalidCursor('limit must be an integer')
+    since = args.get('since')
+    if not since:
+        return max(1, min(limit, SYNC_MAX_LIMIT)), None
+    position = decode_cursor(since, [tombstone.c.deleted_at, tombstone.c.id, tombstone.c.id])
+    if not isinstance(position[0], datetime) or not all(isinstance(value, int) for value in position[1:]):
+        raise InvalidCursor('Malformed cursor')
+    return max(1, min(limit, SYNC_MAX_LIMIT)), tuple(position)
+
+
+def _after(stamp, ids, stream, position):
+    since, at_stream, last_id = position
+    if stream < at_stream:
+        return stamp > since
+    if stream > at_stream:
+        return stamp >= since
+    return and_(stamp >= since, or_(stamp > since, ids > last_id))
+
+
+def changes_since(session, owner_id, position=None, limit=SYNC_DEFAULT_LIMIT, clock=datetime.utcnow):
+    """
+    The owner's inserts, updates and deletes after `position`, oldest
+    first, as (item_type, item_id, row) with row None for deletes. Returns
+    (changes, next_cursor, has_more).
+
+    Changes are ordered by (stamp, stream, id), where each item type is a
+    stream and tombstones are the last, and the cursor is the position of
+    the last change returned, so pages never overlap or skip. Each stream
+    is one range scan over its (owner_id, updated_at) index, limit + 1
+    rows at most. A full sync (no position) returns current rows only.
+    """
+    now = clock()
+    if position is not None and position[0] < now - timedelta(days=SYNC_TOMBSTONE_DAYS):
+        raise CursorExpired('Cursor has expired; sync again without since')
+    upper = now - timedelta(seconds=SYNC_SETTLE_SECONDS)
+    streams = list(SYNCED)
+    found = []
+    for stream, item_type in enumerate(streams):
+        table = SYNCED[item_type].__table__
+        query = select(*table.c).where(table.c.owner_id == owner_id, table.c.updated_at <= upper)
+        if position is not None:
+            query = query.where(_after(table.c.updated_at, table.c.id, stream, position))
+        rows = session.execute(query.order_by(table.c.updated_at, table.c.id).limit(limit + 1)).all()
+        found.extend(((row.updated_at, stream, row.id), (item_type, row.id, row)) for row in rows)
+    if position is not None:
+        stream = len(streams)
+        rows = session.execute(
+            select(tombstone.c.id, tombstone.c.item_type, tombstone.c.item_id, tombstone.c.deleted_at)
+            .where(tombstone.c.owner_id == owner_id, tombstone.c.deleted_at <= upper,
+                   _after(tombstone.c.deleted_at, tombstone.c.id, stream, position))
+            .order_by(tombstone.c.deleted_at, tombstone.c.id)
+            .limit(limit + 1)
+        ).all()
+        found.extend(((row.deleted_at, stream, row.id), (row.item_type, row.item_id, None)) for row in rows)
+    found.sort(key=lambda change: change[0])
+    has_more = len(found) > limit
+    found = found[:limit]
+    if has_more:
+        next_position = found[-1][0]
+    else:
+        # Everything up to `upper` has been seen, in every stream.
+        next_position = max(position or (upper, 0, 0), (upper, len(streams) + 1, 0))
+    return [change for _, change in found], encode_cursor(next_position), has_more
+
+
+def purge_tombstones(engine, days=SYNC_TOMBSTONE_DAYS):
+    """
+    Delete tombstones older than `days`; cursors that old are refused.
+    """
+    with engine.begin() as conn:
+        return conn.execute(delete(tombstone).where(tombstone.c.deleted_at < datetime.utcnow() - timedelta(days=days))).rowcount
@@ -0,0 +1,228 @@
+import re
+from sqlalchemy import DDL, delete, event, exists, false, func, insert, inspect, select
+from utils.database import db, insert_many
+
+TAG_SEPARATORS = re.compile(r'[,;#]')
+MAX_TAG_LENGTH = 50
+MAX_FILTER_TAGS = 10
+TAG_MODES = ('all', 'any')
+
+tag = db.Table(
+    'tag',
+    db.Column('id', db.Integer, primary_key=True),
+    db.Column('name', db.String(MAX_TAG_LENGTH), nullable=False, unique=True),
+)
+
+# Per-user, per-type tag usage, maintained by triggers on the association
+# tables so tag clouds never count rows.
+user_tag_count = db.Table(
+    'user_tag_count',
+    db.Column('owner_id', db.Integer, primary_key=True),
+    db.Column('item_type', db.String(20), primary_key=True),
+    db.Column('tag_id', db.Integer, primary_key=True),
+    db.Column('count', db.Integer, nullable=False),
+)
+
+# item type ('plans', 'materials', ...) -> (model, association table)
+TAGGED = {}
+
+
+class InvalidTagFilter(ValueError):
+    pass
+
+
+def parse_tags(value):
+    """
+    Split a free-form tags string ("Calculus, linear  algebra;#exam") into
+    distinct normalised names, in order of first appearance.
+    """
+    names = []
+    for part in TAG_SEPARATORS.split(value or ''):
+        name = ' '.join(part.lower().split())[:MAX_TAG_LENGTH]
+        if name and name not in names:
+            names.append(name)
+    return names
+
+
+def parse_tag_args(args):
+    """
+    Read `tags` (comma separated) and `tag_mode` (all|any) from the query
+    string. Returns (names, mode); names is empty when no filter was given.
+    """
+    names = parse_tags(args.get('tags'))
+    mode = args.get('tag_mode', 'all')
+    if mode not in TAG_MODES:
+        raise InvalidTagFilter('tag_mode must be one of: {}'.format(', '.join(TAG_MODES)))
+    if len(names) > MAX_FILTER_TAGS:
+        raise InvalidTagFilter('At most {} tags can be filtered on'.format(MAX_FILTER_TAGS))
+    return names, mode
+
+
+def _tag_ids(connection, names):
+    ids = dict(connection.execute(select(tag.c.name, tag.c.id).where(tag.c.name.in_(names))).all())
+    missing = [name for name in names if name not in ids]
+    if missing:
+        connection.execute(insert(tag).prefix_with('OR IGNORE', dialect='sqlite'), [{'name': name} for name in missing])
+        ids.update(connection.execute(select(tag.c.name, tag.c.id).where(tag.c.name.in_(missing))).all())
+    return ids
+
+
+def sync_tags(connection, item_type, rows):
+    """
+    Replace the association rows of the given items with the tags parsed
+    from their `tags` strings. `rows` are (item_id, owner_id, tags) tuples.
+    Write paths that bypass the ORM must call this themselves.
+    """
+    association = TAGGED[item_type][1]
+    rows = list(rows)
+    if not rows:
+        return
+    connection.execute(delete(association).where(association.c.item_id.in_([row[0] for row in rows])))
+    add_tags(connection, item_type, [(item_id, owner_id, parse_tags(tags)) for item_id, owner_id, tags in rows])
+
+
+def add_tags(connection, item_type, rows):
+    """
+    Tag newly inserted items. `rows` are (item_id, owner_id, names) with
+    names already normalised by parse_tags.
+    """
+    association = TAGGED[item_type][1]
+    names = sorted({name for _, _, item_names in rows for name in item_names})
+    if not names:
+        return
+    ids = _tag_ids(connection, names)
+    insert_many(connection, association, [
+        {'owner_id': owner_id, 'tag_id': ids[name], 'item_id': item_id}
+        for item_id, owner_id, item_names in rows for name in item_names
+    ])
+
+
+def tag_filter(item_type, owner_id, names, mode='all'):
+    """
+    `<model>.id IN (...)` clause matching the owner's items tagged with all
+    (or any) of `names`, answered from the association table's
+    (owner_id, tag_id, item_id) primary key. For `all`, the owner's rarest
+    requested tag (from user_tag_count) drives the lookup and the others are
+    primary-key probes.
+    """
+    model, association = TAGGED[item_type]
+    counts = db.session.execute(
+        select(tag.c.id, user_tag_count.c.count)
+        .join(user_tag_count, user_tag_count.c.tag_id == tag.c.id)
+        .where(tag.c.name.in_(names), user_tag_count.c.owner_id == owner_id,
+               user_tag_count.c.item_type == item_type)
+        .order_by(user_tag_count.c.count)
+    ).all()
+    if not counts or (mode == 'all' and len(counts) < len(names)):
+        return false()
+    tag_ids = [tag_id for tag_id, _ in counts]
+    if mode == 'any':
+        return model.id.in_(
+            select(association.c.item_id)
+            .where(association.c.owner_id == owner_id, association.c.tag_id.in_(tag_ids))
+        )
+    items = select(association.c.item_id).where(association.c.owner_id == owner_id,
+                                                association.c.tag_id == tag_ids[0])
+    for tag_id in tag_ids[1:]:
+        other = association.alias()
+        items = items.where(exists().where(other.c.owner_id == owner_id, other.c.tag_id == tag_id,
+                                           other.c.item_id == association.c.item_id))
+    return model.id.in_(items)
+
+
+def tag_counts(owner_id, item_type=None):
+    """
+    The owner's tags with how many items carry each, most used first.
+    """
+    total = func.sum(user_tag_count.c.count).label('count')
+    query = (
+        select(tag.c.name, total)
+        .join(tag, tag.c.id == user_tag_count.c.tag_id)
+        .where(user_tag_count.c.owner_id == owner_id)
+        .group_by(tag.c.name)
+        .having(total > 0)
+        .order_by(total.desc(), tag.c.name)
+    )
+    if item_type:
+        query = query.where(user_tag_count.c.item_type == item_type)
+    return db.session.execute(query).all()
+
+
+def _count_triggers(table_name, item_type):
+    return [
+        '''CREATE TRIGGER IF NOT EXISTS {table}_count_ai AFTER INSERT ON {table} BEGIN
+            INSERT INTO user_tag_count (owner_id, item_type, tag_id, count) VALUES (NEW.owner_id, '{kind}', NEW.tag_id, 1)
+            ON CONFLICT (owner_id, item_type, tag_id) DO UPDATE SET count = count + 1;
+        END'''.format(table=table_name, kind=item_type),
+        '''CREATE TRIGGER IF NOT EXISTS {table}_count_ad AFTER DELETE ON {table} BEGIN
+            UPDATE user_tag_count SET count = count - 1
+            WHERE owner_id = OLD.owner_id AND item_type = '{kind}' AND tag_id = OLD.tag_id;
+            DELETE FROM user_tag_count
+            WHERE owner_id = OLD.owner_id AND item_type = '{kind}' AND tag_id = OLD.tag_id AND count <= 0;
+        END'''.format(table=table_name, kind=item_type),
+    ]
+
+
+def _sync_on_write(item_type):
+    def listener(mapper, connection, target):
+        state = inspect(target)
+        if state.attrs.tags.history.has_changes() or state.attrs.owner_id.history.has_changes():
+            sync_tags(connection, item_type, [(target.id, target.owner_id, target.tags)])
+    return listener
+
+
+def _sync_on_delete(item_type):
+    def listener(mapper, connection, target):
+        association = TAGGED[item_type][1]
+        connection.execute(delete(association).where(association.c.item_id == target.id))
+    return listener
+
+
+def tag_association(model, item_type):
+    """
+    Create the `<table>_tag` association table for `model` and keep it in
+    step with the model's `tags` string on ORM inserts, updates and deletes.
+    """
+    table_name = '{}_tag'.format(model.__tablename__)
+    association = db.Table(
+        table_name,
+        db.Column('owner_id', db.Integer, primary_key=True),
+        db.Column('tag_id', db.Integer, db.ForeignKey('tag.id'), primary_key=True),
+        db.Column('item_id', db.Integer, db.ForeignKey(model.__table__.c.id), primary_key=True),
+        db.Index('ix_{}_item_id'.format(table_name), 'item_id'),
+        sqlite_with_rowid=False,
+    )
+    for trigger in _count_triggers(table_name, item_type):
+        event.listen(association, 'after_create', DDL(trigger).execute_if(dialect='sqlite'))
+    TAGGED[item_type] = (model, association)
+    event.listen(model, 'after_insert', _sync_on_write(item_type))
+    event.listen(model, 'after_update', _sync_on_write(item_type))
+    event.listen(model, 'after_delete', _sync_on_delete(item_type))
+    return association
+
+
+def backfill(engine, chunk_size=5000, item_types=None, echo=print):
+    """
+    Parse existing `tags` strings into the association tables, one
+    committed chunk of ids at a time. Safe to re-run or resume.
+    """
+    for item_type in item_types or TAGGED:
+        model = TAGGED[item_type][0]
+        table = model.__table__
+        last_id = 0
+        done = 0
+        while True:
+            with engine.begin() as conn:
+                rows = conn.execute(
+                    select(table.c.id, table.c.owner_id, table.c.tags)
+                    .where(table.c.id > last_id)
+                    .order_by(table.c.id)
+                    .limit(chunk_size)
+                ).all()
+                if not rows:
+                    break
+                sync_tags(conn, item_type, rows)
+            last_id = rows[-1][0]
+            done += len(rows)
+        echo('{}: {} rows backfilled'.format(item_type, done))
+
@@ -0,0 +1,154 @@
+from datetime import datetime, timezone
+from models import StudyPlan, StudyMaterial, StudySession, Reminder
+
+# Item types accepted by the write paths that bypass the ORM (bulk import,
+# batch endpoints), in the order they can depend on one another.
+MODELS = {
+    'plans': StudyPlan,
+    'materials': StudyMaterial,
+    'sessions': StudySession,
+    'reminders': Reminder,
+}
+# Set by the server, never by clients.
+SERVER_COLUMNS = ('id', 'owner_id', 'created_at', 'updated_at')
+# CSV cells are always text.
+BOOLEAN_STRINGS = {'true': True, '1': True, 'false': False, '0': False}
+
+
+def _coerce_str(length):
+    def coerce(value):
+        # Numbers read naturally as text; lists, objects and booleans do not.
+        if isinstance(value, bool) or not isinstance(value, (str, int, float)):
+            raise ValueError('not a string')
+        value = value if isinstance(value, str) else str(value)
+        if length and len(value) > length:
+            raise ValueError('longer than {} characters'.format(length))
+        return value
+    return coerce
+
+
+def _coerce_int(value):
+    if isinstance(value, bool) or not isinstance(value, (int, str)):
+        raise ValueError('not an integer')
+    return int(value)
+
+
+def _coerce_bool(value):
+    if isinstance(value, str) and value.lower() in BOOLEAN_STRINGS:
+        return BOOLEAN_STRINGS[value.lower()]
+    if not isinstance(value, bool):
+        raise ValueError('not a boolean')
+    return value
+
+
+def _coerce_datetime(value):
+    # Columns hold naive UTC, so an offset is applied, not dropped.
+    if not isinstance(value, str):
+        raise ValueError('not an ISO 8601 date')
+    value = datetime.fromisoformat(value)
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def _fields(table):
+    """
+    (name, coerce, required, nullable, default) for every writable column,
+    derived from the table definition once.
+    """
+    fields = []
+    for column in table.c:
+        if column.key in SERVER_COLUMNS:
+            continue
+        python_type = column.type.python_type
+        if python_type is str:
+            coerce = _coerce_str(column.type.length)
+        elif python_type is int:
+            coerce = _coerce_int
+        elif python_type is bool:
+            coerce = _coerce_bool
+        else:
+            coerce = _coerce_datetime
+        default = column.default.arg if column.default is not None and column.default.is_scalar else None
+        required = not column.nullable and column.default is None
+        fields.append((column.key, coerce, required, column.nullable, default))
+    return fields
+
+
+FIELDS = {kind: _fields(model.__table__) for kind, model in MODELS.items()}
+COERCERS = {kind: {field[0]: field[1] for field in fields} for kind, fields in FIELDS.items()}
+REQUIRED = {kind: [field[0] for field in fields if field[2]] for kind, fields in FIELDS.items()}
+NULLABLE = {kind: frozenset(field[0] for field in fields if field[3]) for kind, fields in FIELDS.items()}
+DEFAULTS = {kind: {field[0]: field[4] for field in fields} for kind, fields in FIELDS.items()}
+
+
+def _unknown(names):
+    return 'unknown fields: {}'.format(', '.join(sorted(names)))
+
+
+def validate(kind, record, ignore=frozenset(), optional=()):
+    """
+    Column values for a new row of `kind`, defaults filled in, or raise
+    ValueError listing every problem. Keys in `ignore` are skipped, and
+    required columns in `optional` may be left out for the caller to fill.
+    """
+    if not isinstance(record, dict):
+        raise ValueError('expected a JSON object')
+    coercers = COERCERS[kind]
+    values = DEFAULTS[kind].copy()
+    errors = []
+    unknown = []
+    for name, value in record.items():
+        coerce = coercers.get(name)
+        if coerce is None:
+            if name not in ignore:
+                unknown.append(name)
+        elif value is not None:
+            try:
+                values[name] = coerce(value)
+            except ValueError as e:
+                errors.append('{}: {}'.format(name, e))
+    missing = ['{} is required'.format(name) for name in REQUIRED[kind]
+               if record.get(name) is None and name not in optional]
+    errors = missing + errors
+    if unknown:
+        errors.append(_unknown(unknown))
+    if errors:
+        raise ValueError('; '.join(errors))
+    return values
+
+
+def validate_changes(kind, record):
+    """
+    Column values for a partial update of `kind`: only the keys given, with
+    null allowed where the column is nullable. Raises ValueError listing
+    every problem.
+    """
+    if not isinstance(record, dict):
+        raise ValueError('expected a JSON object')
+    if not record:
+        raise ValueError('no fields to update')
+    coercers = COERCERS[kind]
+    nullable = NULLABLE[kind]
+    values = {}
+    errors = []
+    unknown = []
+    for name, value in record.items():
+        coerce = coercers.get(name)
+        if coerce is None:
+            unknown.append(name)
+        elif value is None:
+            if name in nullable:
+                values[name] = None
+            else:
+                errors.append('{} cannot be null'.format(name))
+        else:
+            try:
+                values[name] = coerce(value)
+            except ValueError as e:
+                errors.append('{}: {}'.format(name, e))
+    if unknown:
+        errors.append(_unknown(unknown))
+    if errors:
+        raise ValueError('; '.join(errors))
+    return values
@@ -0,0 +1,92 @@
+from sqlalchemy import delete, insert, select, update
+from models import StudyPlan
+from utils.index_updates import INDEXED_FIELDS, defer_material_changes
+from utils.sync import record_tombstones
+from utils.tags import TAGGED, add_tags, parse_tags, sync_tags
+from utils.validation import MODELS, validate, validate_changes
+from utils.versions import bump_versions
+
+
+def _check_plan(conn, owner_id, plan_id):
+    plan = conn.execute(select(StudyPlan.id).where(StudyPlan.id == plan_id, StudyPlan.owner_id == owner_id)).first()
+    if plan is None:
+        raise ValueError('study plan {} not found'.format(plan_id))
+
+
+def create_item(session, kind, owner_id, data):
+    """
+    Insert a new item of `kind` for the owner with a single INSERT ...
+    RETURNING and return it as a row. Raises ValueError if `data` is
+    invalid. The caller commits.
+    """
+    table = MODELS[kind].__table__
+    owner_id = int(owner_id)
+    values = validate(kind, data)
+    values['owner_id'] = owner_id
+    conn = session.connection()
+    if kind == 'sessions':
+        _check_plan(conn, owner_id, values['study_plan_id'])
+    statement = insert(table).values(values)
+    if conn.dialect.insert_returning:
+        row = conn.execute(statement.returning(*table.c)).one()
+    else:
+        item_id = conn.execute(statement).inserted_primary_key[0]
+        row = conn.execute(select(table).where(table.c.id == item_id)).one()
+    add_tags(conn, kind, [(row.id, owner_id, parse_tags(row.tags))])
+    bump_versions(conn, owner_id, (kind,))
+    if kind == 'materials':
+        defer_material_changes(session, {row.id: tuple(getattr(row, field) for field in INDEXED_FIELDS)})
+    return row
+
+
+def update_item(session, kind, owner_id, item_id, data):
+    """
+    Apply a partial update to one of the owner's items of `kind` and return
+    the updated row, or None if the owner has no such item. Raises
+    ValueError if `data` is invalid. The caller commits.
+
+    The item is neither loaded nor hydrated: the owner check, the write and
+    the read-back are a single UPDATE ... WHERE id AND owner_id RETURNING.
+    """
+    model = MODELS[kind]
+    table = model.__table__
+    owner_id = int(owner_id)
+    values = validate_changes(kind, data)
+    conn = session.connection()
+    if kind == 'sessions' and 'study_plan_id' in values:
+        _check_plan(conn, owner_id, values['study_plan_id'])
+    statement = update(table).where(table.c.id == item_id, table.c.owner_id == owner_id).values(values)
+    if conn.dialect.update_returning:
+        row = conn.execute(statement.returning(*table.c)).first()
+    elif conn.execute(statement).rowcount:
+        row = conn.execute(select(table).where(table.c.id == item_id)).first()
+    else:
+        row = None
+    if row is None:
+        return None
+    bump_versions(conn, owner_id, (kind,))
+    if 'tags' in values:
+        sync_tags(conn, kind, [(row.id, owner_id, row.tags)])
+    if kind == 'materials' and any(field in values for field in INDEXED_FIELDS):
+        defer_material_changes(session, {row.id: tuple(getattr(row, field) for field in INDEXED_FIELDS)})
+    return row
+
+
+def delete_item(session, kind, owner_id, item_id):
+    """
+    Delete one of the owner's items of `kind` with its tags, returning
+    False if the owner has no such item. The caller commits.
+    """
+    table = MODELS[kind].__table__
+    association = TAGGED[kind][1]
+    owner_id = int(owner_id)
+    conn = session.connection()
+    # Owner-scoped, so this is a no-op for someone else's item.
+    conn.execute(delete(association).where(association.c.item_id == item_id, association.c.owner_id == owner_id))
+    deleted = conn.execute(delete(table).where(table.c.id == item_id, table.c.owner_id == owner_id)).rowcount
+    if deleted:
+        record_tombstones(conn, owner_id, kind, [item_id])
+        bump_versions(conn, owner_id, (kind,))
+    if deleted and kind == 'materials':
+        defer_material_changes(session, {item_id: None})
+    return bool(deleted)
@@ -0,0 +1,14 @@
+CREATE INDEX IF NOT EXISTS ix_study_plan_owner_id ON study_plan (owner_id);
+CREATE INDEX IF NOT EXISTS ix_study_plan_owner_id_due_date ON study_plan (owner_id, due_date);
+
+CREATE INDEX IF NOT EXISTS ix_study_material_owner_id ON study_material (owner_id);
+CREATE INDEX IF NOT EXISTS ix_study_material_owner_id_due_date ON study_material (owner_id, due_date);
+
+CREATE INDEX IF NOT EXISTS ix_study_session_owner_id ON study_session (owner_id);
+CREATE INDEX IF NOT EXISTS ix_study_session_owner_id_due_date ON study_session (owner_id, due_date);
+CREATE INDEX IF NOT EXISTS ix_study_session_study_plan_id ON study_session (study_plan_id);
+
+CREATE INDEX IF NOT EXISTS ix_reminder_owner_id_reminder_time ON reminder (owner_id, reminder_time);
+CREATE INDEX IF NOT EXISTS ix_reminder_reminder_time ON reminder (reminder_time);
+
+ANALYZE;
\ No newline at end of file
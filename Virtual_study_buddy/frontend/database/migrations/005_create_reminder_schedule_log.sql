@@ -0,0 +1,17 @@
+CREATE TABLE IF NOT EXISTS reminder_schedule_log (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    reminder_id INTEGER NOT NULL,
+    reminder_time TIMESTAMP
+);
+
+CREATE TRIGGER IF NOT EXISTS reminder_schedule_ai AFTER INSERT ON reminder BEGIN
+    INSERT INTO reminder_schedule_log (reminder_id, reminder_time) VALUES (NEW.id, NEW.reminder_time);
+END;
+
+CREATE TRIGGER IF NOT EXISTS reminder_schedule_au AFTER UPDATE OF reminder_time ON reminder BEGIN
+    INSERT INTO reminder_schedule_log (reminder_id, reminder_time) VALUES (NEW.id, NEW.reminder_time);
+END;
+
+CREATE TRIGGER IF NOT EXISTS reminder_schedule_ad AFTER DELETE ON reminder BEGIN
+    INSERT INTO reminder_schedule_log (reminder_id, reminder_time) VALUES (OLD.id, NULL);
+END;
\ No newline at end of file
@@ -0,0 +1,39 @@
+CREATE VIRTUAL TABLE IF NOT EXISTS study_plan_fts USING fts5(
+    title, description, tags, comments, owner_id, content='study_plan', content_rowid='id',
+    tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+);
+
+CREATE TRIGGER IF NOT EXISTS study_plan_fts_ai AFTER INSERT ON study_plan BEGIN
+    INSERT INTO study_plan_fts (rowid, title, description, tags, comments, owner_id) VALUES (NEW.id, NEW.title, NEW.description, NEW.tags, NEW.comments, NEW.owner_id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS study_plan_fts_ad AFTER DELETE ON study_plan BEGIN
+    INSERT INTO study_plan_fts (study_plan_fts, rowid, title, description, tags, comments, owner_id) VALUES ('delete', OLD.id, OLD.title, OLD.description, OLD.tags, OLD.comments, OLD.owner_id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS study_plan_fts_au AFTER UPDATE OF title, description, tags, comments, owner_id ON study_plan BEGIN
+    INSERT INTO study_plan_fts (study_plan_fts, rowid, title, description, tags, comments, owner_id) VALUES ('delete', OLD.id, OLD.title, OLD.description, OLD.tags, OLD.comments, OLD.owner_id);
+    INSERT INTO study_plan_fts (rowid, title, description, tags, comments, owner_id) VALUES (NEW.id, NEW.title, NEW.description, NEW.tags, NEW.comments, NEW.owner_id);
+END;
+
+INSERT INTO study_plan_fts (study_plan_fts) VALUES ('rebuild');
+
+CREATE VIRTUAL TABLE IF NOT EXISTS study_material_fts USING fts5(
+    title, description, tags, comments, owner_id, content='study_material', content_rowid='id',
+    tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+);
+
+CREATE TRIGGER IF NOT EXISTS study_material_fts_ai AFTER INSERT ON study_material BEGIN
+    INSERT INTO study_material_fts (rowid, title, description, tags, comments, owner_id) VALUES (NEW.id, NEW.title, NEW.description, NEW.tags, NEW.comments, NEW.owner_id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS study_material_fts_ad AFTER DELETE ON study_material BEGIN
+    INSERT INTO study_material_fts (study_material_fts, rowid, title, description, tags, comments, owner_id) VALUES ('delete', OLD.id, OLD.title, OLD.description, OLD.tags, OLD.comments, OLD.owner_id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS study_material_fts_au AFTER UPDATE OF title, description, tags, comments, owner_id ON study_material BEGIN
+    INSERT INTO study_material_fts (study_material_fts, rowid, title, description, tags, comments, owner_id) VALUES ('delete', OLD.id, OLD.title, OLD.description, OLD.tags, OLD.comments, OLD.owner_id);
+    INSERT INTO study_material_fts (rowid, title, description, tags, comments, owner_id) VALUES (NEW.id, NEW.title, NEW.description, NEW.tags, NEW.comments, NEW.owner_id);
+END;
+
+INSERT INTO study_material_fts (study_material_fts) VALUES ('rebuild');
\ No newline at end of file
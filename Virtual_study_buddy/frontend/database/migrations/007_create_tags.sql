@@ -0,0 +1,109 @@
+-- Existing tags strings are parsed into these tables afterwards, in chunks,
+-- by `flask backfill-tags` (backend/app.py).
+
+CREATE TABLE IF NOT EXISTS tag (
+    id INTEGER NOT NULL,
+    name VARCHAR(50) NOT NULL,
+    PRIMARY KEY (id),
+    UNIQUE (name)
+);
+
+CREATE TABLE IF NOT EXISTS user_tag_count (
+    owner_id INTEGER NOT NULL,
+    item_type VARCHAR(20) NOT NULL,
+    tag_id INTEGER NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (owner_id, item_type, tag_id)
+);
+
+CREATE TABLE IF NOT EXISTS study_plan_tag (
+    owner_id INTEGER NOT NULL,
+    tag_id INTEGER NOT NULL,
+    item_id INTEGER NOT NULL,
+    PRIMARY KEY (owner_id, tag_id, item_id),
+    FOREIGN KEY(tag_id) REFERENCES tag (id),
+    FOREIGN KEY(item_id) REFERENCES study_plan (id)
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS ix_study_plan_tag_item_id ON study_plan_tag (item_id);
+
+CREATE TRIGGER IF NOT EXISTS study_plan_tag_count_ai AFTER INSERT ON study_plan_tag BEGIN
+    INSERT INTO user_tag_count (owner_id, item_type, tag_id, count) VALUES (NEW.owner_id, 'plans', NEW.tag_id, 1)
+    ON CONFLICT (owner_id, item_type, tag_id) DO UPDATE SET count = count + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS study_plan_tag_count_ad AFTER DELETE ON study_plan_tag BEGIN
+    UPDATE user_tag_count SET count = count - 1
+    WHERE owner_id = OLD.owner_id AND item_type = 'plans' AND tag_id = OLD.tag_id;
+    DELETE FROM user_tag_count
+    WHERE owner_id = OLD.owner_id AND item_type = 'plans' AND tag_id = OLD.tag_id AND count <= 0;
+END;
+
+CREATE TABLE IF NOT EXISTS study_material_tag (
+    owner_id INTEGER NOT NULL,
+    tag_id INTEGER NOT NULL,
+    item_id INTEGER NOT NULL,
+    PRIMARY KEY (owner_id, tag_id, item_id),
+    FOREIGN KEY(tag_id) REFERENCES tag (id),
+    FOREIGN KEY(item_id) REFERENCES study_material (id)
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS ix_study_material_tag_item_id ON study_material_tag (item_id);
+
+CREATE TRIGGER IF NOT EXISTS study_material_tag_count_ai AFTER INSERT ON study_material_tag BEGIN
+    INSERT INTO user_tag_count (owner_id, item_type, tag_id, count) VALUES (NEW.owner_id, 'materials', NEW.tag_id, 1)
+    ON CONFLICT (owner_id, item_type, tag_id) DO UPDATE SET count = count + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS study_material_tag_count_ad AFTER DELETE ON study_material_tag BEGIN
+    UPDATE user_tag_count SET count = count - 1
+    WHERE owner_id = OLD.owner_id AND item_type = 'materials' AND tag_id = OLD.tag_id;
+    DELETE FROM user_tag_count
+    WHERE owner_id = OLD.owner_id AND item_type = 'materials' AND tag_id = OLD.tag_id AND count <= 0;
+END;
+
+CREATE TABLE IF NOT EXISTS study_session_tag (
+    owner_id INTEGER NOT NULL,
+    tag_id INTEGER NOT NULL,
+    item_id INTEGER NOT NULL,
+    PRIMARY KEY (owner_id, tag_id, item_id),
+    FOREIGN KEY(tag_id) REFERENCES tag (id),
+    FOREIGN KEY(item_id) REFERENCES study_session (id)
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS ix_study_session_tag_item_id ON study_session_tag (item_id);
+
+CREATE TRIGGER IF NOT EXISTS study_session_tag_count_ai AFTER INSERT ON study_session_tag BEGIN
+    INSERT INTO user_tag_count (owner_id, item_type, tag_id, count) VALUES (NEW.owner_id, 'sessions', NEW.tag_id, 1)
+    ON CONFLICT (owner_id, item_type, tag_id) DO UPDATE SET count = count + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS study_session_tag_count_ad AFTER DELETE ON study_session_tag BEGIN
+    UPDATE user_tag_count SET count = count - 1
+    WHERE owner_id = OLD.owner_id AND item_type = 'sessions' AND tag_id = OLD.tag_id;
+    DELETE FROM user_tag_count
+    WHERE owner_id = OLD.owner_id AND item_type = 'sessions' AND tag_id = OLD.tag_id AND count <= 0;
+END;
+
+CREATE TABLE IF NOT EXISTS reminder_tag (
+    owner_id INTEGER NOT NULL,
+    tag_id INTEGER NOT NULL,
+    item_id INTEGER NOT NULL,
+    PRIMARY KEY (owner_id, tag_id, item_id),
+    FOREIGN KEY(tag_id) REFERENCES tag (id),
+    FOREIGN KEY(item_id) REFERENCES reminder (id)
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS ix_reminder_tag_item_id ON reminder_tag (item_id);
+
+CREATE TRIGGER IF NOT EXISTS reminder_tag_count_ai AFTER INSERT ON reminder_tag BEGIN
+    INSERT INTO user_tag_count (owner_id, item_type, tag_id, count) VALUES (NEW.owner_id, 'reminders', NEW.tag_id, 1)
+    ON CONFLICT (owner_id, item_type, tag_id) DO UPDATE SET count = count + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS reminder_tag_count_ad AFTER DELETE ON reminder_tag BEGIN
+    UPDATE user_tag_count SET count = count - 1
+    WHERE owner_id = OLD.owner_id AND item_type = 'reminders' AND tag_id = OLD.tag_id;
+    DELETE FROM user_tag_count
+    WHERE owner_id = OLD.owner_id AND item_type = 'reminders' AND tag_id = OLD.tag_id AND count <= 0;
+END;
\ No newline at end of file
@@ -0,0 +1,22 @@
+-- Account export jobs, claimed and run by the export worker
+-- (backend/utils/export.py). Finished archives are written to EXPORT_DIR.
+
+CREATE TABLE IF NOT EXISTS export_job (
+    id VARCHAR(32) NOT NULL,
+    owner_id INTEGER NOT NULL,
+    status VARCHAR(10) NOT NULL,
+    compression VARCHAR(10) NOT NULL,
+    rows_done INTEGER NOT NULL,
+    rows_total INTEGER,
+    path VARCHAR(255),
+    size INTEGER,
+    error TEXT,
+    created_at DATETIME NOT NULL,
+    updated_at DATETIME NOT NULL,
+    finished_at DATETIME,
+    PRIMARY KEY (id),
+    FOREIGN KEY(owner_id) REFERENCES user (id)
+);
+
+CREATE INDEX IF NOT EXISTS ix_export_job_owner_id ON export_job (owner_id);
+CREATE INDEX IF NOT EXISTS ix_export_job_status_created_at ON export_job (status, created_at);
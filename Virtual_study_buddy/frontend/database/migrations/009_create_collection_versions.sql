@@ -0,0 +1,9 @@
+-- Per-user, per-collection change counters behind the ETags on list and
+-- item GETs (backend/utils/versions.py). Rows are created on first write.
+
+CREATE TABLE IF NOT EXISTS collection_version (
+    owner_id INTEGER NOT NULL,
+    item_type VARCHAR(20) NOT NULL,
+    version INTEGER NOT NULL,
+    PRIMARY KEY (owner_id, item_type)
+);
@@ -0,0 +1,34 @@
+-- Delta sync (GET /study_plan/sync, backend/utils/sync.py): change stamps
+-- on every study item, and tombstones for deleted ones. Existing rows are
+-- stamped with the migration time.
+
+ALTER TABLE study_plan ADD COLUMN created_at DATETIME NOT NULL DEFAULT '1970-01-01 00:00:00.000000';
+ALTER TABLE study_plan ADD COLUMN updated_at DATETIME NOT NULL DEFAULT '1970-01-01 00:00:00.000000';
+ALTER TABLE study_material ADD COLUMN created_at DATETIME NOT NULL DEFAULT '1970-01-01 00:00:00.000000';
+ALTER TABLE study_material ADD COLUMN updated_at DATETIME NOT NULL DEFAULT '1970-01-01 00:00:00.000000';
+ALTER TABLE study_session ADD COLUMN created_at DATETIME NOT NULL DEFAULT '1970-01-01 00:00:00.000000';
+ALTER TABLE study_session ADD COLUMN updated_at DATETIME NOT NULL DEFAULT '1970-01-01 00:00:00.000000';
+ALTER TABLE reminder ADD COLUMN created_at DATETIME NOT NULL DEFAULT '1970-01-01 00:00:00.000000';
+ALTER TABLE reminder ADD COLUMN updated_at DATETIME NOT NULL DEFAULT '1970-01-01 00:00:00.000000';
+
+-- Same text format as SQLAlchemy writes: microseconds, space separator.
+UPDATE study_plan SET created_at = strftime('%Y-%m-%d %H:%M:%f000', 'now'), updated_at = strftime('%Y-%m-%d %H:%M:%f000', 'now');
+UPDATE study_material SET created_at = strftime('%Y-%m-%d %H:%M:%f000', 'now'), updated_at = strftime('%Y-%m-%d %H:%M:%f000', 'now');
+UPDATE study_session SET created_at = strftime('%Y-%m-%d %H:%M:%f000', 'now'), updated_at = strftime('%Y-%m-%d %H:%M:%f000', 'now');
+UPDATE reminder SET created_at = strftime('%Y-%m-%d %H:%M:%f000', 'now'), updated_at = strftime('%Y-%m-%d %H:%M:%f000', 'now');
+
+CREATE INDEX IF NOT EXISTS ix_study_plan_owner_id_updated_at ON study_plan (owner_id, updated_at);
+CREATE INDEX IF NOT EXISTS ix_study_material_owner_id_updated_at ON study_material (owner_id, updated_at);
+CREATE INDEX IF NOT EXISTS ix_study_session_owner_id_updated_at ON study_session (owner_id, updated_at);
+CREATE INDEX IF NOT EXISTS ix_reminder_owner_id_updated_at ON reminder (owner_id, updated_at);
+
+CREATE TABLE IF NOT EXISTS tombstone (
+    id INTEGER NOT NULL,
+    owner_id INTEGER NOT NULL,
+    item_type VARCHAR(20) NOT NULL,
+    item_id INTEGER NOT NULL,
+    deleted_at DATETIME NOT NULL,
+    PRIMARY KEY (id)
+);
+
+CREATE INDEX IF NOT EXISTS ix_tombstone_owner_id_deleted_at ON tombstone (owner_id, deleted_at);
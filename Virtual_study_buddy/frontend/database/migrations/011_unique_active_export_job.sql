@@ -0,0 +1,17 @@
+-- At most one queued or running export per owner, so concurrent
+-- POST /study_plan/exports cannot both queue one (backend/utils/export.py).
+-- Duplicates queued before this migration are failed, keeping the oldest.
+
+UPDATE export_job SET status = 'failed', error = 'Duplicate of an earlier export',
+    finished_at = strftime('%Y-%m-%d %H:%M:%f000', 'now'), updated_at = strftime('%Y-%m-%d %H:%M:%f000', 'now')
+WHERE status IN ('queued', 'running')
+  AND EXISTS (
+      SELECT 1 FROM export_job AS earlier
+      WHERE earlier.owner_id = export_job.owner_id
+        AND earlier.status IN ('queued', 'running')
+        AND (earlier.created_at < export_job.created_at
+             OR (earlier.created_at = export_job.created_at AND earlier.id < export_job.id))
+  );
+
+CREATE UNIQUE INDEX IF NOT EXISTS ix_export_job_owner_id_active ON export_job (owner_id)
+    WHERE status IN ('queued', 'running');